@@ -14,7 +14,9 @@ from src.tts_client import TTSClient        # 语音合成客户端
 from src.video_gen import VideoGenerator    # 视频生成器
 from src.image_client import ImageClient    # 图像生成客户端
 from src.search_client import SearchClient  # 搜索客户端
-from src.config import TTS_VOICE, TTS_RATE, TTS_VOLUME
+from src.book_summarizer import BookSummarizer  # 长书分块摘要
+from src.script_stream import generate_script_with_speech  # 流式脚本 + 边写边合成语音
+from src.config import TTS_VOICE, TTS_RATE, TTS_VOLUME, ENCODER_PROFILES, IMAGE_ROUTER_METRICS_PATH, IMAGE_CANDIDATES
 from src.utils import clean_script
 from src.douyin_uploader import DouyinUploader
 
@@ -49,8 +51,41 @@ def process_book(file_path, args, clients, dirs, is_todo=False):
         print(f"[{file_name}] 文件内容为空，跳过处理。")
         return
 
+    # 长书: 分块并发摘要后逐层合并，脚本基于全书摘要生成 (不再截断为前 10000 字)
+    book_text = content
+    if not args.skip_llm and len(content) > clients['summarizer'].direct_chars:
+        print(f"[{file_name}] 文本较长 ({len(content)} 字符)，正在分块摘要全书...")
+        book_text = clients['summarizer'].summarize(content)
+        if not book_text:
+            print(f"[{file_name}] 全书摘要失败，将使用前 10000 字符。")
+            book_text = content[:10000]
+
+    # 合并模式: 一次请求同时生成书名、脚本、抖音文案和绘画提示词 (仅长文本)
+    package = None
+    if args.combined_llm and not args.skip_llm and len(content) >= 200:
+        print(f"[{file_name}] 正在通过单次 LLM 请求生成书名、脚本、文案和绘画提示词...")
+        package, report = llm_client.generate_book_package(book_text)
+        summary = f"请求 {report['requests']} 次 (分步需 4 次)，耗时 {report['seconds']:.1f}s，tokens 输入 {report['prompt_tokens']} / 输出 {report['completion_tokens']}"
+        if report['saved_prompt_tokens']:
+            summary += f"，约节省输入 tokens {report['saved_prompt_tokens']}"
+        if report['saved_seconds'] is not None:
+            summary += f"，约节省 {report['saved_seconds']:.1f}s"
+        elif report['saved_requests'] > 0:
+            summary += "，耗时节省暂无法估算 (已计时的请求不足)"
+        if report['fallbacks']:
+            summary += f"，回退字段: {', '.join(report['fallbacks'])}"
+        print(f"[{file_name}] 合并请求完成: {summary}")
+
     # 尝试提取书名
-    if not args.skip_llm and content:
+    if package is not None:
+        extracted_name = package['book_name']
+        if extracted_name and extracted_name != "Unknown":
+            print(f"[{file_name}] 提取到书名: {extracted_name}")
+            safe_name = re.sub(r'[\\/*?:"<>|]', "", extracted_name)
+            safe_name = safe_name.replace(" ", "_").strip()
+            if safe_name:
+                base_name = safe_name
+    elif not args.skip_llm and content:
          try:
              print(f"[{file_name}] 正在分析文本以提取书名...")
              extracted_name = llm_client.extract_book_name(content)
@@ -79,6 +114,7 @@ def process_book(file_path, args, clients, dirs, is_todo=False):
     image_path = os.path.join(book_output_dir, f"image_{base_name}.jpg")
 
     script_content = ""
+    streamed_tts = False  # 流式模式下语音与字幕已随脚本一起生成
 
     # --- 步骤 A: 生成脚本 ---
     if args.skip_llm and os.path.exists(script_path):
@@ -126,11 +162,32 @@ def process_book(file_path, args, clients, dirs, is_todo=False):
                     print(f"[{file_name}] 尝试使用现有短文本生成脚本...")
                     script_content = llm_client.generate_script(content)
         
+        # 合并模式: 脚本和文案已在合并请求中生成
+        elif package is not None:
+            script_content = package['script']
+            if script_content:
+                with open(script_path, "w", encoding="utf-8") as f:
+                    f.write(script_content)
+                print(f"脚本已保存至: {script_path}")
+                if package['description']:
+                    with open(desc_path, "w", encoding="utf-8") as f:
+                        f.write(package['description'])
+                    print(f"抖音文案已保存至: {desc_path}")
+            else:
+                print(f"[{file_name}] 脚本生成失败，跳过后续步骤。")
+                return
+
         # 正常长文本模式
         elif not args.skip_llm: 
-            if len(content) > 10000: content = content[:10000]
-            
-            script_content = llm_client.generate_script(content)
+            if args.stream_script:
+                print(f"[{file_name}] 流式生成脚本，同时合成语音和字幕...")
+                script_content, report = generate_script_with_speech(llm_client, tts_client, book_text, audio_path, vtt_path)
+                streamed_tts = script_content is not None
+                if streamed_tts:
+                    first_audio = f"{report['first_audio']:.1f}s" if report['first_audio'] is not None else "-"
+                    print(f"[{file_name}] 首段语音 {first_audio}，脚本完成 {report['script_done']:.1f}s，语音完成 {report['total']:.1f}s")
+            else:
+                script_content = llm_client.generate_script(book_text)
             if script_content:
                 with open(script_path, "w", encoding="utf-8") as f:
                     f.write(script_content)
@@ -162,11 +219,17 @@ def process_book(file_path, args, clients, dirs, is_todo=False):
     else:
         print(f"[{file_name}] 正在生成 AI 配图...")
         context = cleaned_script[:300] 
-        image_prompt = llm_client.generate_image_prompt(context)
+        if package is not None and package['image_prompt']:
+            image_prompt = package['image_prompt']
+        else:
+            image_prompt = llm_client.generate_image_prompt(context)
         
         if image_prompt:
             print(f"生成的绘画提示词: {image_prompt}")
-            success = image_client.generate_image(image_prompt, image_path)
+            if args.image_candidates > 1:
+                success = image_client.generate_images(image_prompt, image_path, n=args.image_candidates)
+            else:
+                success = image_client.generate_image(image_prompt, image_path)
             if success:
                 print(f"图片已保存至: {image_path}")
             else:
@@ -178,11 +241,14 @@ def process_book(file_path, args, clients, dirs, is_todo=False):
     audio_exists = os.path.exists(audio_path)
     vtt_exists = os.path.exists(vtt_path)
     
-    if args.skip_tts and audio_exists:
+    if streamed_tts:
+        print(f"[{file_name}] 语音和字幕已在流式生成脚本时合成: {audio_path}")
+        vtt_exists = True
+    elif args.skip_tts and audio_exists:
         print(f"[{file_name}] 跳过 TTS，使用现有音频: {audio_path}")
     else:
         print(f"[{file_name}] 正在生成语音和字幕 (Edge-TTS)...")
-        success = tts_client.generate_audio_with_subtitles(cleaned_script, audio_path, vtt_path)
+        success = tts_client.generate_audio_with_subtitles(cleaned_script, audio_path, vtt_path, segmented=args.parallel_tts)
         if success:
             print(f"音频已保存至: {audio_path}")
             print(f"字幕已保存至: {vtt_path}")
@@ -214,7 +280,10 @@ def process_book(file_path, args, clients, dirs, is_todo=False):
                 video_path, 
                 bg_image_path=bg_path,
                 vtt_path=vtt_path if vtt_exists else None,
-                bgm_path=bgm_path
+                bgm_path=bgm_path,
+                renderer=args.renderer,
+                workers=args.render_workers,
+                encoder_profile=args.encoder_profile
             )
             if success:
                 print(f"视频已成功生成: {video_path}")
@@ -282,6 +351,14 @@ def main():
     parser.add_argument("--skip-image", action="store_true", help="跳过 AI 绘图")
     parser.add_argument("--skip-video", action="store_true", help="跳过视频合成")
     parser.add_argument("--upload", action="store_true", help="自动上传到抖音")
+    parser.add_argument("--renderer", choices=["moviepy", "ffmpeg", "compositor", "parallel"], default="moviepy", help="视频渲染引擎 (ffmpeg: ASS 字幕 + 单次 ffmpeg 调用; compositor: 缓存背景，仅重绘字幕区域; parallel: 按字幕切分多进程渲染后无损拼接)")
+    parser.add_argument("--encoder-profile", choices=list(ENCODER_PROFILES), default=None, help="视频编码配置 (draft/balanced/archive，默认读取 ENCODER_PROFILE)")
+    parser.add_argument("--render-workers", type=int, default=None, help="parallel 渲染的进程数 (默认: CPU 核数)")
+    parser.add_argument("--parallel-tts", action="store_true", help="按句子分段并发合成语音 (并发数: TTS_CONCURRENCY)")
+    parser.add_argument("--stream-script", action="store_true", help="流式生成脚本，边生成边分段合成语音 (结果与 --parallel-tts 相同)")
+    parser.add_argument("--image-candidates", type=int, default=IMAGE_CANDIDATES, help="每本书生成的候选图片数，按清晰度和字幕区域亮度自动挑选最佳 (本地/SiliconFlow 单次请求批量生成)")
+    parser.add_argument("--deterministic-seed", action="store_true", help="由绘画提示词推导图片随机种子 (可复现，重跑同一本书时直接命中图片缓存)")
+    parser.add_argument("--combined-llm", action="store_true", help="单次 LLM 请求 (JSON) 同时生成书名、脚本、文案和绘画提示词，校验失败的字段再单独生成")
     args = parser.parse_args()
 
     # --- 1. 初始化客户端 ---
@@ -295,6 +372,10 @@ def main():
             'uploader': DouyinUploader(),
             'search': SearchClient()
         }
+        if args.deterministic_seed:
+            clients['image'].deterministic_seed = True
+        llm_cache = clients['llm'].cache
+        clients['summarizer'] = BookSummarizer(cache=llm_cache if llm_cache is not None else False, stats_from=clients['llm'])
     except ValueError as e:
         print(f"初始化失败: {e}")
         return
@@ -337,6 +418,38 @@ def main():
     else:
         print("Todo 队列为空。")
 
+    llm_stats = clients['llm'].cache_stats()
+    if llm_stats:
+        print("\n=== LLM 缓存统计 ===")
+        for method, s in llm_stats.items():
+            print(f"{method}: 命中 {s['hits']} / 未命中 {s['misses']} (命中率 {s['hit_rate']:.0%})")
+
+    image_cache = clients['image'].cache
+    if image_cache is not None and (image_cache.hits or image_cache.misses):
+        print("\n=== 图片缓存统计 ===")
+        print(f"命中 {image_cache.hits} / 未命中 {image_cache.misses}")
+
+    image_metrics = clients['image'].router.metrics()
+    if any(m['routed'] for m in image_metrics.values()):
+        print("\n=== 图片服务路由统计 ===")
+        for provider, m in image_metrics.items():
+            p50 = f"{m['latency']['p50']:.1f}s" if m['latency']['p50'] is not None else "-"
+            print(f"{provider}: 路由 {m['routed']} 次, 请求 {m['requests']} / 失败 {m['failures']}, "
+                  f"p50 {p50}, 熔断 {m['breaker_opens']} 次, 当前状态 {m['state']}")
+        if IMAGE_ROUTER_METRICS_PATH:
+            clients['image'].router.dump_metrics(IMAGE_ROUTER_METRICS_PATH)
+            print(f"路由指标已写入: {IMAGE_ROUTER_METRICS_PATH}")
+
+    latency_stats = clients['llm'].latency_stats()
+    if latency_stats:
+        print("\n=== LLM 延迟统计 (秒) ===")
+        for method, s in latency_stats.items():
+            line = f"{method}: {s['count']} 次, p50 {s['p50']:.1f} / p95 {s['p95']:.1f} / p99 {s['p99']:.1f}"
+            if s['hedged']:
+                line += f", 对冲 {s['hedged']} 次 (备用胜出 {s['secondary_wins']} 次)"
+            print(line)
+    clients['llm'].close()
+
     # --- 5. 生成空的 input.txt (方便下次使用) ---
     input_file_path = os.path.join(dirs['input'], "input.txt")
     if not os.path.exists(input_file_path):
@@ -0,0 +1,145 @@
+import os
+import sys
+import wave
+import hashlib
+import subprocess
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.config import BGM_VOLUME, BGM_CROSSFADE, BGM_DUCKING, BGM_DUCK_GAIN, AUDIO_CACHE_DIR
+from moviepy.config import FFMPEG_BINARY
+
+
+class AudioPremixer:
+    def __init__(self, sample_rate=44100, bgm_volume=BGM_VOLUME, crossfade=BGM_CROSSFADE, ducking=BGM_DUCKING,
+                 duck_gain=BGM_DUCK_GAIN, cache_dir=AUDIO_CACHE_DIR):
+        """
+        Mixes voice and background music into one track with numpy, before rendering.
+
+        The BGM is decoded to PCM once and cached as a memory-mapped .npy keyed by the
+        file hash, so a batch does not decode data/bgm.mp3 again for every book.
+
+        :param bgm_volume: Gain applied to the BGM (0.1 = the previous with_volume_scaled(0.1)).
+        :param crossfade: Seconds of crossfade between BGM loops (0 = hard cut).
+        :param ducking: Lower the BGM further while the voice is speaking.
+        :param duck_gain: Extra BGM gain under speech when ducking is on.
+        """
+        self.sample_rate = sample_rate
+        self.channels = 2
+        self.bgm_volume = bgm_volume
+        self.crossfade = crossfade
+        self.ducking = ducking
+        self.duck_gain = duck_gain
+        self.cache_dir = cache_dir
+
+    def premix(self, voice_path, bgm_path, output_path):
+        """
+        Writes voice + looped BGM as a 16-bit WAV of the voice's length. Returns the duration.
+        """
+        voice = self.decode(voice_path)
+        bgm = self.load_bgm(bgm_path)
+
+        track = self.tile(bgm, len(voice))
+        track *= np.float32(self.bgm_volume)
+        if self.ducking:
+            track *= self.duck_envelope(voice)[:, None]
+        track += voice
+
+        self.write_wav(output_path, track)
+        return len(voice) / self.sample_rate
+
+    def decode(self, path):
+        """
+        Decodes any audio file to float32 PCM (samples, channels) with ffmpeg.
+        """
+        cmd = [FFMPEG_BINARY, "-loglevel", "error", "-i", path, "-f", "f32le", "-acodec", "pcm_f32le",
+               "-ac", str(self.channels), "-ar", str(self.sample_rate), "-"]
+        result = subprocess.run(cmd, capture_output=True, check=True)
+        return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, self.channels).copy()
+
+    def load_bgm(self, path):
+        """
+        Returns the decoded BGM, memory-mapped from the cache when it was decoded before.
+        """
+        if not self.cache_dir:
+            return self.decode(path)
+
+        cache_path = os.path.join(self.cache_dir, f"{self._file_hash(path)}_{self.sample_rate}x{self.channels}.npy")
+        if not os.path.exists(cache_path):
+            print(f"Decoding BGM into cache: {cache_path}")
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp.npy"
+            np.save(tmp_path, self.decode(path))
+            os.replace(tmp_path, cache_path)
+        return np.load(cache_path, mmap_mode='r')
+
+    def tile(self, bgm, n_samples):
+        """
+        Loops the BGM to n_samples, crossfading each loop into the next.
+        """
+        out = np.zeros((n_samples, self.channels), dtype=np.float32)
+        length = len(bgm)
+        if length == 0 or n_samples == 0:
+            return out
+        fade = min(int(self.crossfade * self.sample_rate), length // 2)
+        if length >= n_samples or fade == 0:
+            # Plain loop (or cut) without crossfade
+            pos = 0
+            while pos < n_samples:
+                n = min(length, n_samples - pos)
+                out[pos:pos + n] = bgm[:n]
+                pos += n
+            return out
+
+        ramp = np.linspace(0.0, 1.0, fade, endpoint=False, dtype=np.float32)[:, None]
+        stride = length - fade
+        pos = 0
+        first = True
+        while pos < n_samples:
+            n = min(length, n_samples - pos)
+            segment = np.array(bgm[:n], dtype=np.float32)
+            if not first:
+                # Fade in over the previous loop's tail, which fades out
+                k = min(fade, n)
+                segment[:k] *= ramp[:k]
+                out[pos:pos + k] *= (1.0 - ramp[:k])
+            out[pos:pos + n] += segment
+            first = False
+            pos += stride
+        return out
+
+    def duck_envelope(self, voice, window=0.05, smooth=0.3, threshold=0.02):
+        """
+        Per-sample BGM gain: duck_gain where the voice is active, 1.0 elsewhere,
+        smoothed so the BGM fades instead of pumping.
+        """
+        n = len(voice)
+        win = max(1, int(window * self.sample_rate))
+        mono = voice.mean(axis=1)
+        n_win = (n + win - 1) // win
+        padded = np.zeros(n_win * win, dtype=np.float32)
+        padded[:n] = mono
+        rms = np.sqrt((padded.reshape(n_win, win) ** 2).mean(axis=1))
+        active = (rms > threshold).astype(np.float32)
+
+        k = max(1, int(smooth / window))
+        active = np.convolve(active, np.ones(k, dtype=np.float32) / k, mode='same')
+        gain = 1.0 - (1.0 - self.duck_gain) * np.clip(active, 0.0, 1.0)
+        return np.repeat(gain, win)[:n].astype(np.float32)
+
+    def write_wav(self, path, track):
+        pcm = (np.clip(track, -1.0, 1.0) * 32767).astype('<i2')
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(self.channels)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(pcm.tobytes())
+
+    @staticmethod
+    def _file_hash(path):
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(block)
+        return h.hexdigest()[:32]
@@ -0,0 +1,166 @@
+import os
+import sys
+import tempfile
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils import load_subtitles
+from src.karaoke_mask import KaraokeMask
+from src.subtitle_layer import CueIndex
+from src.encoder_profiles import get_encoder_profile, RawVideoEncoder
+
+
+class _CueSprite:
+    """
+    Pre-rendered karaoke subtitle: base/active colors, base alpha and the wipe mask,
+    plus work buffers reused for every frame of the cue.
+    """
+    def __init__(self, img_base_np, img_active_np, duration, timing=None):
+        self.h, self.w = img_base_np.shape[:2]
+        self.base_rgb = img_base_np[:, :, :3].astype(np.float32)
+        self.base_alpha = (img_base_np[:, :, 3].astype(np.float32) / 255.0)[:, :, None]
+        self.active_rgb = img_active_np[:, :, :3].astype(np.float32)
+        self.mask = KaraokeMask(img_active_np[:, :, 3], duration, timing=timing)
+        self.work = np.empty((self.h, self.w, 3), dtype=np.float32)
+        self.tmp = np.empty((self.h, self.w, 3), dtype=np.float32)
+
+
+class BandCompositor:
+    def __init__(self, video_gen, fps=24, fontsize=70, color_base='white', color_active='#FFD700', stroke_width=4, stroke_fill='black', encoder_profile=None):
+        """
+        Dirty-rectangle compositor for static-background videos.
+
+        The background is resized/cropped once and kept as a uint8 frame. For each output
+        frame only the bounding box of the active subtitle (the band at 0.8 * height) is
+        rewritten, and the frame is handed straight to the ffmpeg encoder.
+
+        :param video_gen: VideoGenerator providing the output size and the text rendering.
+        :param encoder_profile: Encoder profile name or dict (see src/encoder_profiles.py).
+        """
+        self.video_gen = video_gen
+        self.width = video_gen.width
+        self.height = video_gen.height
+        self.fps = fps
+        self.fontsize = fontsize
+        self.color_base = color_base
+        self.color_active = color_active
+        self.stroke_width = stroke_width
+        self.stroke_fill = stroke_fill
+        self.encoder_profile = encoder_profile if isinstance(encoder_profile, dict) else get_encoder_profile(encoder_profile)
+
+    def render(self, final_audio, duration, output_path, bg_image_path=None, vtt_path=None):
+        """
+        Renders the video with the already mixed audio clip. Returns True on success.
+        """
+        subs = load_subtitles(vtt_path) if vtt_path and os.path.exists(vtt_path) else []
+        print(f"Parsed {len(subs)} subtitle lines.")
+        background = self.load_background(bg_image_path)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            audio_file = os.path.join(tmp_dir, "audio.m4a")
+            final_audio.write_audiofile(audio_file, fps=44100, codec="aac", logger=None)
+
+            self.write_frames(output_path, self.iter_frames(background, subs, duration), audiofile=audio_file)
+        return True
+
+    def write_frames(self, output_path, frames, audiofile=None):
+        """
+        Streams frames straight into the ffmpeg encoder, muxing audiofile (copied) if given.
+        """
+        encoder = RawVideoEncoder(output_path, (self.width, self.height), self.fps, self.encoder_profile, audiofile=audiofile)
+        try:
+            for frame in frames:
+                encoder.write_frame(frame)
+        finally:
+            encoder.close()
+
+    def load_background(self, bg_image_path=None):
+        """
+        Returns the background as a (H, W, 3) uint8 array, resized to fill the screen
+        and center-cropped like the MoviePy path. Black if no image is given.
+        """
+        if not (bg_image_path and os.path.exists(bg_image_path)):
+            return np.zeros((self.height, self.width, 3), dtype=np.uint8)
+
+        with Image.open(bg_image_path) as img:
+            img = img.convert("RGB")
+            scale = max(self.width / img.width, self.height / img.height)
+            new_size = (max(self.width, round(img.width * scale)), max(self.height, round(img.height * scale)))
+            if new_size != img.size:
+                img = img.resize(new_size, Image.Resampling.LANCZOS)
+            left = (img.width - self.width) // 2
+            top = (img.height - self.height) // 2
+            img = img.crop((left, top, left + self.width, top + self.height))
+            return np.array(img)
+
+    def iter_frames(self, background, subs, duration, start_frame=0, end_frame=None):
+        """
+        Yields output frames at self.fps. The yielded array is reused between frames.
+        start_frame/end_frame select a range of the timeline (frame i is at t = i / fps),
+        so chunks rendered separately are identical to the full render.
+        """
+        frame = background.copy()
+        index = CueIndex(subs, duration)
+        sprite = None
+        sprite_cue = -1
+        dirty = None  # (y0, y1, x0, x1) of the last subtitle drawn
+
+        n_frames = int(duration * self.fps)
+        if end_frame is not None:
+            n_frames = min(n_frames, end_frame)
+        for i in range(start_frame, n_frames):
+            t = i / self.fps
+            active = index.active(t)
+
+            if active != sprite_cue:
+                if active >= 0:
+                    sprite = self._make_sprite(index.texts[active], index.ends[active] - index.starts[active], index.words[active])
+                else:
+                    sprite = None
+                sprite_cue = active
+
+            rect = self._sprite_rect(sprite) if sprite is not None else None
+            if dirty is not None and dirty != rect:
+                # Restore the previous subtitle area from the cached background
+                y0, y1, x0, x1 = dirty
+                frame[y0:y1, x0:x1] = background[y0:y1, x0:x1]
+            if rect is not None:
+                self._draw_sprite(frame, background, sprite, rect, t - index.starts[active])
+            dirty = rect
+
+            yield frame
+
+    def _make_sprite(self, text, duration, words=None):
+        atlas = self.video_gen._get_atlas(self.fontsize, self.stroke_width)
+        img_base_np = atlas.tint(text, self.color_base, self.stroke_fill)
+        img_active_np = atlas.tint(text, self.color_active, self.stroke_fill)
+        timing = self.video_gen._word_timing(text, words, self.fontsize)
+        return _CueSprite(img_base_np, img_active_np, duration, timing)
+
+    def _sprite_rect(self, sprite):
+        # Same placement as with_position(('center', 0.8), relative=True)
+        x0 = max(0, (self.width - sprite.w) // 2)
+        y0 = int(self.height * 0.8)
+        return (y0, min(self.height, y0 + sprite.h), x0, min(self.width, x0 + sprite.w))
+
+    def _draw_sprite(self, frame, background, sprite, rect, t):
+        y0, y1, x0, x1 = rect
+        h, w = y1 - y0, x1 - x0
+        bg = background[y0:y1, x0:x1]
+        work = sprite.work[:h, :w]
+        tmp = sprite.tmp[:h, :w]
+
+        # Base (white) text over the background
+        np.subtract(sprite.base_rgb[:h, :w], bg, out=work)
+        work *= sprite.base_alpha[:h, :w]
+        work += bg
+        # Active (gold) text over that, through the karaoke wipe mask
+        mask = sprite.mask.make_mask(t)[:h, :w, None]
+        np.subtract(sprite.active_rgb[:h, :w], work, out=tmp)
+        np.multiply(tmp, mask, out=tmp, casting="same_kind")
+        work += tmp
+
+        work += 0.5
+        frame[y0:y1, x0:x1] = work
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import re
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.config import LLM_CONCURRENCY, SUMMARY_DIRECT_CHARS, SUMMARY_CHUNK_CHARS, SUMMARY_FAN_IN
+from src.llm_client import AsyncLLMClient
+
+# Chapter headings on a short line of their own: 第十二章 / 第3回 / 卷一 / Chapter 7 / 序言 / 后记 ...
+CHAPTER_HEADING = re.compile(
+    r"^[ \t　]*(第[0-9０-９零〇一二三四五六七八九十百千两]+[章回节卷部篇集]|卷[0-9零〇一二三四五六七八九十百千]+"
+    r"|chapter\s+[0-9ivxlc]+\b|序[章言]?|前言|引子|楔子|后记|尾声)[^\n]{0,40}$",
+    re.I | re.M
+)
+SENTENCE_END = re.compile(r"(?<=[。！？!?…；;])")
+
+
+def split_chapters(text):
+    """
+    Splits a book at chapter headings. Text before the first heading is its own part.
+    """
+    starts = [m.start() for m in CHAPTER_HEADING.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    starts.append(len(text))
+    chapters = [text[a:b].strip() for a, b in zip(starts, starts[1:])]
+    return [c for c in chapters if c]
+
+
+def chunk_text(text, chunk_chars=SUMMARY_CHUNK_CHARS):
+    """
+    Cuts a book into chunks of at most chunk_chars characters.
+
+    Chunks never span chapters and are packed from whole paragraphs; a paragraph
+    longer than chunk_chars is cut at sentence ends (or hard-cut as a last resort).
+    Packing restarts at every chapter, so editing one chapter leaves the chunks of
+    all other chapters, and therefore their cached summaries, unchanged.
+    """
+    chunks = []
+    for chapter in split_chapters(text):
+        pieces = []
+        for paragraph in chapter.split("\n"):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if len(paragraph) <= chunk_chars:
+                pieces.append(paragraph)
+                continue
+            sentence_run = ""
+            for sentence in SENTENCE_END.split(paragraph):
+                if len(sentence) > chunk_chars and sentence_run:
+                    pieces.append(sentence_run)
+                    sentence_run = ""
+                while len(sentence) > chunk_chars:
+                    pieces.append(sentence[:chunk_chars])
+                    sentence = sentence[chunk_chars:]
+                if sentence_run and len(sentence_run) + len(sentence) > chunk_chars:
+                    pieces.append(sentence_run)
+                    sentence_run = ""
+                sentence_run += sentence
+            if sentence_run:
+                pieces.append(sentence_run)
+
+        current = []
+        size = 0
+        for piece in pieces:
+            if current and size + 1 + len(piece) > chunk_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + (1 if size else 0)
+        if current:
+            chunks.append("\n".join(current))
+    return chunks
+
+
+class BookSummarizer:
+    def __init__(self, cache=None, concurrency=LLM_CONCURRENCY, chunk_chars=SUMMARY_CHUNK_CHARS,
+                 fan_in=SUMMARY_FAN_IN, direct_chars=SUMMARY_DIRECT_CHARS, client_factory=AsyncLLMClient, stats_from=None):
+        """
+        Map-reduce summarization of full-length books, so the script prompt sees the
+        whole book instead of its first 10,000 characters.
+
+        Map: the chunks from chunk_text are summarized concurrently (at most
+        `concurrency` requests in flight). Reduce: the partial summaries are merged
+        `fan_in` at a time, level by level, until they fit in direct_chars.
+
+        Chunk summaries are cached through the LLM response cache, whose key is a hash
+        of the request including the chunk text: re-running an edited book only
+        summarizes the chunks that changed (and the merges above them).
+
+        :param cache: LLMCache shared with the LLMClient (None = from config, False = off).
+        :param client_factory: Builds the AsyncLLMClient for each summarize() call.
+        :param stats_from: LLMClient whose latency histograms those clients share, so hedging
+                           delays carry over from one summarize() call to the next.
+        """
+        self.cache = cache
+        self.concurrency = concurrency
+        self.chunk_chars = chunk_chars
+        self.fan_in = max(2, fan_in)
+        self.direct_chars = direct_chars
+        self.client_factory = client_factory
+        self.stats_from = stats_from
+        self.last_report = None
+
+    def summarize(self, text):
+        """
+        Returns text unchanged if it fits in direct_chars, otherwise its summary.
+        Returns None if no chunk could be summarized.
+        """
+        if len(text) <= self.direct_chars:
+            return text
+        return asyncio.run(self.summarize_async(text))
+
+    async def summarize_async(self, text):
+        chunks = chunk_text(text, self.chunk_chars)
+        # The async client is bound to the running event loop, so build one per run
+        async with self.client_factory(cache=self.cache, concurrency=self.concurrency, stats_from=self.stats_from) as llm:
+            before = self._cache_hits(llm)
+            summaries = await asyncio.gather(*[llm.summarize_chunk(chunk) for chunk in chunks])
+            failed = sum(1 for s in summaries if not s)
+            if failed:
+                print(f"Warning: {failed}/{len(chunks)} chunk summaries failed; those parts are left out.")
+            level = [s.strip() for s in summaries if s]
+            if not level:
+                return None
+            cached = self._cache_hits(llm) - before
+
+            levels = 0
+            while len(level) > 1 and self._joined_length(level) > self.direct_chars:
+                groups = [level[i:i + self.fan_in] for i in range(0, len(level), self.fan_in)]
+                level = await asyncio.gather(*[self._merge(llm, group) for group in groups])
+                levels += 1
+
+        summary = "\n\n".join(level)
+        self.last_report = {'chunks': len(chunks), 'cached_chunks': cached, 'failed_chunks': failed,
+                            'reduce_levels': levels, 'summary_chars': len(summary)}
+        print(f"Summarized {len(text)} characters in {len(chunks)} chunks ({cached} cached, "
+              f"{levels} reduce levels) into {len(summary)} characters.")
+        return summary[:self.direct_chars]
+
+    async def _merge(self, llm, group):
+        if len(group) == 1:
+            return group[0]
+        merged = await llm.merge_summaries(group)
+        if merged:
+            return merged.strip()
+        # Keep the parts; the next level gets another chance to merge them
+        return "\n".join(group)
+
+    @staticmethod
+    def _cache_hits(llm):
+        return llm.cache_stats().get("summarize_chunk", {}).get('hits', 0)
+
+    @staticmethod
+    def _joined_length(level):
+        return sum(len(s) for s in level) + 2 * (len(level) - 1)
@@ -8,6 +8,35 @@ load_dotenv()
 API_KEY = os.getenv("LLM_API_KEY")
 BASE_URL = os.getenv("LLM_BASE_URL", "https://api.siliconflow.cn/v1") 
 MODEL_NAME = os.getenv("LLM_MODEL", "Qwen/Qwen2.5-7B-Instruct")
+# LLM response cache (SQLite). Byte-identical requests are answered from the cache.
+# LLM_CACHE_PATH="" disables it; LLM_CACHE_TTL_HOURS=0 keeps responses forever.
+# LLM_CACHE_REPLAY=1 only replays recorded responses and never calls the API (tests).
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output", ".cache", "llm.sqlite3"))
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_REPLAY = os.getenv("LLM_CACHE_REPLAY", "false").lower() in ("1", "true", "yes")
+# AsyncLLMClient: requests in flight at once (also the HTTP pool size) and the
+# per-request deadline in seconds (0 = no deadline).
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+# Hedged requests (opt-in): when a call has not returned after the LLM_HEDGE_PERCENTILE
+# latency of its method, a duplicate is sent and the first response wins. Until
+# LLM_HEDGE_MIN_SAMPLES calls of a method have been timed, LLM_HEDGE_DELAY seconds is used.
+# The duplicate goes to LLM_SECONDARY_BASE_URL / LLM_SECONDARY_MODEL if set.
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "15"))
+LLM_SECONDARY_BASE_URL = os.getenv("LLM_SECONDARY_BASE_URL")
+LLM_SECONDARY_MODEL = os.getenv("LLM_SECONDARY_MODEL")
+LLM_SECONDARY_API_KEY = os.getenv("LLM_SECONDARY_API_KEY")
+# Books longer than SUMMARY_DIRECT_CHARS are summarized before script generation:
+# chunks of about SUMMARY_CHUNK_CHARS (cut at chapter/paragraph boundaries) are summarized
+# concurrently, then merged SUMMARY_FAN_IN at a time. Chunk summaries hit the LLM cache
+# when the chunk text is unchanged.
+SUMMARY_DIRECT_CHARS = int(os.getenv("SUMMARY_DIRECT_CHARS", "10000"))
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "6000"))
+SUMMARY_FAN_IN = int(os.getenv("SUMMARY_FAN_IN", "6"))
 
 # Image Generation Configuration
 # HF_TOKEN is optional but recommended for higher rate limits.
@@ -16,6 +45,9 @@ HF_TOKEN = os.getenv("HF_TOKEN")
 # Recommended free model on HF: stabilityai/sdxl-turbo (fast, decent quality)
 IMAGE_MODEL = os.getenv("IMAGE_MODEL", "stabilityai/sdxl-turbo") 
 IMAGE_SIZE = "1024x1024"
+# Generated images are stored at the video frame size (scaled to fill, center-cropped),
+# so the renderers use them as they are. Set to an empty string to keep the provider's size.
+IMAGE_OUTPUT_SIZE = os.getenv("IMAGE_OUTPUT_SIZE", "1080x1920")
 
 # Image Provider: 'siliconflow', 'hf', 'local', or 'pollinations'
 # Default logic: Use SiliconFlow if API_KEY is set, else HF if HF_TOKEN is set, else try Public HF.
@@ -30,12 +62,89 @@ LOCAL_IMAGE_URL = os.getenv("LOCAL_IMAGE_URL", "http://127.0.0.1:7860/sdapi/v1/t
 # Models: 'flux', 'turbo', 'midjourney', 'stable-diffusion'
 POLLINATIONS_MODEL = os.getenv("POLLINATIONS_MODEL", "flux")
 
+# Image HTTP transport
+# All providers share one keep-alive connection pool of IMAGE_HTTP_POOL_SIZE connections per host.
+# Timeouts are (connect, read) seconds per provider; override with e.g. IMAGE_TIMEOUT_HF="10,180".
+# "download" is the follow-up fetch of an image URL returned by the API.
+IMAGE_HTTP_POOL_SIZE = int(os.getenv("IMAGE_HTTP_POOL_SIZE", "8"))
+IMAGE_TIMEOUTS = {
+    provider: tuple(float(x) for x in os.getenv(f"IMAGE_TIMEOUT_{provider.upper()}", default).split(","))
+    for provider, default in {
+        "local": "5,300",
+        "pollinations": "10,120",
+        "hf": "10,120",
+        "siliconflow": "10,120",
+        "download": "10,60",
+    }.items()
+}
+
+# Image provider routing
+# IMAGE_FALLBACK_PROVIDERS (comma-separated, e.g. "pollinations,hf") are tried after the
+# main provider. Each request goes to the healthiest provider by recent latency and error
+# rate (last IMAGE_ROUTER_WINDOW requests). IMAGE_BREAKER_FAILURES consecutive failures open
+# a provider's circuit breaker for IMAGE_BREAKER_RESET seconds. Retries of the same provider
+# back off exponentially from IMAGE_RETRY_BASE_DELAY up to IMAGE_RETRY_MAX_DELAY seconds.
+# Router metrics are written to IMAGE_ROUTER_METRICS_PATH at the end of a run ("" disables).
+IMAGE_FALLBACK_PROVIDERS = [p.strip().lower() for p in os.getenv("IMAGE_FALLBACK_PROVIDERS", "").split(",") if p.strip()]
+IMAGE_ROUTER_WINDOW = int(os.getenv("IMAGE_ROUTER_WINDOW", "20"))
+IMAGE_BREAKER_FAILURES = int(os.getenv("IMAGE_BREAKER_FAILURES", "3"))
+IMAGE_BREAKER_RESET = float(os.getenv("IMAGE_BREAKER_RESET", "120"))
+IMAGE_RETRY_BASE_DELAY = float(os.getenv("IMAGE_RETRY_BASE_DELAY", "1"))
+IMAGE_RETRY_MAX_DELAY = float(os.getenv("IMAGE_RETRY_MAX_DELAY", "30"))
+IMAGE_ROUTER_METRICS_PATH = os.getenv("IMAGE_ROUTER_METRICS_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output", "image_router_metrics.json"))
+
+# Candidates per image (ImageClient.generate_images / --image-candidates): the best one by
+# sharpness and subtitle-band darkness is kept. Local and SiliconFlow generate them in batches.
+IMAGE_CANDIDATES = int(os.getenv("IMAGE_CANDIDATES", "1"))
+
+# Image cache
+# Generated images are cached by hash of (provider, model, prompt, negative prompt, width,
+# height, steps, guidance, seed). Set IMAGE_CACHE_DIR to an empty string to disable it.
+# With IMAGE_DETERMINISTIC_SEED=1 the default seed is derived from the prompt instead of
+# being random, so regenerating the same book hits the cache and is reproducible.
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output", ".cache", "images"))
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "1024"))
+IMAGE_DETERMINISTIC_SEED = os.getenv("IMAGE_DETERMINISTIC_SEED", "false").lower() in ("1", "true", "yes")
+
+# Subtitle Font Configuration
+# FONT_PATH forces a specific font file. Otherwise fontconfig and the system font
+# directories (plus FONT_DIRS, separated by os.pathsep) are scanned once for a CJK font.
+FONT_PATH = os.getenv("FONT_PATH")
+FONT_DIRS = [d for d in os.getenv("FONT_DIRS", "").split(os.pathsep) if d]
+FONT_CACHE_SIZE = int(os.getenv("FONT_CACHE_SIZE", "32"))
+
+# Video Encoder Profiles (libx264)
+# Our videos are a still image with subtitles, so every profile uses -tune stillimage
+# and long GOPs. threads=0 lets x264 pick the thread count.
+ENCODER_PROFILE = os.getenv("ENCODER_PROFILE", "balanced")
+ENCODER_PROFILES = {
+    "draft":    {"preset": "ultrafast", "tune": "stillimage", "crf": 30, "threads": 0, "gop": 240, "pix_fmt": "yuv420p"},
+    "balanced": {"preset": "veryfast",  "tune": "stillimage", "crf": 23, "threads": 0, "gop": 240, "pix_fmt": "yuv420p"},
+    "archive":  {"preset": "slow",      "tune": "stillimage", "crf": 18, "threads": 0, "gop": 120, "pix_fmt": "yuv420p"},
+}
+
+# Background Music Mix
+# The BGM is decoded once into AUDIO_CACHE_DIR (keyed by file hash) and premixed with numpy.
+# BGM_CROSSFADE is in seconds; BGM_DUCKING lowers the BGM by BGM_DUCK_GAIN while the voice speaks.
+BGM_VOLUME = float(os.getenv("BGM_VOLUME", "0.1"))
+BGM_CROSSFADE = float(os.getenv("BGM_CROSSFADE", "0.5"))
+BGM_DUCKING = os.getenv("BGM_DUCKING", "false").lower() in ("1", "true", "yes")
+BGM_DUCK_GAIN = float(os.getenv("BGM_DUCK_GAIN", "0.5"))
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output", ".cache", "audio"))
 
 
 # TTS Configuration
 TTS_VOICE = "zh-CN-YunxiNeural" # Options: zh-CN-YunxiNeural (Male), zh-CN-XiaoxiaoNeural (Female)
 TTS_RATE = "+0%"
 TTS_VOLUME = "+0%"
+# Segmented TTS (--parallel-tts): the cleaned script is split at sentence ends into
+# segments of about TTS_SEGMENT_CHARS characters, synthesized TTS_CONCURRENCY at a time.
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+TTS_SEGMENT_CHARS = int(os.getenv("TTS_SEGMENT_CHARS", "120"))
+# Synthesized audio + cues are cached by hash of (text, voice, rate, volume).
+# Set TTS_CACHE_DIR to an empty string to disable the cache.
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output", ".cache", "tts"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
 
 # Prompts
 SCRIPT_GENERATION_PROMPT = """
@@ -152,3 +261,65 @@ DOUYIN_DESCRIPTION_PROMPT = """
 
 **输出**：
 """
+
+CHUNK_SUMMARY_PROMPT = """
+你是一位专业的读书笔记整理者。
+
+**任务**：
+概括下面这段书籍片段（全书的一部分），供后续撰写整本书的解读脚本使用。
+
+**要求**：
+1.  保留关键情节、人物及其关系、核心观点和论据，以及值得引用的金句（原文引用）。
+2.  按原文顺序叙述，不要评价，不要补充片段之外的内容。
+3.  300-500 字，纯文本输出，不要标题和解释。
+
+**书籍片段**：
+{chunk}
+
+**摘要**：
+"""
+
+SUMMARY_REDUCE_PROMPT = """
+你是一位专业的读书笔记整理者。
+
+**任务**：
+下面是同一本书中连续若干部分的摘要（按原书顺序排列），请将它们合并为一份连贯的摘要。
+
+**要求**：
+1.  保持原书顺序，合并重复信息，保留关键情节、人物、核心观点和金句。
+2.  不要评价，不要补充摘要之外的内容。
+3.  不超过 800 字，纯文本输出，不要标题和解释。
+
+**分段摘要**：
+{summaries}
+
+**合并后的摘要**：
+"""
+
+# Combined mode (--combined-llm): book name, script, description and image prompt in one JSON response
+BOOK_PACKAGE_PROMPT = """
+你是一位拥有百万粉丝的抖音知识博主，同时也是抖音运营专家和 AI 绘画提示词专家。
+
+**任务**：
+阅读用户提供的书籍内容，一次性完成以下 4 项工作，并以 **JSON 对象** 输出。
+
+**字段要求**：
+1.  `book_name`：书名。从文本中提取或推断；无法确定时输出 "Unknown"。只写书名，不要书名号和解释。
+2.  `script`：时长 1-3 分钟（约 400-800 字）的口播脚本。
+    *   开头 5 秒用权威背书、痛点或颠覆认知抓住注意力，严禁平铺直叙地说“今天要讲这本书”。
+    *   从两个对立或互补的角度辩证解读，提炼 2-3 个最精彩的观点并结合生活案例。
+    *   最后给出行动建议或情感升华，引导点赞收藏。
+    *   极度口语化，多用短句，只写纯文本口播稿，适当分段（段落之间用 \\n 换行）。
+3.  `description`：抖音视频描述，格式为：
+    【文案】
+    简短有力、引发好奇或共鸣的文案（不要简单复述脚本）
+    【标签】
+    5-8 个标签，必须包含 #读书 #知识分享
+4.  `image_prompt`：1 个**英文**绘画提示词，根据脚本开头想象一个具体的、有画面感的场景，风格为 Dreamy, Storybook illustration, Digital art, Soft lighting。不要任何中文。
+
+**输出格式**：只输出 JSON，不要 Markdown 代码块或其他文字：
+{{"book_name": "...", "script": "...", "description": "...", "image_prompt": "..."}}
+
+**书籍内容**：
+{book_content}
+"""
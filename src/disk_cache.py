@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+
+class DiskLRUCache:
+    def __init__(self, cache_dir, max_bytes, name="cache"):
+        """
+        Content-addressed file cache with a size bound and LRU eviction.
+
+        Each entry is a data file (<key>.bin) plus an optional JSON metadata file
+        (<key>.json). Recency is the data file's mtime, bumped on every hit, so the
+        LRU order survives restarts. Writes go through a temp file and os.replace,
+        so concurrent readers never see a partial entry.
+
+        :param cache_dir: Directory holding the entries (created on demand).
+        :param max_bytes: Entries are evicted, least recently used first, beyond this size.
+        :param name: Label used in log messages.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._sizes = None  # key -> bytes on disk, scanned lazily
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Stable key for any JSON-serializable parts (e.g. text, voice, rate, volume).
+        """
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        """
+        Returns the path of the entry's data file, or None. Counts a hit or miss.
+        """
+        path = self._data_path(key)
+        if os.path.exists(path):
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def get(self, key):
+        """
+        Returns the entry's data as bytes, or None.
+        """
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def read_meta(self, key):
+        """
+        Returns the entry's metadata dict ({} if it has none).
+        """
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def put(self, key, data=None, src_path=None, meta=None):
+        """
+        Stores an entry from bytes (data) or by copying a file (src_path), plus optional
+        JSON metadata. Evicts old entries if the cache grows beyond max_bytes.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        size = 0
+        if meta is not None:
+            size += self._write_atomic(self._meta_path(key), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        if src_path is not None:
+            tmp_path = f"{self._data_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, self._data_path(key))
+            size += os.path.getsize(self._data_path(key))
+        else:
+            size += self._write_atomic(self._data_path(key), data)
+
+        with self._lock:
+            sizes = self._scan()
+            sizes[key] = size
+            self._evict(sizes)
+        return self._data_path(key)
+
+    def stats(self):
+        with self._lock:
+            sizes = self._scan()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(sizes),
+                'bytes': sum(sizes.values()),
+            }
+
+    def _evict(self, sizes):
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_age = sorted(sizes, key=lambda k: self._mtime(k))
+        for key in by_age:
+            if total <= self.max_bytes or len(sizes) <= 1:
+                break
+            for path in (self._data_path(key), self._meta_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= sizes.pop(key)
+            self.evictions += 1
+        print(f"{self.name} cache: evicted down to {total / 1e6:.1f} MB ({len(sizes)} entries).")
+
+    def _scan(self):
+        if self._sizes is None:
+            self._sizes = {}
+            if os.path.isdir(self.cache_dir):
+                for file_name in os.listdir(self.cache_dir):
+                    if file_name.endswith(".bin"):
+                        key = file_name[:-4]
+                        size = os.path.getsize(os.path.join(self.cache_dir, file_name))
+                        if os.path.exists(self._meta_path(key)):
+                            size += os.path.getsize(self._meta_path(key))
+                        self._sizes[key] = size
+        return self._sizes
+
+    def _mtime(self, key):
+        try:
+            return os.path.getmtime(self._data_path(key))
+        except OSError:
+            return time.time()
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return len(data)
+
+    def _data_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
@@ -0,0 +1,107 @@
+import os
+import sys
+import subprocess
+import tempfile
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.config import ENCODER_PROFILE, ENCODER_PROFILES
+from moviepy.config import FFMPEG_BINARY
+
+
+def get_encoder_profile(name=None):
+    """
+    Returns the named encoder profile (default: config ENCODER_PROFILE) as a dict.
+    """
+    name = name or ENCODER_PROFILE
+    if name not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile '{name}'. Available: {', '.join(ENCODER_PROFILES)}")
+    profile = dict(ENCODER_PROFILES[name])
+    profile['name'] = name
+    return profile
+
+
+def x264_args(profile):
+    """
+    ffmpeg output arguments for the video stream of a profile.
+    """
+    args = ["-c:v", "libx264", "-preset", profile['preset']]
+    if profile.get('tune'):
+        args += ["-tune", profile['tune']]
+    return args + [
+        "-crf", str(profile['crf']),
+        "-g", str(profile['gop']),
+        "-threads", str(profile['threads']),
+        "-pix_fmt", profile['pix_fmt'],
+        "-movflags", "+faststart",
+    ]
+
+
+def moviepy_write_kwargs(profile):
+    """
+    Keyword arguments for VideoClip.write_videofile.
+    MoviePy always appends its own -pix_fmt, so pix_fmt only applies to the other renderers.
+    """
+    ffmpeg_params = ["-tune", profile['tune']] if profile.get('tune') else []
+    ffmpeg_params += ["-crf", str(profile['crf']), "-g", str(profile['gop']), "-movflags", "+faststart"]
+    return {
+        "codec": "libx264",
+        "preset": profile['preset'],
+        "threads": profile['threads'],
+        "ffmpeg_params": ffmpeg_params,
+    }
+
+
+class RawVideoEncoder:
+    def __init__(self, output_path, size, fps, profile, audiofile=None):
+        """
+        Pipes raw RGB frames into ffmpeg/x264 with the given encoder profile.
+        If audiofile is given it is muxed as-is (stream copy).
+        """
+        width, height = size
+        cmd = [
+            FFMPEG_BINARY, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-vcodec", "rawvideo",
+            "-s", f"{width}x{height}", "-pix_fmt", "rgb24", "-r", f"{fps:.02f}",
+            "-i", "-",
+        ]
+        if audiofile:
+            cmd += ["-i", audiofile, "-map", "0:v", "-map", "1:a", "-c:a", "copy"]
+        cmd += x264_args(profile)
+        cmd += [output_path]
+        # stderr goes to a temp file: a PIPE nobody reads could fill up and stall ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+        self.closed = False
+
+    def write_frame(self, frame):
+        # The frame is C-contiguous uint8, so its buffer goes to the pipe without a copy
+        try:
+            self.proc.stdin.write(memoryview(frame).cast("B"))
+        except (BrokenPipeError, OSError):
+            self._finish()
+            raise IOError(f"ffmpeg encoder failed: {self._error_text()}")
+
+    def close(self):
+        """
+        Finishes the video. Does nothing if the encoder already failed or was closed.
+        """
+        if self.closed:
+            return
+        if self._finish() != 0:
+            raise IOError(f"ffmpeg encoder failed: {self._error_text()}")
+        self._stderr.close()
+
+    def _finish(self):
+        self.closed = True
+        try:
+            self.proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        return self.proc.wait()
+
+    def _error_text(self):
+        self._stderr.seek(0)
+        err = self._stderr.read()
+        self._stderr.close()
+        return err.decode(errors='replace')[-2000:]
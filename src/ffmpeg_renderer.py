@@ -0,0 +1,241 @@
+import os
+import sys
+import subprocess
+import tempfile
+from PIL import Image, ImageColor
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils import load_subtitles
+from src.encoder_profiles import get_encoder_profile, x264_args
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+
+class FFmpegRenderer:
+    def __init__(self, video_gen, fps=24, fontsize=70, color_base='white', color_active='#FFD700', stroke_width=4, stroke_fill='black', encoder_profile=None):
+        """
+        Fast render engine: burns karaoke subtitles with libass in a single ffmpeg call,
+        instead of compositing every frame in Python with MoviePy.
+
+        :param video_gen: VideoGenerator providing the output size, font and line wrapping,
+                          so the ASS layout matches the MoviePy karaoke clips.
+        :param encoder_profile: Encoder profile name (see src/encoder_profiles.py).
+        """
+        self.video_gen = video_gen
+        self.width = video_gen.width
+        self.height = video_gen.height
+        self.fps = fps
+        self.fontsize = fontsize
+        self.color_base = color_base
+        self.color_active = color_active
+        self.stroke_width = stroke_width
+        self.stroke_fill = stroke_fill
+        self.encoder_profile = get_encoder_profile(encoder_profile)
+
+    def render(self, audio_path, output_path, bg_image_path=None, vtt_path=None):
+        """
+        Loops the background image, burns the subtitles and muxes the audio track
+        (VideoGenerator passes the voice premixed with the BGM, see audio_mix.py).
+        Returns True on success.
+        """
+        duration = ffmpeg_parse_infos(audio_path)['duration']
+        subs = load_subtitles(vtt_path) if vtt_path and os.path.exists(vtt_path) else []
+        print(f"Parsed {len(subs)} subtitle lines.")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # ffmpeg runs inside tmp_dir so the ass filter only sees a plain file name
+            # (drive letters and backslashes would need filtergraph escaping).
+            with open(os.path.join(tmp_dir, "subs.ass"), "w", encoding="utf-8") as f:
+                f.write(self.build_ass(subs, duration))
+
+            cmd = self.build_command(audio_path, output_path, duration, bg_image_path)
+            print(f"Running ffmpeg renderer: {' '.join(cmd)}")
+            result = subprocess.run(cmd, cwd=tmp_dir, capture_output=True, text=True, encoding="utf-8", errors="replace")
+            if result.returncode != 0:
+                print(f"Error running ffmpeg: {result.stderr[-2000:]}")
+                return False
+        return True
+
+    def build_command(self, audio_path, output_path, duration, bg_image_path=None):
+        cmd = [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error"]
+
+        # Input 0: background (still image looped, or black)
+        if bg_image_path and os.path.exists(bg_image_path):
+            cmd += ["-loop", "1", "-framerate", str(self.fps), "-i", os.path.abspath(bg_image_path)]
+            with Image.open(bg_image_path) as img:
+                size = img.size
+            if size == (self.width, self.height):
+                video_filter = "[0:v]"
+            else:
+                # Resize to fill screen (crop if necessary), same as the MoviePy path
+                video_filter = (f"[0:v]scale={self.width}:{self.height}:force_original_aspect_ratio=increase,"
+                                f"crop={self.width}:{self.height},")
+        else:
+            cmd += ["-f", "lavfi", "-i", f"color=c=black:s={self.width}x{self.height}:r={self.fps}"]
+            video_filter = "[0:v]"
+
+        ass_filter = "ass=subs.ass"
+        fonts_dir = self._fonts_dir()
+        if fonts_dir:
+            ass_filter += f":fontsdir={self._escape_filter_value(fonts_dir)}"
+        video_filter += f"{ass_filter},format={self.encoder_profile['pix_fmt']}[v]"
+
+        # Input 1: audio
+        cmd += ["-i", os.path.abspath(audio_path)]
+
+        cmd += [
+            "-filter_complex", video_filter,
+            "-map", "[v]", "-map", "1:a",
+            "-r", str(self.fps),
+        ]
+        cmd += x264_args(self.encoder_profile)
+        cmd += [
+            "-c:a", "aac",
+            "-t", f"{duration:.3f}",
+            os.path.abspath(output_path)
+        ]
+        return cmd
+
+    def build_ass(self, subs, duration):
+        """
+        Converts parsed VTT cues into an ASS script with one \\kf karaoke sweep per cue
+        (per word for cues with word timings), going from the base color (SecondaryColour)
+        to the active color (PrimaryColour).
+        """
+        font = self.video_gen._load_font(self.fontsize)
+        font_name, bold = "Microsoft YaHei", True
+        if hasattr(font, "getname"):
+            family, style = font.getname()
+            font_name, bold = family, "Bold" in (style or "")
+        # ASS font size is the line height (ascent + descent), PIL size is the em size
+        ass_size = self.fontsize
+        if getattr(font, "size", None) == self.fontsize:
+            ass_size = sum(font.getmetrics())
+
+        # The MoviePy clip is placed at 0.8 * height, text drawn at (10, 20) inside a
+        # (width - 80) wide image centered horizontally.
+        margin_l = 40 + 10
+        margin_v = int(self.height * 0.8) + 20
+
+        header = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {self.width}",
+            f"PlayResY: {self.height}",
+            "WrapStyle: 2",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+            "Alignment, MarginL, MarginR, MarginV, Encoding",
+            f"Style: Karaoke,{font_name},{ass_size},{self._ass_color(self.color_active)},{self._ass_color(self.color_base)},"
+            f"{self._ass_color(self.stroke_fill)},&H00000000,{-1 if bold else 0},0,0,0,100,100,0,0,1,{self.stroke_width},0,"
+            f"7,{margin_l},{margin_l},{margin_v},1",
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ]
+
+        events = []
+        for sub in subs:
+            start = sub['start']
+            end = min(sub['end'], duration)
+            if start >= end:
+                continue
+            # Pre-wrap with the same measurement as the MoviePy path (libass does not break CJK text)
+            lines = self.video_gen._layout_lines(sub['text'], self.fontsize)
+            karaoke = self._karaoke_text(sub['text'], lines, sub['words']) if sub.get('words') else None
+            if karaoke is None:
+                text = "\\N".join(self._escape_ass_text(line) for line in lines)
+                centis = max(1, int(round((end - start) * 100)))
+                karaoke = f"{{\\kf{centis}}}{text}"
+            events.append(f"Dialogue: 0,{self._ass_time(start)},{self._ass_time(end)},Karaoke,,0,0,0,,{karaoke}")
+
+        return "\n".join(header + events) + "\n"
+
+    def _karaoke_text(self, text, lines, words):
+        """
+        ASS text with one \\kf syllable per spoken word, so libass highlights each word
+        while it is spoken. Pauses become empty \\k syllables, text between words is swept
+        with the following word (trailing punctuation with the last one) and \\N is
+        inserted where the layout wraps.
+        Returns None if the layout cannot be mapped back onto the text.
+        """
+        # Where each wrapped line starts in text (wrapping drops spaces at breaks)
+        line_starts = set()
+        kept = [False] * len(text)
+        pos = 0
+        for i, line in enumerate(lines):
+            start = text.find(line, pos)
+            if start < 0:
+                return None
+            if i > 0:
+                line_starts.add(start)
+            for c in range(start, start + len(line)):
+                kept[c] = True
+            pos = start + len(line)
+
+        def piece(a, b):
+            out = []
+            for c in range(a, b):
+                if c in line_starts:
+                    out.append("\\N")
+                if kept[c]:
+                    out.append(self._escape_ass_text(text[c]))
+            return "".join(out)
+
+        def centis(seconds):
+            return int(round(seconds * 100))
+
+        syllables = []
+        char_pos = 0
+        t = 0.0
+        for offset, duration, char_start, char_end in words:
+            if char_end <= char_pos:
+                continue
+            if centis(offset) > centis(t):
+                syllables.append(f"{{\\k{centis(offset) - centis(t)}}}")
+                t = offset
+            end = max(t, offset + duration)
+            syllables.append(f"{{\\kf{centis(end) - centis(t)}}}{piece(char_pos, char_end)}")
+            char_pos, t = char_end, end
+        if not syllables:
+            return None
+        # Trailing punctuation goes with the last word
+        syllables[-1] += piece(char_pos, len(text))
+        return "".join(syllables)
+
+    def _fonts_dir(self):
+        font = self.video_gen._load_font(self.fontsize)
+        path = getattr(font, "path", None)
+        if isinstance(path, str) and os.path.isabs(path) and os.path.exists(path):
+            return os.path.dirname(path)
+        return None
+
+    @staticmethod
+    def _ass_color(color):
+        # ASS colors are &HAABBGGRR
+        r, g, b = ImageColor.getrgb(color)[:3]
+        return f"&H00{b:02X}{g:02X}{r:02X}"
+
+    @staticmethod
+    def _ass_time(seconds):
+        centis = int(round(seconds * 100))
+        h, rem = divmod(centis, 360000)
+        m, rem = divmod(rem, 6000)
+        s, cs = divmod(rem, 100)
+        return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+    @staticmethod
+    def _escape_ass_text(text):
+        return text.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}")
+
+    @staticmethod
+    def _escape_filter_value(value):
+        # Escaped twice: once for the option value, once for the filtergraph
+        value = value.replace("\\", "/")
+        for char in ":',;[]":
+            value = value.replace(char, "\\\\" + char)
+        return value
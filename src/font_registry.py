@@ -0,0 +1,166 @@
+import os
+import sys
+import shutil
+import subprocess
+import functools
+from PIL import ImageFont
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.config import FONT_PATH, FONT_DIRS, FONT_CACHE_SIZE
+
+# Preferred subtitle fonts, best first (matched against the lower-cased file name)
+PREFERRED_FONTS = [
+    "msyhbd", "msyh", "simhei",                                 # Windows
+    "pingfang", "hiragino sans gb", "stheiti",                  # macOS
+    "notosanscjk", "notosanssc", "sourcehansans",                # Noto / Source Han
+    "wqy-microhei", "wqy-zenhei", "droidsansfallback",          # Linux distros
+]
+# Latin-only fallbacks when no CJK font is installed
+FALLBACK_FONTS = ["arialbd", "arial", "dejavusans-bold", "dejavusans", "liberationsans-bold"]
+FONT_EXTENSIONS = (".ttf", ".ttc", ".otf")
+
+
+class FontRegistry:
+    def __init__(self, font_path=None, font_dirs=None, cache_size=FONT_CACHE_SIZE):
+        """
+        Process-wide font lookup for subtitle rendering.
+
+        System font directories (and fontconfig, if available) are scanned once for a
+        CJK-capable font, and loaded FreeTypeFont objects are cached by (path, size),
+        so rendering a cue never parses a font file again.
+
+        :param font_path: Explicit font file to use (config FONT_PATH).
+        :param font_dirs: Extra directories to scan before the system ones (config FONT_DIRS).
+        :param cache_size: Max number of (path, size) fonts kept loaded.
+        """
+        self.font_path = font_path
+        self.font_dirs = list(font_dirs or [])
+        self._default_path = None
+        self._resolved = False
+        self._load = functools.lru_cache(maxsize=cache_size)(self._load_font)
+
+    def get_font(self, size, path=None):
+        """
+        Returns the (cached) font at the given size. Uses the discovered default font
+        unless a path is given.
+        """
+        path = path or self.default_font_path()
+        return self._load(path, size)
+
+    def default_font_path(self):
+        """
+        Resolves the subtitle font once: explicit FONT_PATH, then the first CJK-capable
+        candidate, then a Latin fallback. Returns None if nothing is installed.
+        """
+        if not self._resolved:
+            self._default_path = self._resolve_default()
+            self._resolved = True
+            print(f"Subtitle font: {self._default_path or 'PIL default'}")
+        return self._default_path
+
+    def _resolve_default(self):
+        if self.font_path:
+            if os.path.exists(self.font_path):
+                return self.font_path
+            print(f"Warning: FONT_PATH {self.font_path} not found, discovering fonts instead.")
+
+        candidates = self.discover()
+        for path in candidates:
+            if self._supports_cjk(path):
+                return path
+
+        print("Warning: No CJK font found, Chinese subtitles will not render correctly. Set FONT_PATH or install fonts-noto-cjk.")
+        for name in FALLBACK_FONTS:
+            for path in candidates:
+                if os.path.splitext(os.path.basename(path))[0].lower() == name:
+                    return path
+        return None
+
+    def discover(self):
+        """
+        Returns candidate font files ranked by PREFERRED_FONTS. Among fonts of the same
+        rank, CJK fonts reported by fontconfig come before scanned files.
+        """
+        fontconfig = self._fontconfig_cjk_fonts()
+        reported = set(fontconfig)
+        seen = set(reported)
+        scanned = []
+        for font_dir in self.font_dirs + self._system_font_dirs():
+            if not os.path.isdir(font_dir):
+                continue
+            for root, _, files in os.walk(font_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if name.lower().endswith(FONT_EXTENSIONS) and path not in seen:
+                        seen.add(path)
+                        scanned.append(path)
+
+        def rank(path):
+            name = os.path.basename(path).lower().replace(" ", "")
+            for i, preferred in enumerate(PREFERRED_FONTS):
+                if preferred.replace(" ", "") in name:
+                    # Bold variants read better over busy backgrounds
+                    return (i, 0 if "bold" in name or name.startswith("msyhbd") else 1, path not in reported)
+            return (len(PREFERRED_FONTS), 0, path not in reported)
+
+        return sorted(fontconfig + scanned, key=rank)
+
+    def _fontconfig_cjk_fonts(self):
+        if not shutil.which("fc-list"):
+            return []
+        try:
+            result = subprocess.run(["fc-list", ":lang=zh", "file"], capture_output=True, text=True, timeout=10)
+        except Exception as e:
+            print(f"fc-list failed: {e}")
+            return []
+        paths = [line.split(":")[0].strip() for line in result.stdout.splitlines() if line.strip()]
+        return sorted(set(p for p in paths if os.path.exists(p)))
+
+    @staticmethod
+    def _system_font_dirs():
+        home = os.path.expanduser("~")
+        if sys.platform.startswith("win"):
+            return [os.path.join(os.environ.get("WINDIR", "C:/Windows"), "Fonts"),
+                    os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts")]
+        if sys.platform == "darwin":
+            return ["/System/Library/Fonts", "/Library/Fonts", os.path.join(home, "Library", "Fonts")]
+        return ["/usr/share/fonts", "/usr/local/share/fonts", os.path.join(home, ".fonts"), os.path.join(home, ".local", "share", "fonts")]
+
+    @staticmethod
+    def _supports_cjk(path):
+        """
+        A font supports CJK if '中' renders differently from a missing glyph.
+        Probe fonts are opened directly so they do not fill the font cache.
+        """
+        try:
+            font = ImageFont.truetype(path, 32)
+            return font.getmask("中").tobytes() != font.getmask("\uffff").tobytes()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _load_font(path, size):
+        if path:
+            try:
+                return ImageFont.truetype(path, size)
+            except Exception as e:
+                print(f"Error loading font {path}: {e}")
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:
+            # Pillow < 10.1 has no sized default font
+            return ImageFont.load_default()
+
+
+_registry = None
+
+
+def get_font_registry():
+    """
+    Returns the process-wide FontRegistry configured from src/config.py.
+    """
+    global _registry
+    if _registry is None:
+        _registry = FontRegistry(font_path=FONT_PATH, font_dirs=FONT_DIRS)
+    return _registry
@@ -0,0 +1,105 @@
+import math
+import asyncio
+import bisect
+import threading
+from concurrent.futures import wait, FIRST_COMPLETED
+
+# Latency histogram buckets: log-spaced, 10% wide, from 10 ms to about 10 minutes
+BUCKET_BOUNDS = [0.01 * 1.1 ** i for i in range(int(math.log(60000) / math.log(1.1)) + 2)]
+
+
+class LatencyHistogram:
+    BOUNDS = BUCKET_BOUNDS
+
+    def __init__(self):
+        """
+        Fixed-size latency histogram. Percentiles are the upper bound of the bucket
+        holding the requested rank (at most 10% above the true value), capped at the
+        largest latency seen.
+        """
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+            self.count += 1
+            self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """
+        Latency in seconds below which p percent of the recorded calls finished (None if empty).
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = math.ceil(self.count * p / 100)
+            seen = 0
+            for i, n in enumerate(self.counts):
+                seen += n
+                if seen >= max(1, rank):
+                    bound = self.BOUNDS[i] if i < len(self.BOUNDS) else self.max
+                    return min(bound, self.max)
+            return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+def hedged_call(executor, primary, secondary, delay):
+    """
+    Runs primary() on the executor; if it has not finished after delay seconds,
+    also runs secondary(). Returns (result, hedged, secondary_won): the first
+    successful result wins. The loser is cancelled if it has not started; a blocking
+    HTTP call that is already running cannot be interrupted, so its result is dropped.
+    Raises the primary's exception if both fail.
+    """
+    first = executor.submit(primary)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result(), False, False
+
+    second = executor.submit(secondary)
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                return future.result(), True, future is second
+    raise first.exception()
+
+
+async def hedged_call_async(primary, secondary, delay):
+    """
+    Coroutine form of hedged_call: primary and secondary are coroutine functions,
+    and the losing request is cancelled (its connection is closed).
+    """
+    tasks = [asyncio.ensure_future(primary())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return tasks[0].result(), False, False
+
+        tasks.append(asyncio.ensure_future(secondary()))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), True, task is tasks[1]
+        raise tasks[0].exception()
+    finally:
+        # Also runs when the caller is cancelled (e.g. by a deadline)
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.config import IMAGE_HTTP_POOL_SIZE, IMAGE_TIMEOUTS
+
+
+class HttpResponse:
+    def __init__(self, status_code, headers, content, url):
+        """
+        Fully read response of AsyncHttpTransport, with the parts of the
+        requests.Response interface the image providers use.
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class HttpTransport:
+    def __init__(self, pool_size=IMAGE_HTTP_POOL_SIZE, timeouts=IMAGE_TIMEOUTS):
+        """
+        Blocking HTTP shared by all image providers: one requests.Session, so
+        connections (and TLS sessions) are kept alive between attempts and between the
+        API call and the image download.
+
+        The pool holds pool_size connections per host and blocks when they are all in
+        use, so many threads generating images at once wait for a connection instead
+        of opening (and leaking) extra sockets.
+
+        :param timeouts: (connect, read) seconds per provider name.
+        """
+        self.timeouts = timeouts
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, url, provider, **kwargs):
+        """
+        requests.Session.request with the provider's timeout unless one is given.
+        """
+        kwargs.setdefault("timeout", self.timeouts.get(provider))
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttpTransport:
+    def __init__(self, pool_size=IMAGE_HTTP_POOL_SIZE, timeouts=IMAGE_TIMEOUTS):
+        """
+        aiohttp counterpart of HttpTransport for keeping several image generations in
+        flight on one event loop. The connector allows pool_size connections per host;
+        further requests queue for a free connection.
+
+        The session is created on first use and bound to that event loop; call
+        `await transport.close()` before the loop ends.
+        """
+        self.pool_size = pool_size
+        self.timeouts = timeouts
+        self._session = None
+
+    async def request(self, method, url, provider, **kwargs):
+        """
+        Sends a request (same keyword arguments as HttpTransport.request: params, json,
+        headers, data, timeout) and returns the fully read HttpResponse.
+        """
+        timeout = kwargs.pop("timeout", self.timeouts.get(provider))
+        if isinstance(timeout, tuple):
+            timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        elif timeout is not None:
+            timeout = aiohttp.ClientTimeout(total=timeout)
+        if "params" in kwargs:
+            kwargs["params"] = {k: str(v) for k, v in kwargs["params"].items()}
+        async with self._get_session().request(method, url, timeout=timeout, **kwargs) as response:
+            content = await response.read()
+            return HttpResponse(response.status, response.headers, content, str(response.url))
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -1,32 +1,97 @@
-import requests
 import os
 import sys
 import base64
 import time
 import random
+import asyncio
+import hashlib
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.config import API_KEY, BASE_URL, IMAGE_MODEL, IMAGE_SIZE, HF_TOKEN, IMAGE_PROVIDER, LOCAL_IMAGE_URL, POLLINATIONS_MODEL
+from src.config import IMAGE_OUTPUT_SIZE, IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_MB, IMAGE_DETERMINISTIC_SEED, IMAGE_FALLBACK_PROVIDERS
+from src.config import IMAGE_CANDIDATES
+from src.http_transport import HttpTransport, AsyncHttpTransport
+from src.disk_cache import DiskLRUCache
+from src.image_router import ProviderRouter
+from src.image_scoring import score_image
 import urllib.parse
 
+HF_INFERENCE_URL = "https://router.huggingface.co/hf-inference/models"
+
+
+class UnexpectedResponse(ValueError):
+    """The provider answered successfully but without an image; retrying will not help."""
+
+
+def fill_frame(image, width, height):
+    """
+    Scales image to fill width x height and center-crops it, like the renderers do
+    with a background image.
+    """
+    scale = max(width / image.width, height / image.height)
+    new_size = (max(width, round(image.width * scale)), max(height, round(image.height * scale)))
+    if new_size != image.size:
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+    left = (image.width - width) // 2
+    top = (image.height - height) // 2
+    return image.crop((left, top, left + width, top + height))
+
+
 class ImageClient:
-    def __init__(self):
+    # Attempts per request; the hosted APIs get retries, local and Pollinations fail fast
+    PROVIDER_ATTEMPTS = {"local": 1, "pollinations": 1, "hf": 3, "siliconflow": 3}
+    # Images per request for providers with a batch_size parameter (the others make one per request)
+    BATCH_LIMITS = {"local": 8, "siliconflow": 4}
+
+    def __init__(self, transport=None, async_transport=None, cache_dir=IMAGE_CACHE_DIR,
+                 cache_max_mb=IMAGE_CACHE_MAX_MB, deterministic_seed=IMAGE_DETERMINISTIC_SEED,
+                 output_size=IMAGE_OUTPUT_SIZE, providers=None, router=None):
+        """
+        :param transport: HttpTransport shared by all providers (default: a new pooled one).
+        :param async_transport: AsyncHttpTransport used by generate_image_async.
+        :param cache_dir: Directory of the generated image cache (None or "" disables it).
+        :param cache_max_mb: Size bound of the cache; least recently used entries are evicted.
+        :param deterministic_seed: Derive the default seed from the prompt instead of drawing
+            a random one, so repeated requests are reproducible and hit the cache.
+        :param output_size: "WxH" size the saved images are fitted to (None or "" keeps
+            the provider's size).
+        :param providers: Provider names in priority order (default: IMAGE_PROVIDER or the
+            auto-detected provider, followed by IMAGE_FALLBACK_PROVIDERS).
+        :param router: ProviderRouter choosing among them (default: one with the config settings).
+        """
+        self.transport = transport or HttpTransport()
+        self.async_transport = async_transport or AsyncHttpTransport()
+        self.cache = DiskLRUCache(cache_dir, cache_max_mb * 1024 * 1024, name="Image") if cache_dir else None
+        self.deterministic_seed = deterministic_seed
+        self.last_report = None
+
         # We can support multiple backends.
         # Priority: Configured IMAGE_PROVIDER > SiliconFlow (via API_KEY) > Hugging Face (via HF_TOKEN)
         
-        self.api_key = API_KEY
-        self.base_url = BASE_URL
         self.model = IMAGE_MODEL
         self.provider = "unknown"
         self.local_url = LOCAL_IMAGE_URL
         self.pollinations_model = POLLINATIONS_MODEL
+        # Base URL and key of the hosted APIs
+        self.endpoints = {
+            "siliconflow": {"base_url": BASE_URL, "api_key": API_KEY},
+            "hf": {"base_url": HF_INFERENCE_URL, "api_key": HF_TOKEN},
+        }
         
         # Parse default image size
         self.default_width, self.default_height = self._parse_image_size(IMAGE_SIZE)
+        self.output_size = self._parse_image_size(output_size) if output_size else None
         
+        if providers:
+            self.providers = list(providers)
+            self.provider = self.providers[0]
+            self.router = router or ProviderRouter(self.providers)
+            return
+
         # 1. Check explicit configuration
         if IMAGE_PROVIDER:
             if IMAGE_PROVIDER.lower() == "local":
@@ -37,38 +102,41 @@ class ImageClient:
                 print(f"Using Pollinations.AI API with model: {self.pollinations_model}")
             elif IMAGE_PROVIDER.lower() == "hf":
                 self.provider = "hf"
-                self.use_hf = True
-                self.api_key = HF_TOKEN
-                self.base_url = "https://router.huggingface.co/hf-inference/models"
                 print(f"Using Hugging Face Inference API for model: {self.model}")
             elif IMAGE_PROVIDER.lower() == "siliconflow":
                 self.provider = "siliconflow"
-                self.use_hf = False
                 print(f"Using SiliconFlow API for model: {self.model}")
         
         # 2. Auto-detect if not set
         if self.provider == "unknown":
-            if self.api_key:
+            if API_KEY:
                 self.provider = "siliconflow"
-                self.use_hf = False
                 print(f"Using SiliconFlow API for model: {self.model}")
             elif HF_TOKEN:
                 self.provider = "hf"
-                self.use_hf = True
-                self.api_key = HF_TOKEN
-                self.base_url = "https://router.huggingface.co/hf-inference/models"
                 print(f"Using Hugging Face Inference API for model: {self.model}")
             else:
                 # Fallback for public HF models
                 if "stabilityai" in IMAGE_MODEL:
                      self.provider = "hf"
-                     self.use_hf = True
-                     self.base_url = "https://router.huggingface.co/hf-inference/models"
                      print(f"Using Public Hugging Face Inference API (No Token) for model: {self.model}")
                 else:
                     # Last resort: try Pollinations if nothing else works? 
                     # For now, stick to explicit configuration to avoid unexpected behavior.
                     raise ValueError("API_KEY (SiliconFlow) or HF_TOKEN not found. Please check your .env file.")
+
+        # 3. Fallbacks the router can send requests to when the main provider is slow or failing
+        self.providers = [self.provider]
+        for provider in IMAGE_FALLBACK_PROVIDERS:
+            if provider not in self.PROVIDER_ATTEMPTS:
+                print(f"Ignoring unknown image provider in IMAGE_FALLBACK_PROVIDERS: {provider}")
+            elif provider == "siliconflow" and not API_KEY:
+                print("Ignoring fallback provider siliconflow: API_KEY is not set.")
+            elif provider not in self.providers:
+                self.providers.append(provider)
+        if len(self.providers) > 1:
+            print(f"Image providers (priority order): {', '.join(self.providers)}")
+        self.router = router or ProviderRouter(self.providers)
     
     def _parse_image_size(self, size_str):
         try:
@@ -92,6 +160,281 @@ class ImageClient:
             guidance_scale (float, optional): Guidance scale.
             seed (int, optional): Random seed.
         """
+        params = self._resolve_params(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale, seed)
+        cacheable = self._cacheable(seed)
+        if cacheable and self._load_cached(prompt, negative_prompt, params, output_path):
+            return True
+        provider, images = self._fetch(prompt, negative_prompt, params)
+        return provider is not None and self._save_result(provider, images[0], output_path, prompt, negative_prompt, params,
+                                                          store=cacheable)
+
+    def generate_images(self, prompt, output_path, n=IMAGE_CANDIDATES, negative_prompt=None, width=None, height=None,
+                        num_inference_steps=None, guidance_scale=None, seed=None):
+        """
+        Generates n candidate images and saves the best one (score_image: sharpness and a
+        dark subtitle band) to output_path. Providers that support it (BATCH_LIMITS)
+        return several candidates per request; the others get parallel single requests
+        with seeds seed, seed+1, ... Batches that fail over to a provider without batching
+        yield fewer candidates. Details of the last call are kept in last_report.
+
+        Takes the same arguments as generate_image; returns True on success.
+        """
+        if n <= 1:
+            return self.generate_image(prompt, output_path, negative_prompt, width, height,
+                                       num_inference_steps, guidance_scale, seed)
+        params = self._resolve_params(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale, seed)
+        cacheable = self._cacheable(seed)
+        if cacheable and self._load_cached(prompt, negative_prompt, params, output_path, best_of=n):
+            return True
+
+        ranking = self.router.ranking()
+        limit = self.BATCH_LIMITS.get(ranking[0] if ranking else self.provider, 1)
+        chunks = [(offset, min(limit, n - offset)) for offset in range(0, n, limit)]
+        print(f"Generating {n} candidates in {len(chunks)} request(s) of up to {limit}...")
+
+        def fetch(chunk):
+            offset, count = chunk
+            chunk_params = params[:4] + ((params[4] + offset) % 2**32,)
+            return self._fetch(prompt, negative_prompt, chunk_params, batch_size=count)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+            results = list(pool.map(fetch, chunks))
+        candidates = [(provider, image_bytes) for provider, images in results for image_bytes in images]
+        fetched = time.perf_counter() - start
+        if not candidates:
+            return False
+
+        frame_size = self.output_size or (params[0], params[1])
+
+        def score(candidate):
+            try:
+                return score_image(candidate[1], frame_size)
+            except Exception as e:
+                print(f"Could not score image candidate: {e}")
+                return None
+
+        # Decoding releases the GIL, so candidates are decoded and scored in parallel
+        with ThreadPoolExecutor(max_workers=min(len(candidates), os.cpu_count() or 1)) as pool:
+            scores = list(pool.map(score, candidates))
+        ranked = sorted((i for i in range(len(candidates)) if scores[i] is not None), key=lambda i: -scores[i]['score'])
+        self.last_report = {
+            'requested': n,
+            'requests': len(chunks),
+            'candidates': len(candidates),
+            'providers': [provider for provider, _ in candidates],
+            'scores': scores,
+            'best': ranked[0] if ranked else None,
+            'fetch_seconds': fetched,
+            'score_seconds': time.perf_counter() - start - fetched,
+        }
+        if not ranked:
+            return False
+        best = ranked[0]
+        print(f"Picked candidate {best + 1}/{len(candidates)} (score {scores[best]['score']:.2f}, "
+              f"sharpness {scores[best]['sharpness']:.0f}, subtitle band luminance {scores[best]['band_luma']:.2f}).")
+        provider, image_bytes = candidates[best]
+        return self._save_result(provider, image_bytes, output_path, prompt, negative_prompt, params, best_of=n, store=cacheable)
+
+    async def generate_image_async(self, prompt, output_path, negative_prompt=None, width=None, height=None,
+                                   num_inference_steps=None, guidance_scale=None, seed=None):
+        """
+        Coroutine version of generate_image on the pooled aiohttp transport, so a batch
+        can keep several generations in flight (e.g. asyncio.gather). Close the
+        transport with `await client.aclose()` before the event loop ends.
+        """
+        params = self._resolve_params(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale, seed)
+        cacheable = self._cacheable(seed)
+        if cacheable and self._load_cached(prompt, negative_prompt, params, output_path):
+            return True
+        provider, images = await self._fetch_async(prompt, negative_prompt, params)
+        return provider is not None and self._save_result(provider, images[0], output_path, prompt, negative_prompt, params,
+                                                          store=cacheable)
+
+    async def aclose(self):
+        await self.async_transport.close()
+
+    def close(self):
+        self.transport.close()
+
+    def _fetch(self, prompt, negative_prompt, params, batch_size=1):
+        """
+        Sends the request to the provider the router picks, retrying and failing over
+        until one returns images. Returns (provider, [image bytes, ...]), or (None, [])
+        when every provider failed.
+        """
+        attempts, exhausted, requests = {}, set(), {}
+        while True:
+            step = self._next_attempt(attempts, exhausted)
+            if step is None:
+                return None, []
+            provider, attempt, delay = step
+            response = None
+            start = time.perf_counter()
+            # The router has reserved the provider (maybe its half-open trial): from here on
+            # every exit has to record an outcome or abandon the request
+            try:
+                if delay:
+                    time.sleep(delay)
+                if provider not in requests:
+                    requests[provider] = self._build_request(provider, prompt, negative_prompt, *params, batch_size=batch_size)
+                start = time.perf_counter()
+                print(f"Requesting {self._provider_label(provider)} (Attempt {attempt+1}/{self.PROVIDER_ATTEMPTS[provider]})...")
+                response = self.transport.request(provider=provider, **requests[provider])
+                response.raise_for_status()
+                items = self._parse_response(provider, response, batch_size)
+                urls = [url for _, url in items if url]
+                if len(urls) > 1:
+                    with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+                        downloads = dict(zip(urls, pool.map(self._download, urls)))
+                else:
+                    downloads = {url: self._download(url) for url in urls}
+                images = [self._check_image(image_bytes if image_bytes is not None else downloads[url]) for image_bytes, url in items]
+            except Exception as e:
+                self.router.record(provider, time.perf_counter() - start, False)
+                self._handle_failure(provider, e, response, attempt, exhausted)
+                continue
+            except BaseException:
+                self.router.abandon(provider)
+                raise
+            self.router.record(provider, time.perf_counter() - start, True)
+            return provider, images
+
+    async def _fetch_async(self, prompt, negative_prompt, params, batch_size=1):
+        """
+        _fetch on the aiohttp transport.
+        """
+        attempts, exhausted, requests = {}, set(), {}
+        while True:
+            step = self._next_attempt(attempts, exhausted)
+            if step is None:
+                return None, []
+            provider, attempt, delay = step
+            response = None
+            start = time.perf_counter()
+            # The router has reserved the provider (maybe its half-open trial): from here on
+            # every exit has to record an outcome or abandon the request
+            try:
+                if delay:
+                    await asyncio.sleep(delay)
+                if provider not in requests:
+                    requests[provider] = self._build_request(provider, prompt, negative_prompt, *params, batch_size=batch_size)
+                start = time.perf_counter()
+                print(f"Requesting {self._provider_label(provider)} (Attempt {attempt+1}/{self.PROVIDER_ATTEMPTS[provider]})...")
+                response = await self.async_transport.request(provider=provider, **requests[provider])
+                response.raise_for_status()
+                items = self._parse_response(provider, response, batch_size)
+                downloads = await asyncio.gather(*[self._download_async(url) for _, url in items if url])
+                downloads = iter(downloads)
+                images = [self._check_image(image_bytes if image_bytes is not None else next(downloads)) for image_bytes, url in items]
+            except Exception as e:
+                self.router.record(provider, time.perf_counter() - start, False)
+                self._handle_failure(provider, e, response, attempt, exhausted)
+                continue
+            except BaseException:
+                self.router.abandon(provider)
+                raise
+            self.router.record(provider, time.perf_counter() - start, True)
+            return provider, images
+
+    def _download(self, url):
+        download = self.transport.request("GET", url, provider="download")
+        download.raise_for_status()
+        return download.content
+
+    async def _download_async(self, url):
+        download = await self.async_transport.request("GET", url, provider="download")
+        download.raise_for_status()
+        return download.content
+
+    @staticmethod
+    def _check_image(image_bytes):
+        """
+        Returns image_bytes if they decode as an image; raises otherwise (a failed attempt),
+        so a truncated or corrupt response is retried.
+        """
+        with Image.open(BytesIO(image_bytes)) as image:
+            image.load()
+        return image_bytes
+
+    def _save_result(self, provider, image_bytes, output_path, prompt, negative_prompt, params, best_of=1, store=True):
+        try:
+            self._save_image(image_bytes, output_path)
+        except Exception as e:
+            print(f"Error saving image from {self._provider_label(provider)}: {e}")
+            return False
+        if store:
+            self._store_cached(provider, image_bytes, prompt, negative_prompt, params, best_of=best_of)
+        return True
+
+    def cache_key(self, provider, prompt, negative_prompt, width, height, steps, scale, seed, best_of=1):
+        """
+        Cache key of a generation: the provider, the model it runs and every parameter
+        that changes the image. best_of > 1 is the pick of generate_images among that many candidates.
+        """
+        parts = [provider, self._model_name(provider), prompt, negative_prompt or "", width, height, steps, scale, seed]
+        if best_of > 1:
+            parts.append(best_of)
+        return DiskLRUCache.make_key(*parts)
+
+    def prompt_seed(self, prompt, negative_prompt=None):
+        """
+        Seed in [0, 2**32) derived from the prompt, used when deterministic_seed is set.
+        """
+        payload = f"{prompt}\n{negative_prompt or ''}".encode("utf-8")
+        return int.from_bytes(hashlib.sha256(payload).digest()[:4], "big")
+
+    def _model_name(self, provider):
+        if provider == "pollinations":
+            return self.pollinations_model
+        if provider == "local":
+            # Whatever checkpoint the WebUI has loaded; the endpoint is the best we know
+            return self.local_url
+        return self.model
+
+    def _cacheable(self, seed):
+        """
+        Only reproducible generations are cached: an explicit seed or one derived from the
+        prompt. A randomly drawn seed asks for a new image, and its entry would never be hit.
+        """
+        return seed is not None or bool(self.deterministic_seed)
+
+    def _load_cached(self, prompt, negative_prompt, params, output_path, best_of=1):
+        """
+        Saves a cached image of any configured provider (in priority order) to output_path.
+        Returns False on a miss.
+        """
+        if not self.cache:
+            return False
+        for provider in self.providers:
+            image_bytes = self.cache.get(self.cache_key(provider, prompt, negative_prompt, *params, best_of=best_of))
+            if image_bytes is None:
+                continue
+            try:
+                self._save_image(image_bytes, output_path)
+            except Exception as e:
+                print(f"Ignoring unreadable image cache entry: {e}")
+                continue
+            print(f"Image cache hit ({provider}; {self.cache.hits} hits, {self.cache.misses} misses).")
+            return True
+        return False
+
+    def _store_cached(self, provider, image_bytes, prompt, negative_prompt, params, best_of=1):
+        if not self.cache:
+            return
+        width, height, steps, scale, seed = params
+        try:
+            self.cache.put(self.cache_key(provider, prompt, negative_prompt, *params, best_of=best_of), data=image_bytes, meta={
+                'provider': provider, 'model': self._model_name(provider), 'prompt': prompt,
+                'width': width, 'height': height, 'steps': steps, 'scale': scale, 'seed': seed, 'best_of': best_of,
+            })
+        except OSError as e:
+            print(f"Could not write image cache entry: {e}")
+
+    def _resolve_params(self, prompt, negative_prompt, width, height, num_inference_steps, guidance_scale, seed):
+        """
+        Applies the defaults; returns (width, height, steps, scale, seed).
+        """
         # Use defaults if not provided
         width = width or self.default_width
         height = height or self.default_height
@@ -102,21 +445,121 @@ class ImageClient:
         scale = guidance_scale or 7.5
         
         if seed is None:
-            seed = random.randint(0, 2**32 - 1)
+            if self.deterministic_seed:
+                seed = self.prompt_seed(prompt, negative_prompt)
+            else:
+                seed = random.randint(0, 2**32 - 1)
+        return width, height, steps, scale, seed
 
+    def _next_attempt(self, attempts, exhausted):
+        """
+        Asks the router for the provider of the next attempt of a request. attempts counts
+        the attempts per provider so far; providers out of attempts go into exhausted.
+        Returns (provider, attempt, backoff delay) or None when no provider is left.
+        """
+        provider = self.router.choose(exclude=exhausted)
+        if provider is None:
+            return None
+        attempt = attempts.get(provider, 0)
+        attempts[provider] = attempt + 1
+        if attempts[provider] >= self.PROVIDER_ATTEMPTS[provider]:
+            exhausted.add(provider)
+        # Only retries of the same provider wait; switching providers does not
+        delay = self.router.backoff(attempt - 1) if attempt else 0
+        return provider, attempt, delay
+
+    def _build_request(self, provider, prompt, negative_prompt, width, height, steps, scale, seed, batch_size=1):
+        """
+        Returns the provider's HTTP request as keyword arguments for the transports
+        (method, url, params/json, headers). batch_size is capped at the provider's
+        BATCH_LIMITS entry.
+        """
+        batch_size = self._batch_size(provider, batch_size)
         print(f"Generating image with model {self.model}...")
-        print(f"Size: {width}x{height}, Steps: {steps}, Scale: {scale}, Seed: {seed}")
+        print(f"Size: {width}x{height}, Steps: {steps}, Scale: {scale}, Seed: {seed}"
+              + (f", Batch: {batch_size}" if batch_size > 1 else ""))
         
-        if self.provider == "local":
-            return self._generate_image_local(prompt, output_path, negative_prompt, width, height, steps, scale, seed)
-        elif self.provider == "pollinations":
-            return self._generate_image_pollinations(prompt, output_path, negative_prompt, width, height, steps, scale, seed)
-        elif self.provider == "hf":
-            return self._generate_image_hf(prompt, output_path, negative_prompt, width, height, steps, scale, seed)
+        if provider == "local":
+            return self._request_local(prompt, negative_prompt, width, height, steps, scale, seed, batch_size)
+        elif provider == "pollinations":
+            return self._request_pollinations(prompt, negative_prompt, width, height, steps, scale, seed)
+        elif provider == "hf":
+            return self._request_hf(prompt, negative_prompt, width, height, steps, scale, seed)
+        else:
+            return self._request_siliconflow(prompt, negative_prompt, width, height, steps, scale, seed, batch_size)
+
+    def _batch_size(self, provider, batch_size):
+        return max(1, min(batch_size, self.BATCH_LIMITS.get(provider, 1)))
+
+    def _parse_response(self, provider, response, batch_size=1):
+        """
+        Returns one (image_bytes, None) or (None, url) item per image; url items have to
+        be downloaded. Raises UnexpectedResponse if the response holds no image.
+        """
+        if provider == "local":
+            data = response.json()
+            # A1111 returns {"images": ["base64string", ...]}; with "return grid" enabled the
+            # grid comes first, so the batch is the last batch_size images
+            if 'images' in data and len(data['images']) > 0:
+                return [(base64.b64decode(image), None) for image in data['images'][-self._batch_size(provider, batch_size):]]
+            raise UnexpectedResponse(f"Unexpected local response format: {data.keys()}")
+        elif provider in ("pollinations", "hf"):
+            # Response is the image binary directly
+            return [(response.content, None)]
         else:
-            return self._generate_image_siliconflow(prompt, output_path, negative_prompt, width, height, steps, scale, seed)
+            data = response.json()
+            items = []
+            for image_data in data.get('data') or []:
+                if 'url' in image_data:
+                    items.append((None, image_data['url']))
+                elif 'b64_json' in image_data:
+                    items.append((base64.b64decode(image_data['b64_json']), None))
+            if items:
+                return items
+            raise UnexpectedResponse(f"Unexpected response format: {data}")
 
-    def _generate_image_pollinations(self, prompt, output_path, negative_prompt, width, height, steps, scale, seed):
+    def _save_image(self, image_bytes, output_path):
+        """
+        Writes the provider's bytes unchanged when they already are in the output file's
+        format (by extension) and at output_size; they are decoded first, so a truncated
+        or corrupt image raises instead of being written. Otherwise the image is decoded
+        once, fitted to output_size and encoded in the output format.
+        """
+        # Image.open only parses the header; pixels are decoded on first access
+        with Image.open(BytesIO(image_bytes)) as image:
+            output_format = Image.registered_extensions().get(os.path.splitext(output_path)[1].lower())
+            if image.format == output_format and self.output_size in (None, image.size):
+                self._check_image(image_bytes)
+                with open(output_path, "wb") as f:
+                    f.write(image_bytes)
+                print(f"Image saved to {output_path} ({image.format} {image.width}x{image.height}, written as is)")
+                return
+
+            source = f"{image.format} {image.width}x{image.height}"
+            if output_format == "JPEG" and image.mode != "RGB":
+                image = image.convert("RGB")
+            if self.output_size:
+                image = fill_frame(image, *self.output_size)
+            image.save(output_path, format=output_format, **({"quality": 95} if output_format == "JPEG" else {}))
+            print(f"Image saved to {output_path} ({source} -> {output_format or 'default'} {image.width}x{image.height})")
+
+    def _handle_failure(self, provider, error, response, attempt, exhausted):
+        """
+        Logs a failed attempt. A response without an image is not retried on that provider.
+        """
+        print(f"Error generating image ({self._provider_label(provider)}) attempt {attempt+1}: {error}")
+        if response is not None:
+            print(f"Response content: {response.text[:200]}")
+        if isinstance(error, UnexpectedResponse):
+            exhausted.add(provider)
+        if provider == "local" and provider in exhausted:
+            # Help user debug connection
+            print("Tip: Ensure your local Stable Diffusion WebUI is running with '--api' flag.")
+
+    def _provider_label(self, provider):
+        return {"local": "Local API", "pollinations": "Pollinations.AI", "hf": "HF API"}.get(provider, "SiliconFlow API")
+
+    def _request_pollinations(self, prompt, negative_prompt, width, height, steps, scale, seed):
         """
         Generate image using Pollinations.AI API (Free, No Key).
         URL Format: https://image.pollinations.ai/prompt/{prompt}?width={width}&height={height}&model={model}&nologo=true&seed={seed}
@@ -145,28 +588,14 @@ class ImageClient:
         
         # Pollinations usually doesn't strictly support 'steps' or 'guidance' in the GET API for all models,
         # but we can try passing them if they update their API. For now, we stick to core params.
-        
-        try:
-            print(f"Requesting Pollinations.AI: {url} with params {params}")
-            response = requests.get(url, params=params, timeout=60) # Generative AI can be slow
-            response.raise_for_status()
-            
-            # Response is the image binary directly
-            image = Image.open(BytesIO(response.content))
-            image.save(output_path)
-            print(f"Image saved to {output_path}")
-            return True
-            
-        except Exception as e:
-            print(f"Error generating image (Pollinations): {e}")
-            return False
+        print(f"Pollinations.AI request: {url} with params {params}")
+        return {"method": "GET", "url": url, "params": params}
 
-    def _generate_image_local(self, prompt, output_path, negative_prompt, width, height, steps, scale, seed):
+    def _request_local(self, prompt, negative_prompt, width, height, steps, scale, seed, batch_size=1):
         """
         Generate image using local Stable Diffusion API (Automatic1111 / ComfyUI / SD.Next).
         Targeting /sdapi/v1/txt2img endpoint.
         """
-        url = self.local_url
         headers = {"Content-Type": "application/json"}
         
         # A1111 payload
@@ -179,42 +608,16 @@ class ImageClient:
             "cfg_scale": scale,
             "seed": seed,
             "sampler_name": "Euler a", # Configurable?
-            "batch_size": 1
+            "batch_size": batch_size
         }
+        return {"method": "POST", "url": self.local_url, "json": payload, "headers": headers}
 
-        try:
-            print(f"Requesting Local API at {url}...")
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # A1111 returns {"images": ["base64string", ...]}
-            if 'images' in data and len(data['images']) > 0:
-                img_data = data['images'][0]
-                img_bytes = base64.b64decode(img_data)
-                image = Image.open(BytesIO(img_bytes))
-                image.save(output_path)
-                print(f"Image saved to {output_path}")
-                return True
-            else:
-                print(f"Unexpected local response format: {data.keys()}")
-                return False
-                
-        except Exception as e:
-            print(f"Error generating image (Local): {e}")
-            if 'response' in locals() and response is not None:
-                print(f"Response: {response.text[:200]}")
-            
-            # Help user debug connection
-            print("Tip: Ensure your local Stable Diffusion WebUI is running with '--api' flag.")
-            return False
-
-    def _generate_image_hf(self, prompt, output_path, negative_prompt, width, height, steps, scale, seed):
-        url = f"{self.base_url}/{self.model}"
+    def _request_hf(self, prompt, negative_prompt, width, height, steps, scale, seed):
+        endpoint = self.endpoints["hf"]
+        url = f"{endpoint['base_url']}/{self.model}"
         headers = {"Content-Type": "application/json"}
-        if self.api_key:
-            headers["Authorization"] = f"Bearer {self.api_key}"
+        if endpoint["api_key"]:
+            headers["Authorization"] = f"Bearer {endpoint['api_key']}"
         
         # HF Inference API payload
         payload = {
@@ -228,38 +631,14 @@ class ImageClient:
                 "seed": seed
             }
         }
-        
-        # Retry loop
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                print(f"Requesting HF API (Attempt {attempt+1}/{max_retries})...")
-                response = requests.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                
-                # HF returns raw bytes for image usually
-                image = Image.open(BytesIO(response.content))
-                image.save(output_path)
-                print(f"Image saved to {output_path}")
-                return True
-            except Exception as e:
-                print(f"Error generating image (HF) attempt {attempt+1}: {e}")
-                if 'response' in locals() and response is not None:
-                    try:
-                        print(f"Response error: {response.json()}")
-                    except:
-                        print(f"Response content: {response.text}")
-                
-                if attempt < max_retries - 1:
-                    time.sleep(2) # Wait before retry
-                else:
-                    return False
+        return {"method": "POST", "url": url, "json": payload, "headers": headers}
 
-    def _generate_image_siliconflow(self, prompt, output_path, negative_prompt, width, height, steps, scale, seed):
-        url = f"{self.base_url}/images/generations"
+    def _request_siliconflow(self, prompt, negative_prompt, width, height, steps, scale, seed, batch_size=1):
+        endpoint = self.endpoints["siliconflow"]
+        url = f"{endpoint['base_url']}/images/generations"
         
         headers = {
-            "Authorization": f"Bearer {self.api_key}",
+            "Authorization": f"Bearer {endpoint['api_key']}",
             "Content-Type": "application/json"
         }
         
@@ -267,7 +646,7 @@ class ImageClient:
             "model": self.model,
             "prompt": prompt,
             "image_size": f"{width}x{height}",
-            "batch_size": 1,
+            "batch_size": batch_size,
             "num_inference_steps": steps, 
             "guidance_scale": scale,
             "seed": seed
@@ -275,49 +654,7 @@ class ImageClient:
         
         if negative_prompt:
             payload["negative_prompt"] = negative_prompt
-        
-        # Retry loop
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                print(f"Requesting SiliconFlow API (Attempt {attempt+1}/{max_retries})...")
-                response = requests.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if 'data' in data and len(data['data']) > 0:
-                    image_data = data['data'][0]
-                    
-                    if 'url' in image_data:
-                        image_url = image_data['url']
-                        img_response = requests.get(image_url)
-                        image = Image.open(BytesIO(img_response.content))
-                        image.save(output_path)
-                        print(f"Image saved to {output_path}")
-                        return True
-                    elif 'b64_json' in image_data:
-                        img_bytes = base64.b64decode(image_data['b64_json'])
-                        image = Image.open(BytesIO(img_bytes))
-                        image.save(output_path)
-                        print(f"Image saved to {output_path}")
-                        return True
-                
-                print(f"Unexpected response format: {data}")
-                return False
-                
-            except Exception as e:
-                print(f"Error generating image (SF) attempt {attempt+1}: {e}")
-                if 'response' in locals() and response is not None:
-                    try:
-                        print(f"Response content: {response.text}")
-                    except:
-                        pass
-                
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                else:
-                    return False
+        return {"method": "POST", "url": url, "json": payload, "headers": headers}
 
 if __name__ == "__main__":
     # Test stub
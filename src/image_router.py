@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import random
+import threading
+from collections import deque
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.config import (IMAGE_BREAKER_FAILURES, IMAGE_BREAKER_RESET, IMAGE_ROUTER_WINDOW,
+                        IMAGE_RETRY_BASE_DELAY, IMAGE_RETRY_MAX_DELAY)
+from src.hedging import LatencyHistogram
+
+# A provider failing more than this share of its recent requests is ranked after untried ones
+DEGRADED_ERROR_RATE = 0.5
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=IMAGE_BREAKER_FAILURES, reset_timeout=IMAGE_BREAKER_RESET, clock=time.monotonic):
+        """
+        Opens after failure_threshold consecutive failures; no requests are let through
+        for reset_timeout seconds. Then one trial request is allowed (half-open): success
+        closes the breaker, failure opens it again.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.opens = 0
+        self._trial_running = False
+
+    def available(self):
+        """
+        True if a request may be sent now (does not reserve the half-open trial).
+        """
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            return not self._trial_running
+        return self.state == self.CLOSED
+
+    def acquire(self):
+        """
+        Like available, but a half-open breaker lets only this caller through until
+        its result is recorded.
+        """
+        if not self.available():
+            return False
+        if self.state == self.HALF_OPEN:
+            self._trial_running = True
+        return True
+
+    def record_success(self):
+        """
+        Returns True if this closed an open or half-open breaker.
+        """
+        reopened = self.state != self.CLOSED
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_running = False
+        return reopened
+
+    def release(self):
+        """
+        Frees the half-open trial of a request that ended without an outcome (cancelled).
+        """
+        self._trial_running = False
+
+    def record_failure(self):
+        """
+        Returns True if this opened the breaker.
+        """
+        self.consecutive_failures += 1
+        self._trial_running = False
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+            self.opens += 1
+            return True
+        return False
+
+
+class ProviderStats:
+    def __init__(self, window=IMAGE_ROUTER_WINDOW):
+        """
+        Outcomes of a provider's last `window` requests (for routing) plus totals and a
+        latency histogram of successful requests (for the metrics dump).
+        """
+        self.recent = deque(maxlen=window)  # (seconds, ok)
+        self.requests = 0
+        self.failures = 0
+        self.routed = 0
+        self.latency = LatencyHistogram()
+
+    def record(self, seconds, ok):
+        self.recent.append((seconds, ok))
+        self.requests += 1
+        if ok:
+            self.latency.record(seconds)
+        else:
+            self.failures += 1
+
+    def error_rate(self):
+        if not self.recent:
+            return 0.0
+        return sum(1 for _, ok in self.recent if not ok) / len(self.recent)
+
+    def median_latency(self):
+        """
+        Median latency of the recent successful requests (None if there is none).
+        """
+        latencies = sorted(seconds for seconds, ok in self.recent if ok)
+        if not latencies:
+            return None
+        return latencies[len(latencies) // 2]
+
+
+class ProviderRouter:
+    def __init__(self, providers, failure_threshold=IMAGE_BREAKER_FAILURES, reset_timeout=IMAGE_BREAKER_RESET,
+                 window=IMAGE_ROUTER_WINDOW, base_delay=IMAGE_RETRY_BASE_DELAY, max_delay=IMAGE_RETRY_MAX_DELAY,
+                 clock=time.monotonic):
+        """
+        Picks the image provider for each request from a priority-ordered list.
+
+        Providers whose circuit breaker is open are skipped. The others are ranked:
+        1. healthy providers with recent successes, fastest first. The score is the
+           median latency divided by the success rate.
+        2. untried providers, in priority order.
+        3. degraded providers (more than half of the recent requests failed), lowest
+           error rate first.
+
+        :param providers: Provider names, highest priority first.
+        :param window: Number of recent requests per provider the ranking looks at.
+        :param base_delay: First retry delay; doubled per retry up to max_delay, with full jitter.
+        """
+        self.providers = list(providers)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breakers = {p: CircuitBreaker(failure_threshold, reset_timeout, clock) for p in self.providers}
+        self.stats = {p: ProviderStats(window) for p in self.providers}
+        self._lock = threading.Lock()
+
+    def choose(self, exclude=()):
+        """
+        Returns the best available provider not in exclude and counts it as routed,
+        or None if every candidate's breaker is open.
+        """
+        with self._lock:
+            candidates = [p for p in self._ranked() if p not in exclude]
+            for provider in candidates:
+                if self.breakers[provider].acquire():
+                    self.stats[provider].routed += 1
+                    skipped = [p for p in self.providers if p not in exclude and not self.breakers[p].available() and p != provider]
+                    print(f"Image router: {provider} ({self._describe(provider)})"
+                          + (f"; circuit open: {', '.join(skipped)}" if skipped else ""))
+                    return provider
+            if any(p not in exclude for p in self.providers):
+                print("Image router: every remaining provider has an open circuit breaker.")
+            return None
+
+    def ranking(self):
+        """
+        Available providers, best first: the order choose would try them in (nothing is reserved).
+        """
+        with self._lock:
+            return [p for p in self._ranked() if self.breakers[p].available()]
+
+    def record(self, provider, seconds, ok):
+        """
+        Records the outcome of a request to provider.
+        """
+        with self._lock:
+            self.stats[provider].record(seconds, ok)
+            breaker = self.breakers[provider]
+            if ok:
+                if breaker.record_success():
+                    print(f"Image router: circuit closed for {provider}.")
+            elif breaker.record_failure():
+                print(f"Image router: circuit opened for {provider} after {breaker.consecutive_failures} "
+                      f"consecutive failures; retry in {breaker.reset_timeout:.0f}s.")
+
+    def abandon(self, provider):
+        """
+        For a request to provider that was cancelled: records no outcome, but lets the
+        next request through if it held the half-open trial.
+        """
+        with self._lock:
+            self.breakers[provider].release()
+
+    def backoff(self, retry):
+        """
+        Seconds to wait before retry number `retry` (0-based) of the same provider:
+        exponential with full jitter.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def metrics(self):
+        """
+        Per-provider snapshot: breaker state, totals, recent error rate and latency percentiles.
+        """
+        with self._lock:
+            metrics = {}
+            for provider in self.providers:
+                stats, breaker = self.stats[provider], self.breakers[provider]
+                breaker.available()  # move an expired open breaker to half-open
+                metrics[provider] = {
+                    'state': breaker.state,
+                    'breaker_opens': breaker.opens,
+                    'routed': stats.routed,
+                    'requests': stats.requests,
+                    'failures': stats.failures,
+                    'recent_error_rate': stats.error_rate(),
+                    'recent_median_latency': stats.median_latency(),
+                    'latency': stats.latency.summary(),
+                }
+            return metrics
+
+    def dump_metrics(self, path):
+        """
+        Writes metrics() as JSON to path.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({'providers': self.providers, 'metrics': self.metrics()}, f, ensure_ascii=False, indent=2)
+
+    def _ranked(self):
+        healthy, untried, degraded = [], [], []
+        for priority, provider in enumerate(self.providers):
+            stats = self.stats[provider]
+            latency = stats.median_latency()
+            error_rate = stats.error_rate()
+            if error_rate > DEGRADED_ERROR_RATE:
+                degraded.append((error_rate, priority, provider))
+            elif latency is None:
+                untried.append((priority, provider))
+            else:
+                healthy.append((latency / (1 - error_rate), priority, provider))
+        return [p for *_, p in sorted(healthy)] + [p for _, p in sorted(untried)] + [p for *_, p in sorted(degraded)]
+
+    def _describe(self, provider):
+        stats = self.stats[provider]
+        latency = stats.median_latency()
+        latency = f"p50 {latency:.1f}s" if latency is not None else "no latency yet"
+        failed = sum(1 for _, ok in stats.recent if not ok)
+        return f"{latency}, {failed}/{len(stats.recent)} recent failures, breaker {self.breakers[provider].state}"
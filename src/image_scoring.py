@@ -0,0 +1,39 @@
+import math
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageOps
+
+# Vertical span of the frame (fractions of the height) where the subtitles are drawn:
+# cues are placed at 0.8 * height and are one or two lines tall
+SUBTITLE_BAND = (0.78, 0.95)
+# Candidates are scored on a small grayscale copy of the final frame crop
+SCORE_WIDTH = 270
+# Score penalty for a fully white subtitle band; white subtitles read best on dark backgrounds
+BAND_LUMA_WEIGHT = 2.0
+
+
+def score_image(image_bytes, frame_size=(1080, 1920), band=SUBTITLE_BAND):
+    """
+    Cheap quality score of a candidate background: sharpness (variance of the
+    Laplacian, log-scaled) minus a penalty for a bright subtitle band. Computed on a
+    SCORE_WIDTH-wide grayscale version of the frame_size crop the video will show.
+    Returns {'sharpness', 'band_luma' (0-1), 'score'}; higher scores are better.
+    """
+    width, height = frame_size
+    size = (SCORE_WIDTH, max(1, round(SCORE_WIDTH * height / width)))
+    with Image.open(BytesIO(image_bytes)) as image:
+        # JPEG decoders can skip most of the work at a reduced scale
+        image.draft("L", (size[0] * 2, size[1] * 2))
+        gray = ImageOps.fit(image.convert("L"), size, Image.Resampling.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.float32)
+
+    laplacian = (pixels[1:-1, :-2] + pixels[1:-1, 2:] + pixels[:-2, 1:-1] + pixels[2:, 1:-1]
+                 - 4 * pixels[1:-1, 1:-1])
+    sharpness = float(laplacian.var())
+    top, bottom = int(size[1] * band[0]), max(int(size[1] * band[0]) + 1, int(size[1] * band[1]))
+    band_luma = float(pixels[top:bottom].mean()) / 255
+    return {
+        'sharpness': sharpness,
+        'band_luma': band_luma,
+        'score': math.log1p(sharpness) - BAND_LUMA_WEIGHT * band_luma,
+    }
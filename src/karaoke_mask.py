@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class WordTiming:
+    def __init__(self, words, char_columns):
+        """
+        Reveal position of a cue from its spoken words instead of a linear wipe.
+
+        :param words: [offset, duration, char_start, char_end] per word, relative to the cue start.
+        :param char_columns: Column (x in the sprite) of every character boundary of the cue
+                             text, len(text) + 1 entries.
+        Each word sweeps from where the previous one ended to the end of its last character;
+        the last word also covers any trailing punctuation.
+        """
+        self.starts = np.array([word[0] for word in words], dtype=float)
+        self.ends = np.array([word[0] + word[1] for word in words], dtype=float)
+        col_end = [char_columns[word[3]] for word in words]
+        col_end[-1] = char_columns[-1]
+        self.col_end = np.maximum.accumulate(np.array(col_end, dtype=float))
+        self.col_start = np.concatenate([[0.0], self.col_end[:-1]])
+
+    def reveal_column(self, t):
+        """
+        Binary search for the word being spoken at t, interpolated within the word.
+        """
+        k = int(np.searchsorted(self.starts, t, side='right')) - 1
+        if k < 0:
+            return 0
+        if t >= self.ends[k]:
+            return int(self.col_end[k])
+        progress = (t - self.starts[k]) / (self.ends[k] - self.starts[k])
+        return int(self.col_start[k] + (self.col_end[k] - self.col_start[k]) * progress)
+
+
+class KaraokeMask:
+    def __init__(self, alpha, duration, timing=None):
+        """
+        Wipe mask for karaoke subtitles, revealing the active text from left to right.
+
+        The text alpha is converted once and every frame is written into one reused buffer,
+        so rendering a cue no longer allocates a fresh (H, W) array per frame.
+
+        :param alpha: Alpha channel of the text image, uint8 (H, W).
+        :param duration: Duration of the cue in seconds.
+        :param timing: Optional WordTiming; the reveal then follows the spoken words.
+        """
+        # Keep float64: MoviePy scales masks by 255 and truncates to uint8, and
+        # float32 values would round differently from the original wipe.
+        self.alpha = alpha.astype(float) / 255.0
+        self.h, self.w = self.alpha.shape
+        self.duration = duration
+        self.timing = timing
+        self._frame = np.zeros_like(self.alpha)
+        self._reveal = 0
+
+    def reveal_column(self, t):
+        """
+        Returns the number of columns revealed at time t: from the word timings if
+        available, otherwise the linear wipe over the cue duration.
+        """
+        if self.timing is not None:
+            return max(0, min(self.w, self.timing.reveal_column(t)))
+        if self.duration <= 0: progress = 1.0
+        else: progress = t / self.duration
+        progress = max(0.0, min(1.0, progress))
+        return int(self.w * progress)
+
+    def make_mask(self, t):
+        """
+        MoviePy frame function. Only the columns between the previous and the current
+        reveal position are touched, so a monotonic timeline copies each column once.
+        The returned buffer is reused and is only valid until the next call.
+        """
+        reveal = self.reveal_column(t)
+        if reveal > self._reveal:
+            self._frame[:, self._reveal:reveal] = self.alpha[:, self._reveal:reveal]
+        elif reveal < self._reveal:
+            # Seeking backwards (e.g. preview): hide the columns again
+            self._frame[:, reveal:self._reveal] = 0.0
+        self._reveal = reveal
+        return self._frame
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+class LLMCacheMiss(KeyError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+class LLMCache:
+    def __init__(self, path, ttl=0, max_entries=5000, replay=False):
+        """
+        SQLite cache of LLM responses, keyed by a fingerprint of the request
+        (model, temperature, max_tokens and the messages).
+
+        :param path: SQLite database file (":memory:" for a throwaway cache).
+        :param ttl: Seconds a response stays valid (0 = forever).
+        :param max_entries: Least recently used responses are deleted beyond this count.
+        :param replay: Deterministic replay: only recorded responses are returned, TTL is
+                       ignored and a miss raises LLMCacheMiss instead of calling the API.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.replay = replay
+        self._stats = {}  # method -> {'hits': n, 'misses': n}
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, method TEXT, response TEXT, created REAL, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, temperature, max_tokens, messages, response_format=None):
+        """
+        Fingerprint of a chat completion request. Byte-identical prompts give the same key.
+        """
+        request = {
+            'model': model,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'messages': messages,
+        }
+        if response_format is not None:
+            request['response_format'] = response_format
+        payload = json.dumps(request, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, method="call"):
+        """
+        Returns the cached response or None (LLMCacheMiss in replay mode).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl and not self.replay and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            stats = self._stats.setdefault(method, {'hits': 0, 'misses': 0})
+            if row is None:
+                stats['misses'] += 1
+            else:
+                stats['hits'] += 1
+                self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+
+        if row is None:
+            if self.replay:
+                raise LLMCacheMiss(f"No recorded LLM response for {method} ({key[:12]})")
+            return None
+        return row[0]
+
+    def put(self, key, response, method="call"):
+        """
+        Stores a response and trims the cache to max_entries.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, method, response, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, method, response, now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Per-method hit/miss counts and hit rate of this process.
+        """
+        with self._lock:
+            return {
+                method: dict(counts, hit_rate=counts['hits'] / max(1, counts['hits'] + counts['misses']))
+                for method, counts in self._stats.items()
+            }
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,41 +1,267 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient, DEFAULT_CONNECTION_LIMITS
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import asyncio
+import json
 import os
+import re
 import sys
+import time
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.config import API_KEY, BASE_URL, MODEL_NAME, SCRIPT_GENERATION_PROMPT, IMAGE_PROMPT_GENERATION_PROMPT, SCRIPT_GENERATION_FROM_SUMMARY_PROMPT, BOOK_NAME_EXTRACTION_PROMPT, DOUYIN_DESCRIPTION_PROMPT
+from src.config import LLM_CACHE_PATH, LLM_CACHE_TTL_HOURS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_REPLAY
+from src.config import LLM_CONCURRENCY, LLM_TIMEOUT, BOOK_PACKAGE_PROMPT, CHUNK_SUMMARY_PROMPT, SUMMARY_REDUCE_PROMPT
+from src.config import LLM_HEDGE, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_DELAY
+from src.config import LLM_SECONDARY_BASE_URL, LLM_SECONDARY_MODEL, LLM_SECONDARY_API_KEY
+from src.llm_cache import LLMCache, LLMCacheMiss
+from src.hedging import LatencyHistogram, hedged_call, hedged_call_async
+from src.utils import clean_script
 
-class LLMClient:
-    def __init__(self):
-        if not API_KEY:
+TEMPERATURE = 0.7
+MAX_TOKENS = 2000
+# The combined response carries the script plus three short fields
+BOOK_PACKAGE_MAX_TOKENS = 3000
+BOOK_PACKAGE_FIELDS = ["book_name", "script", "description", "image_prompt"]
+# Recent (seconds, completion tokens) samples the per-request overhead is fitted to
+REQUEST_SAMPLES = 200
+
+# Subset of JSON Schema checked by validate_fields (type, minLength, maxLength, pattern)
+BOOK_PACKAGE_SCHEMA = {
+    "type": "object",
+    "required": BOOK_PACKAGE_FIELDS,
+    "properties": {
+        "book_name": {"type": "string", "minLength": 1, "maxLength": 60, "pattern": r"^[^\n]+$"},
+        "script": {"type": "string", "minLength": 200},
+        "description": {"type": "string", "minLength": 10, "pattern": r"#\S"},
+        "image_prompt": {"type": "string", "minLength": 10, "pattern": r"^[^\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]*[A-Za-z][^\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]*$"},
+    }
+}
+
+
+def parse_json_object(text):
+    """
+    Parses the JSON object in an LLM response, tolerating Markdown code fences and
+    text around the object. Returns a dict or None.
+    """
+    if not text:
+        return None
+    text = text.strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.S)
+    if fenced:
+        text = fenced.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        obj = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def validate_fields(obj, schema):
+    """
+    Checks each property of obj against the schema.
+    Returns (valid, errors): the values that passed and field -> reason for the rest.
+    """
+    valid, errors = {}, {}
+    obj = obj if isinstance(obj, dict) else {}
+    for field, rules in schema["properties"].items():
+        value = obj.get(field)
+        if value is None:
+            errors[field] = "missing"
+            continue
+        if rules.get("type") == "string":
+            if not isinstance(value, str):
+                errors[field] = f"expected string, got {type(value).__name__}"
+                continue
+            value = value.strip()
+            if len(value) < rules.get("minLength", 0):
+                errors[field] = f"shorter than {rules['minLength']} characters"
+                continue
+            if "maxLength" in rules and len(value) > rules["maxLength"]:
+                errors[field] = f"longer than {rules['maxLength']} characters"
+                continue
+            if "pattern" in rules and not re.search(rules["pattern"], value):
+                errors[field] = "does not match the expected format"
+                continue
+        valid[field] = value
+    return valid, errors
+
+
+class _CachedLLM:
+    """
+    Cache, latency and request plumbing shared by LLMClient and AsyncLLMClient.
+    """
+    def __init__(self, cache=None, hedge=LLM_HEDGE, client=None, stats_from=None):
+        """
+        :param cache: LLMCache to use (default: from the LLM_CACHE_* settings; False disables caching).
+        :param hedge: Send a duplicate request when a call is slower than the
+                      LLM_HEDGE_PERCENTILE latency of its method (see hedging.py).
+        :param client: OpenAI-compatible client to send the requests with (default: built from config).
+        :param stats_from: Client whose latency histograms and hedge counts this one records
+                           into and hedges by, so short-lived clients keep what earlier ones learned.
+        """
+        if cache is None and LLM_CACHE_PATH:
+            cache = LLMCache(LLM_CACHE_PATH, ttl=LLM_CACHE_TTL_HOURS * 3600, max_entries=LLM_CACHE_MAX_ENTRIES, replay=LLM_CACHE_REPLAY)
+        self.cache = cache if cache is not False else None
+        self.usage = {}  # method -> {'requests', 'seconds', 'prompt_tokens', 'completion_tokens'} of API calls
+        self.request_samples = deque(maxlen=REQUEST_SAMPLES)  # (seconds, completion_tokens) of API calls
+        self.hedge = hedge
+        self.latency = stats_from.latency if stats_from else {}  # method -> LatencyHistogram of answered calls (hedges included)
+        self.hedges = stats_from.hedges if stats_from else {}  # method -> {'hedged': n, 'secondary_wins': n}
+        # Hedges go to the secondary endpoint/model if configured, else repeat the request
+        self.secondary_model = LLM_SECONDARY_MODEL or MODEL_NAME
+
+        if client is None and not API_KEY and not (self.cache is not None and self.cache.replay):
             raise ValueError("API_KEY not found in environment variables. Please check your .env file.")
-        
-        self.client = OpenAI(
-            api_key=API_KEY,
+
+    def cache_stats(self):
+        """
+        Per-method cache hit/miss statistics ({} without a cache).
+        """
+        return self.cache.stats() if self.cache is not None else {}
+
+    def latency_stats(self):
+        """
+        Per-method latency percentiles in seconds and hedging counts:
+        {method: {'count', 'p50', 'p95', 'p99', 'max', 'hedged', 'secondary_wins'}}.
+        """
+        return {
+            method: dict(histogram.summary(), **self.hedges.get(method, {'hedged': 0, 'secondary_wins': 0}))
+            for method, histogram in self.latency.items()
+        }
+
+    def _hedge_delay(self, method):
+        histogram = self.latency.get(method)
+        if histogram is not None and histogram.count >= LLM_HEDGE_MIN_SAMPLES:
+            return histogram.percentile(LLM_HEDGE_PERCENTILE)
+        return LLM_HEDGE_DELAY
+
+    def _record_latency(self, method, seconds, hedged=False, secondary_won=False):
+        self.latency.setdefault(method, LatencyHistogram()).record(seconds)
+        if hedged:
+            counts = self.hedges.setdefault(method, {'hedged': 0, 'secondary_wins': 0})
+            counts['hedged'] += 1
+            counts['secondary_wins'] += int(secondary_won)
+
+    @staticmethod
+    def _messages(prompt):
+        return [
+            {"role": "system", "content": "你是一位专业的助手。"},
+            {"role": "user", "content": prompt}
+        ]
+
+    def usage_totals(self):
+        """
+        Sums of requests, seconds and tokens over all methods.
+        """
+        totals = {'requests': 0, 'seconds': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        for counts in self.usage.values():
+            for name in totals:
+                totals[name] += counts[name]
+        return totals
+
+    def request_overhead(self):
+        """
+        Seconds a request costs besides generating its output: the intercept of a
+        least-squares fit of seconds = overhead + completion_tokens * seconds_per_token
+        over the recent API calls of every method. None until at least three calls
+        with different completion lengths have been timed.
+        """
+        samples = list(self.request_samples)
+        if len(samples) < 3:
+            return None
+        mean_s = sum(s for s, _ in samples) / len(samples)
+        mean_t = sum(t for _, t in samples) / len(samples)
+        variance = sum((t - mean_t) ** 2 for _, t in samples)
+        if not variance:
+            return None
+        per_token = sum((s - mean_s) * (t - mean_t) for s, t in samples) / variance
+        return max(0.0, mean_s - per_token * mean_t)
+
+    def _record_usage(self, method, seconds, response):
+        counts = self.usage.setdefault(method, {'requests': 0, 'seconds': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0})
+        counts['requests'] += 1
+        counts['seconds'] += seconds
+        usage = getattr(response, "usage", None)
+        counts['prompt_tokens'] += getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        counts['completion_tokens'] += completion_tokens
+        if completion_tokens:
+            self.request_samples.append((seconds, completion_tokens))
+
+    def _cache_get(self, messages, method, max_tokens=MAX_TOKENS, response_format=None):
+        """
+        Returns (cache_key, cached content or None). Raises LLMCacheMiss in replay mode.
+        """
+        if self.cache is None:
+            return None, None
+        cache_key = LLMCache.make_key(MODEL_NAME, TEMPERATURE, max_tokens, messages, response_format)
+        return cache_key, self.cache.get(cache_key, method)
+
+    def _cache_put(self, cache_key, content, method):
+        if self.cache is not None and content:
+            self.cache.put(cache_key, content, method)
+
+
+class LLMClient(_CachedLLM):
+    def __init__(self, cache=None, hedge=LLM_HEDGE, client=None):
+        """
+        :param cache: LLMCache to use (default: from the LLM_CACHE_* settings; False disables caching).
+        :param hedge: Hedge slow requests with a duplicate (default: LLM_HEDGE).
+        :param client: OpenAI client to use (default: one for BASE_URL and API_KEY).
+        """
+        super().__init__(cache, hedge, client)
+        self.client = client or OpenAI(
+            api_key=API_KEY or "replay",
             base_url=BASE_URL
         )
+        self.secondary_client = self.client
+        if LLM_SECONDARY_BASE_URL:
+            self.secondary_client = OpenAI(api_key=LLM_SECONDARY_API_KEY or API_KEY or "replay", base_url=LLM_SECONDARY_BASE_URL)
+        # A blocking request that lost the race cannot be interrupted and keeps its
+        # worker until it returns, so leave room for a few of them
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge") if hedge else None
+
+    def close(self):
+        """
+        Shuts down the hedge worker threads. Losing requests still running are not waited for.
+        """
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
 
     def generate_script(self, book_content):
         """
         Generates a Douyin script based on the book content.
         """
         prompt = SCRIPT_GENERATION_PROMPT.format(book_content=book_content)
-        return self._call_llm(prompt)
+        return self._call_llm(prompt, method="generate_script")
+
+    def stream_script(self, book_content):
+        """
+        Like generate_script, but yields the script in pieces as it is generated (stream=True).
+        Shares generate_script's cache entries; a cached script is yielded in one piece.
+        API errors are raised, since the caller may already have consumed part of the script.
+        """
+        prompt = SCRIPT_GENERATION_PROMPT.format(book_content=book_content)
+        yield from self._stream_llm(prompt, method="generate_script")
 
     def generate_script_from_summary(self, book_name, summary):
         """
         Generates a script based on search summary (when full text is missing).
         """
         prompt = SCRIPT_GENERATION_FROM_SUMMARY_PROMPT.format(book_name=book_name, summary=summary)
-        return self._call_llm(prompt)
+        return self._call_llm(prompt, method="generate_script_from_summary")
 
     def generate_image_prompt(self, script_segment):
         """
         Generates an image prompt based on a script segment.
         """
         prompt = IMAGE_PROMPT_GENERATION_PROMPT.format(script_segment=script_segment)
-        return self._call_llm(prompt)
+        return self._call_llm(prompt, method="generate_image_prompt")
 
     def extract_book_name(self, content):
         """
@@ -44,7 +270,7 @@ class LLMClient:
         # Truncate content if it's too long to avoid token limits, just for name extraction
         truncated_content = content[:2000]
         prompt = BOOK_NAME_EXTRACTION_PROMPT.format(content=truncated_content)
-        book_name = self._call_llm(prompt)
+        book_name = self._call_llm(prompt, method="extract_book_name")
         if book_name:
             return book_name.strip()
         return None
@@ -54,24 +280,296 @@ class LLMClient:
         Generates a Douyin video description and tags based on the script.
         """
         prompt = DOUYIN_DESCRIPTION_PROMPT.format(script=script)
-        return self._call_llm(prompt)
+        return self._call_llm(prompt, method="generate_douyin_description")
 
-    def _call_llm(self, prompt):
+    def generate_book_package(self, book_content):
+        """
+        Generates the book name, script, Douyin description and image prompt in one
+        JSON-mode request. Fields missing from the response or failing
+        BOOK_PACKAGE_SCHEMA are regenerated with the individual prompts.
+
+        Returns (package, report): package maps BOOK_PACKAGE_FIELDS to strings (None
+        where even the fallback failed); report holds the request count, fallback fields,
+        latency, tokens and the estimated savings over four separate requests (saved_seconds
+        is None, with the reason in saved_seconds_basis, until request_overhead can be fitted).
+        """
+        start = time.perf_counter()
+        before = self.usage_totals()
+
+        prompt = BOOK_PACKAGE_PROMPT.format(book_content=book_content)
+        response = self._call_llm(
+            prompt, method="generate_book_package",
+            max_tokens=BOOK_PACKAGE_MAX_TOKENS, response_format={"type": "json_object"}
+        )
+        package, errors = validate_fields(parse_json_object(response), BOOK_PACKAGE_SCHEMA)
+        combined = self.usage_totals()
+
+        for field, reason in errors.items():
+            print(f"Combined LLM response: {field} {reason}, falling back to the individual prompt.")
+        # The description and image prompt are derived from the (possibly regenerated) script
+        if "book_name" in errors:
+            package["book_name"] = self.extract_book_name(book_content)
+        if "script" in errors:
+            package["script"] = self.generate_script(book_content)
+        script = package.get("script")
+        if "description" in errors:
+            package["description"] = self.generate_douyin_description(script) if script else None
+        if "image_prompt" in errors:
+            package["image_prompt"] = self.generate_image_prompt(clean_script(script)[:300]) if script else None
+
+        after = self.usage_totals()
+        report = {
+            'requests': after['requests'] - before['requests'],
+            'fallbacks': list(errors),
+            'seconds': time.perf_counter() - start,
+            'prompt_tokens': after['prompt_tokens'] - before['prompt_tokens'],
+            'completion_tokens': after['completion_tokens'] - before['completion_tokens'],
+            'saved_requests': 4 - (1 + len(errors)),
+            'saved_prompt_tokens': 0,
+            'saved_seconds': None,
+            'saved_seconds_basis': None,
+        }
+
+        # Input tokens four separate requests would have sent, scaled from the combined
+        # request's tokens per character; the script-sized completion is needed either way.
+        combined_prompt_tokens = combined['prompt_tokens'] - before['prompt_tokens']
+        if combined_prompt_tokens and script:
+            separate_chars = sum(len(m['content']) for p in [
+                BOOK_NAME_EXTRACTION_PROMPT.format(content=book_content[:2000]),
+                SCRIPT_GENERATION_PROMPT.format(book_content=book_content),
+                DOUYIN_DESCRIPTION_PROMPT.format(script=script),
+                IMAGE_PROMPT_GENERATION_PROMPT.format(script_segment=clean_script(script)[:300]),
+            ] for m in self._messages(p))
+            combined_chars = sum(len(m['content']) for m in self._messages(prompt))
+            separate_tokens = combined_prompt_tokens * separate_chars / combined_chars
+            report['saved_prompt_tokens'] = int(separate_tokens - report['prompt_tokens'])
+
+        # The outputs have to be generated either way; each request saved saves its overhead
+        overhead = self.request_overhead()
+        if overhead is None:
+            report['saved_seconds_basis'] = "not enough timed requests to fit the per-request overhead yet"
+        else:
+            report['saved_seconds'] = report['saved_requests'] * overhead
+            report['saved_seconds_basis'] = f"{overhead:.1f}s overhead per request, fitted over {len(self.request_samples)} requests"
+        return package, report
+
+    def _stream_llm(self, prompt, method="call"):
+        messages = self._messages(prompt)
+        cache_key, cached = self._cache_get(messages, method)
+        if cached is not None:
+            yield cached
+            return
+
+        start = time.perf_counter()
+        stream = self.client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=messages,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+            stream=True
+        )
+        parts = []
+        last_chunk = None
+        for chunk in stream:
+            last_chunk = chunk
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+        # Providers that report usage on streams put it on the last chunk
+        self._record_usage(method, time.perf_counter() - start, last_chunk)
+        self._cache_put(cache_key, "".join(parts), method)
+
+    def _call_llm(self, prompt, method="call", max_tokens=MAX_TOKENS, response_format=None):
+        messages = self._messages(prompt)
         try:
-            response = self.client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": "你是一位专业的助手。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            return response.choices[0].message.content
+            cache_key, cached = self._cache_get(messages, method, max_tokens, response_format)
+        except LLMCacheMiss as e:
+            print(f"Error calling LLM: {e}")
+            return None
+        if cached is not None:
+            return cached
+
+        request = dict(model=MODEL_NAME, messages=messages, temperature=TEMPERATURE, max_tokens=max_tokens)
+        if response_format is not None:
+            request["response_format"] = response_format
+        try:
+            start = time.perf_counter()
+            response, model = self._create(method, request)
+            self._record_usage(method, time.perf_counter() - start, response)
+            content = response.choices[0].message.content
         except Exception as e:
             print(f"Error calling LLM: {e}")
             return None
 
+        # Entries are keyed by MODEL_NAME; a hedge answered by the secondary model is not cached
+        if model == MODEL_NAME:
+            self._cache_put(cache_key, content, method)
+        return content
+
+    def _create(self, method, request):
+        """
+        Sends request, hedged if enabled. Returns (response, model that answered).
+        """
+        start = time.perf_counter()
+        if not self.hedge:
+            response = self.client.chat.completions.create(**request)
+            self._record_latency(method, time.perf_counter() - start)
+            return response, request['model']
+        response, hedged, secondary_won = hedged_call(
+            self._hedge_pool,
+            lambda: self.client.chat.completions.create(**request),
+            lambda: self.secondary_client.chat.completions.create(**dict(request, model=self.secondary_model)),
+            self._hedge_delay(method)
+        )
+        self._record_latency(method, time.perf_counter() - start, hedged, secondary_won)
+        return response, self.secondary_model if secondary_won else request['model']
+
+
+class AsyncLLMClient(_CachedLLM):
+    def __init__(self, cache=None, concurrency=LLM_CONCURRENCY, timeout=LLM_TIMEOUT, hedge=LLM_HEDGE, client=None,
+                 stats_from=None):
+        """
+        Coroutine counterpart of LLMClient for running many requests at once
+        (e.g. asyncio.gather over a batch of books).
+
+        All calls share one AsyncOpenAI client, so keep-alive connections are reused;
+        the pool is sized to the concurrency limit. Use the client inside a single
+        event loop and close it with `await client.aclose()` (or `async with`).
+
+        :param cache: LLMCache to use (default: from the LLM_CACHE_* settings; False disables caching).
+        :param concurrency: Maximum number of requests in flight.
+        :param timeout: Deadline in seconds for each request, retries and hedge included (0 = none).
+        :param hedge: Hedge slow requests with a duplicate; the losing request is cancelled.
+        :param client: AsyncOpenAI client to use (default: a pooled one for BASE_URL and API_KEY).
+        :param stats_from: Client (e.g. the LLMClient) whose latency histograms to share; a client
+                           built per event loop otherwise starts every run without hedge delays.
+        """
+        super().__init__(cache, hedge, client, stats_from)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # The pool limits use the Limits class of the HTTP library openai is built on
+        limits = type(DEFAULT_CONNECTION_LIMITS)(max_connections=self.concurrency, max_keepalive_connections=self.concurrency,
+                                                 keepalive_expiry=DEFAULT_CONNECTION_LIMITS.keepalive_expiry)
+        self.client = client or AsyncOpenAI(
+            api_key=API_KEY or "replay",
+            base_url=BASE_URL,
+            http_client=DefaultAsyncHttpxClient(limits=limits)
+        )
+        self.secondary_client = self.client
+        if LLM_SECONDARY_BASE_URL:
+            self.secondary_client = AsyncOpenAI(api_key=LLM_SECONDARY_API_KEY or API_KEY or "replay", base_url=LLM_SECONDARY_BASE_URL)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.close()
+        if self.secondary_client is not self.client:
+            await self.secondary_client.close()
+
+    async def generate_script(self, book_content):
+        """
+        Generates a Douyin script based on the book content.
+        """
+        prompt = SCRIPT_GENERATION_PROMPT.format(book_content=book_content)
+        return await self._call_llm(prompt, method="generate_script")
+
+    async def generate_script_from_summary(self, book_name, summary):
+        """
+        Generates a script based on search summary (when full text is missing).
+        """
+        prompt = SCRIPT_GENERATION_FROM_SUMMARY_PROMPT.format(book_name=book_name, summary=summary)
+        return await self._call_llm(prompt, method="generate_script_from_summary")
+
+    async def generate_image_prompt(self, script_segment):
+        """
+        Generates an image prompt based on a script segment.
+        """
+        prompt = IMAGE_PROMPT_GENERATION_PROMPT.format(script_segment=script_segment)
+        return await self._call_llm(prompt, method="generate_image_prompt")
+
+    async def extract_book_name(self, content):
+        """
+        Extracts or infers the book name from the content.
+        """
+        truncated_content = content[:2000]
+        prompt = BOOK_NAME_EXTRACTION_PROMPT.format(content=truncated_content)
+        book_name = await self._call_llm(prompt, method="extract_book_name")
+        if book_name:
+            return book_name.strip()
+        return None
+
+    async def generate_douyin_description(self, script):
+        """
+        Generates a Douyin video description and tags based on the script.
+        """
+        prompt = DOUYIN_DESCRIPTION_PROMPT.format(script=script)
+        return await self._call_llm(prompt, method="generate_douyin_description")
+
+    async def summarize_chunk(self, chunk):
+        """
+        Summarizes one chunk of a book (map step of BookSummarizer).
+        """
+        prompt = CHUNK_SUMMARY_PROMPT.format(chunk=chunk)
+        return await self._call_llm(prompt, method="summarize_chunk")
+
+    async def merge_summaries(self, summaries):
+        """
+        Merges consecutive partial summaries into one (reduce step of BookSummarizer).
+        """
+        prompt = SUMMARY_REDUCE_PROMPT.format(summaries="\n\n".join(f"[{i + 1}] {s}" for i, s in enumerate(summaries)))
+        return await self._call_llm(prompt, method="merge_summaries")
+
+    async def _call_llm(self, prompt, method="call"):
+        messages = self._messages(prompt)
+        try:
+            cache_key, cached = self._cache_get(messages, method)
+        except LLMCacheMiss as e:
+            print(f"Error calling LLM: {e}")
+            return None
+        if cached is not None:
+            return cached
+
+        request = dict(model=MODEL_NAME, messages=messages, temperature=TEMPERATURE, max_tokens=MAX_TOKENS)
+        async with self._semaphore:
+            try:
+                start = time.perf_counter()
+                response, model = await asyncio.wait_for(self._create(method, request), self.timeout or None)
+                self._record_usage(method, time.perf_counter() - start, response)
+                content = response.choices[0].message.content
+            except asyncio.TimeoutError:
+                print(f"Error calling LLM: {method} timed out after {self.timeout}s")
+                return None
+            except Exception as e:
+                print(f"Error calling LLM: {e}")
+                return None
+
+        if model == MODEL_NAME:
+            self._cache_put(cache_key, content, method)
+        return content
+
+    async def _create(self, method, request):
+        """
+        Sends request, hedged if enabled. Returns (response, model that answered).
+        """
+        start = time.perf_counter()
+        if not self.hedge:
+            response = await self.client.chat.completions.create(**request)
+            self._record_latency(method, time.perf_counter() - start)
+            return response, request['model']
+        response, hedged, secondary_won = await hedged_call_async(
+            lambda: self.client.chat.completions.create(**request),
+            lambda: self.secondary_client.chat.completions.create(**dict(request, model=self.secondary_model)),
+            self._hedge_delay(method)
+        )
+        self._record_latency(method, time.perf_counter() - start, hedged, secondary_won)
+        return response, self.secondary_model if secondary_won else request['model']
+
 if __name__ == "__main__":
     # Test stub
     client = LLMClient()
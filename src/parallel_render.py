@@ -0,0 +1,127 @@
+import os
+import sys
+import math
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils import load_subtitles
+from src.encoder_profiles import get_encoder_profile
+from moviepy.config import FFMPEG_BINARY
+
+
+def split_timeline(subs, duration, n_chunks, fps=24):
+    """
+    Splits the timeline into up to n_chunks frame ranges of similar length.
+    Cuts are placed on cue boundaries (the start of the cue closest to each even split),
+    so every cue is rendered by a single worker.
+
+    Returns a list of (start_frame, end_frame) tuples covering [0, int(duration * fps)).
+    """
+    n_frames = int(duration * fps)
+    if n_frames <= 0:
+        return []
+    n_chunks = max(1, min(n_chunks, n_frames))
+    boundaries = sorted(set(sub['start'] for sub in subs if 0 < sub['start'] < duration))
+
+    cuts = []
+    for k in range(1, n_chunks):
+        target = duration * k / n_chunks
+        t = min(boundaries, key=lambda b: abs(b - target)) if boundaries else target
+        frame = int(math.ceil(t * fps))
+        if 0 < frame < n_frames and (not cuts or frame > cuts[-1]):
+            cuts.append(frame)
+
+    edges = [0] + cuts + [n_frames]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _render_chunk(job):
+    """
+    Worker: renders one frame range of the timeline to an MP4 without audio.
+    Runs in a separate process, so it builds its own VideoGenerator/compositor.
+    """
+    from src.video_gen import VideoGenerator
+    from src.band_compositor import BandCompositor
+
+    video_gen = VideoGenerator(output_width=job['width'], output_height=job['height'])
+    compositor = BandCompositor(video_gen, fps=job['fps'], encoder_profile=job['encoder_profile'])
+    background = compositor.load_background(job['bg_image_path'])
+    frames = compositor.iter_frames(background, job['subs'], job['duration'], start_frame=job['start_frame'], end_frame=job['end_frame'])
+    compositor.write_frames(job['output_path'], frames)
+    return job['output_path']
+
+
+class ParallelRenderer:
+    def __init__(self, video_gen, workers=None, fps=24, encoder_profile=None):
+        """
+        Chunked renderer: the timeline is split at cue boundaries into one chunk per worker,
+        each chunk is rendered by the band compositor in a ProcessPoolExecutor worker with
+        identical encoder settings, and the chunks are joined losslessly with ffmpeg's
+        concat demuxer (stream copy) while the audio is muxed once.
+
+        :param workers: Number of worker processes (default: os.cpu_count()).
+        :param encoder_profile: Encoder profile name (see src/encoder_profiles.py).
+        """
+        self.video_gen = video_gen
+        self.workers = workers or os.cpu_count() or 1
+        self.fps = fps
+        self.encoder_profile = get_encoder_profile(encoder_profile)
+        if self.encoder_profile['threads'] == 0:
+            # One x264 per worker: split the cores instead of oversubscribing them
+            self.encoder_profile['threads'] = max(1, (os.cpu_count() or 1) // self.workers)
+
+    def render(self, final_audio, duration, output_path, bg_image_path=None, vtt_path=None):
+        """
+        Renders the video with the already mixed audio clip. Returns True on success.
+        """
+        subs = load_subtitles(vtt_path) if vtt_path and os.path.exists(vtt_path) else []
+        chunks = split_timeline(subs, duration, self.workers, self.fps)
+        print(f"Rendering {len(chunks)} chunks with {self.workers} workers.")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            jobs = [{
+                'width': self.video_gen.width,
+                'height': self.video_gen.height,
+                'fps': self.fps,
+                'bg_image_path': bg_image_path,
+                'subs': subs,
+                'duration': duration,
+                'encoder_profile': self.encoder_profile,
+                'start_frame': start_frame,
+                'end_frame': end_frame,
+                'output_path': os.path.join(tmp_dir, f"chunk_{i:03d}.mp4"),
+            } for i, (start_frame, end_frame) in enumerate(chunks)]
+
+            audio_file = os.path.join(tmp_dir, "audio.m4a")
+            final_audio.write_audiofile(audio_file, fps=44100, codec="aac", logger=None)
+
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as executor:
+                chunk_paths = list(executor.map(_render_chunk, jobs))
+
+            return self.concat(chunk_paths, audio_file, output_path, tmp_dir)
+
+    def concat(self, chunk_paths, audio_file, output_path, tmp_dir):
+        """
+        Joins the chunks with the concat demuxer (no re-encode) and muxes the audio.
+        """
+        list_path = os.path.join(tmp_dir, "chunks.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in chunk_paths:
+                f.write(f"file '{os.path.basename(path)}'\n")
+
+        cmd = [
+            FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-i", audio_file,
+            "-map", "0:v", "-map", "1:a",
+            "-c", "copy",
+            os.path.abspath(output_path)
+        ]
+        result = subprocess.run(cmd, cwd=tmp_dir, capture_output=True, text=True, encoding="utf-8", errors="replace")
+        if result.returncode != 0:
+            print(f"Error concatenating chunks: {result.stderr[-2000:]}")
+            return False
+        return True
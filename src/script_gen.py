@@ -6,11 +6,13 @@ import glob
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.llm_client import LLMClient
+from src.book_summarizer import BookSummarizer
 
 def main():
     # 1. Initialize LLM Client
     try:
         client = LLMClient()
+        summarizer = BookSummarizer(cache=client.cache if client.cache is not None else False, stats_from=client)
     except ValueError as e:
         print(f"Error: {e}")
         print("Tip: Copy .env.example to .env and fill in your API Key.")
@@ -37,11 +39,10 @@ def main():
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
             
-        # Truncate content if too long for MVP (e.g., first 10k chars)
-        # In a real app, we would use RAG or summary first.
-        if len(content) > 10000:
-            print("Content too long, using first 10000 characters for MVP analysis...")
-            content = content[:10000]
+        # Summarize long books chunk by chunk instead of truncating them
+        if len(content) > summarizer.direct_chars:
+            print("Content too long, summarizing the full text before script generation...")
+            content = summarizer.summarize(content) or content[:10000]
 
         script = client.generate_script(content)
         
@@ -52,6 +53,7 @@ def main():
             print(f"Script generated and saved to: {output_path}")
         else:
             print(f"Failed to generate script for {file_name}")
+    client.close()
 
 if __name__ == "__main__":
     main()
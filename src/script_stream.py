@@ -0,0 +1,154 @@
+import asyncio
+import os
+import re
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils import clean_script
+
+# clean_script starts a new line after each of these
+LINE_BREAK_AFTER = set("，。！？；,.!?;\n")
+# A newline after these is swallowed by clean_script's header patterns (`#+\s*`, `**x**：\s*`)
+SWALLOWS_NEWLINE = re.compile(r"(#+|\*\*[:：])[ \t]*$")
+
+
+class ScriptLineCleaner:
+    def __init__(self):
+        """
+        Incremental clean_script: raw script pieces go in, cleaned lines come out as soon
+        as the sentence or phrase they belong to is complete.
+
+        The text is only cut where clean_script would break a line anyway and where none
+        of its patterns can span the cut (no open **bold** on the line, no header marker
+        right before a newline), so the lines joined equal clean_script(whole script).
+        """
+        self._buffer = ""
+
+    def feed(self, piece):
+        """
+        Adds a piece of the script; returns the cleaned lines completed by it.
+        """
+        self._buffer += piece
+        cut = self._last_safe_cut()
+        if cut <= 0:
+            return []
+        done, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return self._lines(done)
+
+    def flush(self):
+        """
+        Returns the cleaned lines of whatever is left at the end of the script.
+        """
+        done, self._buffer = self._buffer, ""
+        return self._lines(done)
+
+    def _last_safe_cut(self):
+        buffer = self._buffer
+        for i in range(len(buffer), 0, -1):
+            char = buffer[i - 1]
+            if char not in LINE_BREAK_AFTER:
+                continue
+            line_start = buffer.rfind("\n", 0, i - 1) + 1
+            line = buffer[line_start:i - 1] if char == "\n" else buffer[line_start:i]
+            if line.count("**") % 2:
+                continue
+            if char == "\n" and SWALLOWS_NEWLINE.search(line):
+                continue
+            return i
+        return 0
+
+    @staticmethod
+    def _lines(text):
+        cleaned = clean_script(text)
+        return cleaned.split("\n") if cleaned else []
+
+
+async def stream_script_to_speech(llm_client, tts_client, book_content, audio_path, vtt_path):
+    """
+    Generates the script with LLMClient.stream_script and synthesizes it while it is
+    being written: completed sentences are cleaned (ScriptLineCleaner) and fed to
+    TTSClient.generate_audio_with_subtitles_from_stream, which starts each TTS segment
+    as soon as it is closed. The audio and VTT are those of the segmented TTS mode
+    (--parallel-tts) on clean_script(script).
+
+    A script that arrives in one piece (an LLM cache hit) is known before synthesis
+    starts, so it goes through generate_audio_with_subtitles_async instead, where the
+    TTS cache can answer it.
+
+    Returns (script, report) with script None on failure. The report holds seconds from
+    the start to the first synthesized segment ('first_audio'), to the end of the
+    script ('script_done') and to the finished audio ('total').
+    """
+    start = time.perf_counter()
+    report = {'first_audio': None, 'script_done': None, 'total': None}
+    parts = []
+
+    def on_audio(index):
+        if report['first_audio'] is None:
+            report['first_audio'] = time.perf_counter() - start
+
+    # The OpenAI stream is blocking; it is read off the event loop
+    pieces = llm_client.stream_script(book_content)
+    done = object()
+    try:
+        # Look one piece ahead: a cached script is yielded whole, then the stream ends
+        buffered = [await asyncio.to_thread(next, pieces, done)]
+        if buffered[0] is not done:
+            buffered.append(await asyncio.to_thread(next, pieces, done))
+    except Exception as e:
+        print(f"Error calling LLM: {e}")
+        report['total'] = time.perf_counter() - start
+        return None, report
+    if buffered[0] is done:
+        report['total'] = time.perf_counter() - start
+        return None, report
+    if buffered[1] is done:
+        script = buffered[0]
+        report['script_done'] = time.perf_counter() - start
+        ok = await tts_client.generate_audio_with_subtitles_async(clean_script(script), audio_path, vtt_path, segmented=True)
+        report['first_audio'] = report['total'] = time.perf_counter() - start
+        return (script if ok else None), report
+
+    async def lines():
+        cleaner = ScriptLineCleaner()
+        while True:
+            # An error is raised out of lines() so the synthesis is cancelled and nothing
+            # is written or cached
+            piece = buffered.pop(0) if buffered else await asyncio.to_thread(next, pieces, done)
+            if piece is done:
+                break
+            parts.append(piece)
+            for line in cleaner.feed(piece):
+                yield line
+        report['script_done'] = time.perf_counter() - start
+        for line in cleaner.flush():
+            yield line
+
+    try:
+        spoken = await tts_client.generate_audio_with_subtitles_from_stream(lines(), audio_path, vtt_path, on_audio=on_audio)
+    except Exception as e:
+        print(f"Error calling LLM: {e}")
+        return None, report
+    finally:
+        report['total'] = time.perf_counter() - start
+    script = "".join(parts)
+    if spoken is None or not script:
+        return None, report
+
+    cleaned = clean_script(script)
+    if spoken != cleaned:
+        # Safety net: never ship audio that differs from the non-streaming path
+        print("Warning: streamed lines differ from clean_script(script); re-synthesizing the whole script.")
+        if not await tts_client.generate_audio_with_subtitles_async(cleaned, audio_path, vtt_path, segmented=True):
+            return None, report
+        report['total'] = time.perf_counter() - start
+    return script, report
+
+
+def generate_script_with_speech(llm_client, tts_client, book_content, audio_path, vtt_path):
+    """
+    Synchronous wrapper for stream_script_to_speech.
+    """
+    return asyncio.run(stream_script_to_speech(llm_client, tts_client, book_content, audio_path, vtt_path))
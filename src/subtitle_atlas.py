@@ -0,0 +1,92 @@
+import numpy as np
+from PIL import Image, ImageDraw, ImageColor
+
+
+class SubtitleAtlas:
+    def __init__(self, video_gen, fontsize=70, stroke_width=4, max_bytes=64 * 1024 * 1024):
+        """
+        Rasterizes each unique cue text once and stores its coverage masks in a packed
+        numpy atlas. Any fill/stroke color combination is produced by vectorized tinting,
+        so the base and active karaoke images (and repeated lines) share one rasterization.
+
+        All sprites have the same width (video width - 80), so they are stacked vertically
+        in a single (rows, width, 2) uint8 page: channel 0 is the text alpha (fill + stroke),
+        channel 1 the fill coverage.
+
+        :param max_bytes: The atlas is cleared when it would grow beyond this size.
+        """
+        self.video_gen = video_gen
+        self.fontsize = fontsize
+        self.stroke_width = stroke_width
+        self.max_bytes = max_bytes
+        self.width = video_gen.width - 80
+        self._page = np.zeros((0, self.width, 2), dtype=np.uint8)
+        self._used_rows = 0
+        self._entries = {}  # text -> (y0, h)
+        self.hits = 0
+        self.misses = 0
+
+    def coverage(self, text):
+        """
+        Returns (alpha, fill) uint8 views into the atlas for the given text.
+        """
+        entry = self._entries.get(text)
+        if entry is None:
+            self.misses += 1
+            entry = self._add(text, self._rasterize(text))
+        else:
+            self.hits += 1
+        y0, h = entry
+        sprite = self._page[y0:y0 + h]
+        return sprite[:, :, 0], sprite[:, :, 1]
+
+    def tint(self, text, color, stroke_fill='black'):
+        """
+        Returns the RGBA uint8 image of the text with the given fill and stroke colors,
+        equivalent to drawing it with PIL (stroke first, fill on top).
+        """
+        alpha, fill = self.coverage(text)
+        fill_rgb = np.array(ImageColor.getrgb(color)[:3], dtype=np.float32)
+        stroke_rgb = np.array(ImageColor.getrgb(stroke_fill)[:3], dtype=np.float32)
+
+        img = np.empty(alpha.shape + (4,), dtype=np.uint8)
+        coverage = fill[:, :, None] * np.float32(1 / 255.0)
+        img[:, :, :3] = stroke_rgb + (fill_rgb - stroke_rgb) * coverage + 0.5
+        img[:, :, 3] = alpha
+        return img
+
+    def _rasterize(self, text):
+        lines = self.video_gen._layout_lines(text, self.fontsize)
+        font = self.video_gen._load_font(self.fontsize)
+        line_height = self.fontsize * 1.5
+        img_h = int(len(lines) * line_height) + 40
+
+        # Same geometry as VideoGenerator._create_text_image_np
+        alpha_img = Image.new('L', (self.width, img_h), 0)
+        fill_img = Image.new('L', (self.width, img_h), 0)
+        alpha_draw = ImageDraw.Draw(alpha_img)
+        fill_draw = ImageDraw.Draw(fill_img)
+        y = 20
+        for line in lines:
+            alpha_draw.text((10, y), line, font=font, fill=255, stroke_width=self.stroke_width, stroke_fill=255)
+            fill_draw.text((10, y), line, font=font, fill=255)
+            y += line_height
+        return np.stack([np.array(alpha_img), np.array(fill_img)], axis=-1)
+
+    def _add(self, text, sprite):
+        h = sprite.shape[0]
+        needed = self._used_rows + h
+        if needed * self.width * 2 > self.max_bytes and self._entries:
+            # Simple reset instead of per-entry eviction: cue sets are per book
+            self._entries.clear()
+            self._used_rows = 0
+            needed = h
+        if needed > self._page.shape[0]:
+            page = np.zeros((max(needed, 2 * self._page.shape[0]), self.width, 2), dtype=np.uint8)
+            page[:self._used_rows] = self._page[:self._used_rows]
+            self._page = page
+        y0 = self._used_rows
+        self._page[y0:y0 + h] = sprite
+        self._used_rows += h
+        self._entries[text] = (y0, h)
+        return (y0, h)
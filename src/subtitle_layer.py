@@ -0,0 +1,142 @@
+import numpy as np
+from PIL import Image
+from moviepy import VideoClip
+
+
+class CueIndex:
+    def __init__(self, subs, duration):
+        """
+        Interval index over subtitle cues: sorted numpy arrays of start/end times.
+        Cues are clipped to the video duration and empty ones are dropped.
+        """
+        cues = sorted(
+            [(sub['start'], min(sub['end'], duration), sub['text'], sub.get('words')) for sub in subs if sub['start'] < min(sub['end'], duration)],
+            key=lambda cue: cue[0]
+        )
+        self.starts = np.array([cue[0] for cue in cues], dtype=float)
+        self.ends = np.array([cue[1] for cue in cues], dtype=float)
+        self.texts = [cue[2] for cue in cues]
+        self.words = [cue[3] for cue in cues]  # Word timings per cue, or None
+
+    def __len__(self):
+        return len(self.texts)
+
+    def active(self, t):
+        """
+        Returns the index of the cue shown at time t, or -1. Binary search (O(log n)).
+        Cues do not overlap in our VTT files; if they do, the latest started one wins.
+        """
+        i = int(np.searchsorted(self.starts, t, side='right')) - 1
+        if i >= 0 and t < self.ends[i]:
+            return i
+        return -1
+
+
+class SubtitleLayer:
+    def __init__(self, video_gen, subs, duration, fontsize=70, color_base='white', color_active='#FFD700', stroke_width=4, stroke_fill='black'):
+        """
+        All karaoke subtitles as a single MoviePy layer over the subtitle band.
+
+        Instead of one CompositeVideoClip per cue, each frame looks up the active cue in a
+        CueIndex and draws only that one, so the per-frame cost does not grow with the
+        number of cues. Cues with word timings are revealed word by word. The revealed
+        look (active text composited over the base text, as the per-cue clips did) is
+        computed once per cue, so the wipe is just a copy of the newly revealed columns
+        into the reused frame and mask buffers.
+        """
+        self.video_gen = video_gen
+        self.index = CueIndex(subs, duration)
+        self.duration = duration
+        self.fontsize = fontsize
+        self.color_base = color_base
+        self.color_active = color_active
+        self.stroke_width = stroke_width
+        self.stroke_fill = stroke_fill
+
+        # Band from the subtitle position (0.8 * height) to the bottom of the screen
+        self.w = video_gen.width - 80
+        self.h = video_gen.height - int(video_gen.height * 0.8)
+        self._frame = np.zeros((self.h, self.w, 3), dtype=np.uint8)
+        self._mask = np.zeros((self.h, self.w), dtype=float)
+        self._cue = -1
+        self._cue_h = 0
+        self._sprite = None  # (base_rgb, base_mask, revealed_rgb, revealed_mask) of the cue
+        self._timing = None  # WordTiming of the cue, if it has word timings
+        self._reveal = 0
+
+    def to_clip(self):
+        """
+        Returns the positioned VideoClip (with mask) to composite over the background.
+        """
+        mask_clip = VideoClip(self.make_mask, duration=self.duration, is_mask=True)
+        clip = VideoClip(self.make_frame, duration=self.duration).with_mask(mask_clip)
+        return clip.with_position(('center', 0.8), relative=True)  # Bottom 20%
+
+    def make_frame(self, t):
+        self._update(t)
+        return self._frame
+
+    def make_mask(self, t):
+        self._update(t)
+        return self._mask
+
+    def _update(self, t):
+        cue = self.index.active(t)
+        if cue != self._cue:
+            self._load_cue(cue)
+        if cue < 0:
+            return
+
+        start, end = self.index.starts[cue], self.index.ends[cue]
+        if self._timing is not None:
+            reveal = max(0, min(self.w, self._timing.reveal_column(t - start)))
+        else:
+            reveal = self._reveal_column(t - start, end - start)
+        h = self._cue_h
+        base_rgb, base_mask, revealed_rgb, revealed_mask = self._sprite
+        if reveal > self._reveal:
+            self._frame[:h, self._reveal:reveal] = revealed_rgb[:, self._reveal:reveal]
+            self._mask[:h, self._reveal:reveal] = revealed_mask[:, self._reveal:reveal]
+        elif reveal < self._reveal:
+            # Seeking backwards (e.g. preview): restore the base text
+            self._frame[:h, reveal:self._reveal] = base_rgb[:, reveal:self._reveal]
+            self._mask[:h, reveal:self._reveal] = base_mask[:, reveal:self._reveal]
+        self._reveal = reveal
+
+    def _load_cue(self, cue):
+        self._cue = cue
+        self._reveal = 0
+        self._frame[:self._cue_h] = 0
+        self._mask[:self._cue_h] = 0.0
+        self._cue_h = 0
+        if cue < 0:
+            self._sprite = self._timing = None
+            return
+
+        atlas = self.video_gen._get_atlas(self.fontsize, self.stroke_width)
+        text = self.index.texts[cue]
+        img_base_np = atlas.tint(text, self.color_base, self.stroke_fill)
+        img_active_np = atlas.tint(text, self.color_active, self.stroke_fill)
+
+        # Sprites taller than the band are cut at the bottom of the screen, as before
+        h = min(self.h, img_base_np.shape[0])
+        img_base_np, img_active_np = img_base_np[:h], img_active_np[:h]
+        base_rgb = img_base_np[:, :, :3]
+        base_mask = img_base_np[:, :, 3] / 255.0
+        # Active over base, like CompositeVideoClip([clip_base, clip_active]) with a full wipe
+        revealed_rgb = np.array(Image.alpha_composite(Image.fromarray(img_base_np), Image.fromarray(img_active_np)))[:, :, :3]
+        active_mask = img_active_np[:, :, 3] / 255.0
+        revealed_mask = base_mask + active_mask * (1 - base_mask)
+
+        self._sprite = (base_rgb, base_mask, revealed_rgb, revealed_mask)
+        self._timing = self.video_gen._word_timing(text, self.index.words[cue], self.fontsize)
+        self._frame[:h] = base_rgb
+        self._mask[:h] = base_mask
+        self._cue_h = h
+
+    def _reveal_column(self, t, duration):
+        # Same linear wipe as KaraokeMask.reveal_column
+        if duration <= 0: progress = 1.0
+        else: progress = t / duration
+        progress = max(0.0, min(1.0, progress))
+        return int(self.w * progress)
@@ -0,0 +1,64 @@
+import weakref
+
+# Chinese line-breaking rules (kinsoku): punctuation that may not start a line,
+# and opening brackets/quotes that may not end one.
+NO_LINE_START = set("，。！？；：、）》」』”’】〕〉…—～·,.!?;:)]}>%")
+NO_LINE_END = set("（《「『“‘【〔〈([{<")
+
+
+class GlyphAdvanceCache:
+    def __init__(self):
+        """
+        Per-font cache of glyph advances, so measuring a line is a sum of cached
+        values instead of a FreeType layout of the whole string.
+        """
+        self._fonts = weakref.WeakKeyDictionary()
+
+    def advance(self, font, char):
+        advances = self._fonts.get(font)
+        if advances is None:
+            advances = self._fonts[font] = {}
+        adv = advances.get(char)
+        if adv is None:
+            adv = advances[char] = font.getlength(char)
+        return adv
+
+
+_advance_cache = GlyphAdvanceCache()
+
+
+def wrap_text(text, font, max_width, advance_cache=None):
+    """
+    Breaks text into lines no wider than max_width pixels in a single pass.
+
+    Widths are sums of cached glyph advances. When a line is full:
+    - punctuation that may not start a line pulls the previous character down with it,
+    - an opening bracket at the end of the line moves to the next line,
+    - a space at the break is dropped.
+    """
+    cache = advance_cache or _advance_cache
+    lines = []
+    current = []
+    width = 0.0
+
+    for char in text:
+        adv = cache.advance(font, char)
+        if current and width + adv > max_width:
+            if char == " ":
+                lines.append("".join(current))
+                current, width = [], 0.0
+                continue
+            carry = []
+            if char in NO_LINE_START and len(current) > 1 and current[-1] not in NO_LINE_START:
+                carry = [current.pop()]
+            elif current[-1] in NO_LINE_END and len(current) > 1:
+                carry = [current.pop()]
+            lines.append("".join(current))
+            current = carry
+            width = sum(cache.advance(font, c) for c in carry)
+        current.append(char)
+        width += adv
+
+    if current:
+        lines.append("".join(current))
+    return lines
@@ -1,10 +1,157 @@
 import edge_tts
 import asyncio
+import io
 import os
-import subprocess
+import sys
+import shutil
+import inspect
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils import write_vtt, write_word_timings, word_timings_path
+from src.config import TTS_CONCURRENCY, TTS_SEGMENT_CHARS, TTS_CACHE_DIR, TTS_CACHE_MAX_MB
+from src.disk_cache import DiskLRUCache
+
+SENTENCE_ENDS = "。！？!?.；;…"
+
+# MPEG audio Layer III tables: bitrates (kbps) by bitrate index, sample rates by version
+_MP3_BITRATES_V1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_MP3_BITRATES_V2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def mp3_samples(data):
+    """
+    Counts the samples in an MP3 (Layer III) byte string by walking the frame headers.
+    Returns (n_samples, sample_rate). Used to place concatenated segments exactly.
+    """
+    pos = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        pos = 10 + ((data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9])
+    n_samples = 0
+    sample_rate = 0
+    while pos + 4 <= len(data):
+        b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+        version = (b1 >> 3) & 0x3
+        bitrate_idx = b2 >> 4
+        sr_idx = (b2 >> 2) & 0x3
+        if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0 or version == 1 or ((b1 >> 1) & 0x3) != 1 \
+                or bitrate_idx in (0, 15) or sr_idx == 3:
+            # Not a Layer III frame header: resync on the next byte
+            pos += 1
+            continue
+        sample_rate = _MP3_SAMPLE_RATES[version][sr_idx]
+        padding = (b2 >> 1) & 0x1
+        if version == 3:
+            bitrate = _MP3_BITRATES_V1[bitrate_idx] * 1000
+            frame_size = 144 * bitrate // sample_rate + padding
+            n_samples += 1152
+        else:
+            bitrate = _MP3_BITRATES_V2[bitrate_idx] * 1000
+            frame_size = 72 * bitrate // sample_rate + padding
+            n_samples += 576
+        pos += frame_size
+    return n_samples, sample_rate
+
+
+def cues_from_words(text, words, lookahead=3):
+    """
+    Groups WordBoundary events into one cue per line of the (cleaned) text.
+
+    :param words: [(offset, duration, word)] in seconds, in speaking order.
+    :return: [{'start', 'end', 'text', 'words'}] where words holds
+             [offset, duration, char_start, char_end] per word, relative to the cue start.
+    Words that cannot be found in the next few lines are skipped.
+    """
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    line_words = [[] for _ in lines]
+    line_idx, pos = 0, 0
+    for offset, duration, word in words:
+        word = word.strip()
+        if not word:
+            continue
+        for j in range(line_idx, min(len(lines), line_idx + lookahead)):
+            found = lines[j].find(word, pos if j == line_idx else 0)
+            if found >= 0:
+                break
+        else:
+            continue
+        line_idx = j
+        pos = found + len(word)
+        line_words[j].append((offset, duration, found, pos))
+
+    cues = []
+    for line, spans in zip(lines, line_words):
+        if not spans:
+            continue
+        start = spans[0][0]
+        end = spans[-1][0] + spans[-1][1]
+        cues.append({
+            'start': start,
+            'end': end,
+            'text': line,
+            'words': [[round(offset - start, 4), round(duration, 4), char_start, char_end] for offset, duration, char_start, char_end in spans],
+        })
+    return cues
+
+
+class SegmentSplitter:
+    def __init__(self, segment_chars=TTS_SEGMENT_CHARS):
+        """
+        Incremental form of split_segments: lines go in one at a time and each segment
+        comes out as soon as it is closed, which only depends on the lines before it.
+        """
+        self.segment_chars = segment_chars
+        self._current = []
+        self._length = 0
+
+    def feed(self, line):
+        """
+        Adds a line; returns the list of segments it closed (at most two).
+        """
+        line = line.strip()
+        if not line:
+            return []
+        closed = []
+        if self._current and self._length + len(line) > 2 * self.segment_chars:
+            closed.append(self._close())
+        self._current.append(line)
+        self._length += len(line)
+        if self._length >= self.segment_chars and line[-1] in SENTENCE_ENDS:
+            closed.append(self._close())
+        return closed
+
+    def flush(self):
+        """
+        Returns the last, unfinished segment as a list (empty if there is none).
+        """
+        return [self._close()] if self._current else []
+
+    def _close(self):
+        segment = '\n'.join(self._current)
+        self._current, self._length = [], 0
+        return segment
+
+
+def split_segments(text, segment_chars=TTS_SEGMENT_CHARS):
+    """
+    Groups the lines of a cleaned script (see clean_script) into TTS segments.
+    A segment is closed at the first sentence end once it has segment_chars characters,
+    or at any line boundary before it would exceed twice that.
+    """
+    splitter = SegmentSplitter(segment_chars)
+    segments = []
+    for line in text.split('\n'):
+        segments.extend(splitter.feed(line))
+    return segments + splitter.flush()
+
 
 class TTSClient:
-    def __init__(self, voice="zh-CN-YunxiNeural", rate="+0%", volume="+0%"):
+    # Boundary events requested from edge-tts; the cues (and so the cache entries) depend on it
+    BOUNDARY = "WordBoundary"
+
+    def __init__(self, voice="zh-CN-YunxiNeural", rate="+0%", volume="+0%", engine=None, concurrency=TTS_CONCURRENCY, segment_chars=TTS_SEGMENT_CHARS,
+                 cache_dir=TTS_CACHE_DIR, cache_max_mb=TTS_CACHE_MAX_MB):
         """
         Initialize the TTS Client.
         
@@ -12,16 +159,25 @@ class TTSClient:
                       Other options: zh-CN-XiaoxiaoNeural, zh-CN-YunyangNeural, etc.
         :param rate: Speed of speech (e.g., "+0%", "+10%", "-10%").
         :param volume: Volume of speech (e.g., "+0%", "+10%").
+        :param engine: Communicate-compatible class (default: edge_tts.Communicate).
+        :param concurrency: Max. segments synthesized at once in segmented mode.
+        :param segment_chars: Target segment length in segmented mode.
+        :param cache_dir: Directory of the audio/cue cache (None or "" disables it).
+        :param cache_max_mb: Size bound of the cache; least recently used entries are evicted.
         """
         self.voice = voice
         self.rate = rate
         self.volume = volume
+        self.engine = engine or edge_tts.Communicate
+        self.concurrency = concurrency
+        self.segment_chars = segment_chars
+        self.cache = DiskLRUCache(cache_dir, cache_max_mb * 1024 * 1024, name="TTS") if cache_dir else None
 
     async def generate_audio(self, text, output_path):
         """
         Generates audio from text and saves it to the output path.
         """
-        communicate = edge_tts.Communicate(text, self.voice, rate=self.rate, volume=self.volume)
+        communicate = self.engine(text, self.voice, rate=self.rate, volume=self.volume)
         await communicate.save(output_path)
 
     def run_generate_audio(self, text, output_path):
@@ -30,44 +186,215 @@ class TTSClient:
         """
         asyncio.run(self.generate_audio(text, output_path))
 
-    def generate_audio_with_subtitles(self, text, output_audio_path, output_sub_path):
+    async def synthesize(self, text, output_audio_path):
         """
-        Generates audio and subtitles (VTT) using edge-tts CLI.
-        This is more reliable for obtaining aligned subtitles.
+        Streams the audio of text into output_audio_path and returns the subtitle cues
+        ([{'start', 'end', 'text'}], seconds) built in memory from the boundary events.
+        No temp files or shared state, so many syntheses can run on one event loop.
+        """
+        partial_path = output_audio_path + ".part"
+        try:
+            with open(partial_path, "wb") as audio_file:
+                cues = await self._stream(text, audio_file)
+            os.replace(partial_path, output_audio_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return cues
+
+    async def synthesize_segmented(self, text, output_audio_path):
+        """
+        Like synthesize, but splits text into segments (split_segments) synthesized
+        concurrently, at most self.concurrency at a time. The MP3 segments are concatenated
+        without re-encoding and each segment's cues are shifted by the exact duration
+        (frame count) of the audio before it.
+        """
+        async def lines():
+            for line in text.split('\n'):
+                yield line
+
+        return await self.synthesize_stream(lines(), output_audio_path)
+
+    async def synthesize_stream(self, lines, output_audio_path, on_audio=None):
+        """
+        synthesize_segmented for text that is still being written: lines is an async
+        iterable of cleaned script lines. Each segment starts synthesizing as soon as
+        SegmentSplitter closes it, so TTS overlaps whatever produces the lines; the
+        audio and cues are the same as synthesize_segmented on the joined lines.
+
+        :param on_audio: Called with the segment index when a segment's audio is ready.
+        """
+        splitter = SegmentSplitter(self.segment_chars)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = []
+
+        async def run(index, segment):
+            async with semaphore:
+                buffer = io.BytesIO()
+                cues = await self._stream(segment, buffer)
+            if on_audio:
+                on_audio(index)
+            return buffer.getvalue(), cues
+
+        def start(segments):
+            for segment in segments:
+                tasks.append(asyncio.ensure_future(run(len(tasks), segment)))
+
+        try:
+            async for line in lines:
+                start(splitter.feed(line))
+            start(splitter.flush())
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        segments = len(tasks)
+
+        all_cues = []
+        total_samples = 0
+        sample_rate = 0
+        partial_path = output_audio_path + ".part"
+        try:
+            with open(partial_path, "wb") as audio_file:
+                for audio, cues in results:
+                    offset = total_samples / sample_rate if sample_rate else 0.0
+                    for cue in cues:
+                        # Word offsets are relative to the cue start, so only the cue moves
+                        all_cues.append(dict(cue, start=cue['start'] + offset, end=cue['end'] + offset))
+                    audio_file.write(audio)
+                    n_samples, segment_rate = mp3_samples(audio)
+                    if sample_rate and segment_rate and segment_rate != sample_rate:
+                        raise ValueError(f"Segment sample rate changed: {sample_rate} -> {segment_rate}")
+                    total_samples += n_samples
+                    sample_rate = sample_rate or segment_rate
+            os.replace(partial_path, output_audio_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        print(f"Synthesized {segments} TTS segments (concurrency {self.concurrency}).")
+        return all_cues
+
+    def cache_key(self, text):
+        """
+        Cache key of a synthesis: the (cleaned) text, every setting that changes the audio and
+        the boundary events the cues were built from (entries cached before word timings
+        were requested have sentence cues only and must not be served).
+        The segmented mode is not part of it: both modes speak the same text with the same settings.
+        """
+        return DiskLRUCache.make_key(text, self.voice, self.rate, self.volume, self.BOUNDARY)
+
+    async def _stream(self, text, audio_file):
+        """
+        Writes the audio chunks of one Communicate request to audio_file and returns its cues.
+        With WordBoundary events the cues follow the lines of text and carry word timings;
+        SentenceBoundary events are turned into cues by SubMaker as before.
+        """
+        kwargs = {}
+        if self._accepts_boundary():
+            kwargs['boundary'] = self.BOUNDARY
+        communicate = self.engine(text, self.voice, rate=self.rate, volume=self.volume, **kwargs)
+        submaker = edge_tts.SubMaker()
+        words = []
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio_file.write(chunk["data"])
+            elif chunk["type"] == "WordBoundary":
+                # Offsets and durations are in 100 ns ticks
+                words.append((chunk["offset"] / 1e7, chunk["duration"] / 1e7, chunk["text"]))
+            elif chunk["type"] == "SentenceBoundary":
+                submaker.feed(chunk)
+        if words:
+            return cues_from_words(text, words)
+        return [{
+            'start': cue.start.total_seconds(),
+            'end': cue.end.total_seconds(),
+            'text': cue.content
+        } for cue in submaker.cues]
+
+    def _accepts_boundary(self):
+        # edge-tts >= 7 defaults to SentenceBoundary and takes a boundary argument;
+        # older versions always emit WordBoundary events.
+        try:
+            return 'boundary' in inspect.signature(self.engine).parameters
+        except (TypeError, ValueError):
+            return False
+
+    async def generate_audio_with_subtitles_async(self, text, output_audio_path, output_sub_path, segmented=False):
+        """
+        Generates audio and subtitles (VTT) in-process. Returns True on success.
+        :param segmented: Synthesize sentence-aligned segments concurrently (synthesize_segmented).
         """
-        # Create a temporary text file for input
-        temp_text_file = "temp_tts_input.txt"
-        with open(temp_text_file, "w", encoding="utf-8") as f:
-            f.write(text)
-        
-        # Build command
-        # python -m edge_tts --file "temp.txt" --voice "voice" --write-media "out.mp3" --write-subtitles "out.vtt"
-        # Note: --rate and --volume might need to be passed differently or not supported in simple CLI arg parsing 
-        # for all versions, but let's try standard args.
-        
-        cmd = [
-            "python", "-m", "edge_tts",
-            "--file", temp_text_file,
-            "--voice", self.voice,
-            "--rate", self.rate,
-            "--volume", self.volume,
-            "--write-media", output_audio_path,
-            "--write-subtitles", output_sub_path
-        ]
-        
         try:
-            print(f"Running TTS command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-            # Clean up temp file
-            if os.path.exists(temp_text_file):
-                os.remove(temp_text_file)
+            cache_key = self.cache_key(text)
+            cached_path = self.cache.lookup(cache_key) if self.cache else None
+            if cached_path:
+                cues = self.cache.read_meta(cache_key).get('cues', [])
+                shutil.copyfile(cached_path, output_audio_path)
+                print(f"TTS cache hit ({self.cache.hits} hits, {self.cache.misses} misses).")
+            else:
+                if segmented:
+                    cues = await self.synthesize_segmented(text, output_audio_path)
+                else:
+                    cues = await self.synthesize(text, output_audio_path)
+                if self.cache:
+                    self.cache.put(cache_key, src_path=output_audio_path, meta={'cues': cues})
+            self._write_subtitles(output_sub_path, cues)
             return True
-        except subprocess.CalledProcessError as e:
-            print(f"Error running edge-tts: {e.stderr}")
-            if os.path.exists(temp_text_file):
-                os.remove(temp_text_file)
+        except Exception as e:
+            print(f"Error running edge-tts: {e}")
             return False
 
+    async def generate_audio_with_subtitles_from_stream(self, lines, output_audio_path, output_sub_path, on_audio=None):
+        """
+        Streaming counterpart of generate_audio_with_subtitles_async(segmented=True):
+        lines is an async iterable of cleaned script lines, synthesized while they arrive.
+        The result is cached under the joined text, like the other modes.
+        Returns the joined text (what the non-streaming path would be called with), or None.
+        An exception raised by lines cancels the synthesis and is re-raised: nothing is
+        written or cached.
+        """
+        received = []
+        source_errors = []
+
+        async def collect():
+            try:
+                async for line in lines:
+                    line = line.strip()
+                    if line:
+                        received.append(line)
+                        yield line
+            except Exception as e:
+                source_errors.append(e)
+                raise
+
+        try:
+            cues = await self.synthesize_stream(collect(), output_audio_path, on_audio=on_audio)
+            text = '\n'.join(received)
+            if self.cache:
+                self.cache.put(self.cache_key(text), src_path=output_audio_path, meta={'cues': cues})
+            self._write_subtitles(output_sub_path, cues)
+            return text
+        except Exception as e:
+            if source_errors:
+                raise
+            print(f"Error running edge-tts: {e}")
+            return None
+
+    def _write_subtitles(self, output_sub_path, cues):
+        write_vtt(output_sub_path, cues)
+        if any(cue.get('words') for cue in cues):
+            write_word_timings(output_sub_path, cues)
+        elif os.path.exists(word_timings_path(output_sub_path)):
+            os.remove(word_timings_path(output_sub_path))
+
+    def generate_audio_with_subtitles(self, text, output_audio_path, output_sub_path, segmented=False):
+        """
+        Synchronous wrapper for generate_audio_with_subtitles_async.
+        """
+        print(f"Running TTS: voice={self.voice}, rate={self.rate}, volume={self.volume}, {len(text)} chars")
+        return asyncio.run(self.generate_audio_with_subtitles_async(text, output_audio_path, output_sub_path, segmented=segmented))
+
 if __name__ == "__main__":
     # Test stub
     client = TTSClient()
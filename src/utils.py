@@ -1,4 +1,6 @@
+import os
 import re
+import json
 
 def clean_script(text):
     """
@@ -80,3 +82,54 @@ def parse_time(time_str):
     minutes = float(parts[1])
     seconds = float(parts[2])
     return hours * 3600 + minutes * 60 + seconds
+
+def format_vtt_time(seconds):
+    """
+    Converts seconds (float) to a VTT timestamp (00:00:01.250).
+    """
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+def write_vtt(vtt_path, subs):
+    """
+    Writes subtitles in the parse_vtt format to a WebVTT file.
+    """
+    with open(vtt_path, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n")
+        for i, sub in enumerate(subs, 1):
+            f.write(f"{i}\n{format_vtt_time(sub['start'])} --> {format_vtt_time(sub['end'])}\n{sub['text']}\n\n")
+
+def word_timings_path(vtt_path):
+    """
+    Path of the word timing sidecar of a VTT file (audio_x.vtt -> audio_x.words.json).
+    """
+    return os.path.splitext(vtt_path)[0] + ".words.json"
+
+def write_word_timings(vtt_path, subs):
+    """
+    Writes the per-cue word timings next to the VTT file. Each cue stores
+    [offset, duration, char_start, char_end] per word, relative to the cue start.
+    """
+    cues = [{'start': sub['start'], 'text': sub['text'], 'words': sub.get('words') or []} for sub in subs]
+    with open(word_timings_path(vtt_path), 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'cues': cues}, f, ensure_ascii=False, separators=(',', ':'))
+
+def load_subtitles(vtt_path):
+    """
+    parse_vtt plus the word timings from the sidecar file, if there is one matching
+    the VTT (sub['words'] is set on every cue that has timings).
+    """
+    subs = parse_vtt(vtt_path)
+    try:
+        with open(word_timings_path(vtt_path), 'r', encoding='utf-8') as f:
+            cues = json.load(f).get('cues', [])
+    except (OSError, ValueError):
+        return subs
+    if len(cues) == len(subs) and all(cue['text'] == sub['text'] for cue, sub in zip(cues, subs)):
+        for cue, sub in zip(cues, subs):
+            if cue.get('words'):
+                sub['words'] = cue['words']
+    return subs
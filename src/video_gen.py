@@ -1,10 +1,16 @@
-from moviepy import VideoFileClip, AudioFileClip, TextClip, ColorClip, CompositeVideoClip, ImageClip, CompositeAudioClip
+from moviepy import VideoFileClip, AudioFileClip, TextClip, ColorClip, CompositeVideoClip, ImageClip
 import os
 import sys
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from src.utils import parse_vtt
-from PIL import Image, ImageDraw, ImageFont
+from src.utils import load_subtitles
+from src.karaoke_mask import KaraokeMask, WordTiming
+from src.font_registry import get_font_registry
+from src.text_layout import wrap_text
+from src.subtitle_atlas import SubtitleAtlas
+from src.subtitle_layer import SubtitleLayer
+from src.encoder_profiles import get_encoder_profile, moviepy_write_kwargs
+from PIL import Image, ImageDraw
 import numpy as np
 
 class VideoGenerator:
@@ -16,58 +22,69 @@ class VideoGenerator:
         """
         self.width = output_width
         self.height = output_height
+        self._atlases = {}
 
-    def generate_simple_video(self, audio_path, script_text, output_path, bg_image_path=None, vtt_path=None, bgm_path=None):
+    def generate_simple_video(self, audio_path, script_text, output_path, bg_image_path=None, vtt_path=None, bgm_path=None, renderer="moviepy", workers=None, encoder_profile=None):
         """
         Generates a simple video with audio and a static background/text.
+
+        :param renderer: 'moviepy' (default) composites frames in Python.
+                         'ffmpeg' burns ASS karaoke subtitles in one ffmpeg call and
+                         falls back to MoviePy if that fails.
+                         'compositor' keeps the background as one cached frame and only
+                         redraws the subtitle band before handing frames to the encoder.
+                         'parallel' splits the timeline at cue boundaries and renders the
+                         chunks with the compositor in `workers` processes.
+        :param encoder_profile: 'draft', 'balanced' or 'archive' (default: config ENCODER_PROFILE).
         """
         voice_audio = None
-        bgm_source = None
         bg_clip = None
         video = None
-        
-        try:
-            # 1. Load Voice Audio
-            voice_audio = AudioFileClip(audio_path)
-            duration = voice_audio.duration
+        premix_path = None
 
-            # 2. Setup Audio (Voice + BGM)
-            final_audio = voice_audio
+        try:
+            # 1. Premix Audio (Voice + BGM) into one track, used by every renderer
+            mixed_audio_path = audio_path
             if bgm_path and os.path.exists(bgm_path):
                 try:
-                    bgm_source = AudioFileClip(bgm_path)
-                    bgm = bgm_source
-                    # Loop BGM if shorter than video, or cut if longer
-                    # In MoviePy 2.0+, loop is an effect.
-                    # If we encounter issues, we can try manual looping by concatenation or just subclip if long enough
-                    
-                    if bgm.duration < duration:
-                        # Manual loop: concatenate bgm with itself enough times
-                        n_loops = int(duration / bgm.duration) + 1
-                        bgm = CompositeAudioClip([bgm.with_start(i*bgm.duration) for i in range(n_loops)])
-                        bgm = bgm.subclipped(0, duration)
-                    else:
-                        bgm = bgm.subclipped(0, duration)
-                    
-                    # Lower BGM volume
-                    bgm = bgm.with_volume_scaled(0.1)
-                    
-                    # Mix voice and BGM
-                    final_audio = CompositeAudioClip([voice_audio, bgm])
+                    premix_path = self._premix_audio(audio_path, bgm_path)
+                    mixed_audio_path = premix_path
                 except Exception as e:
                     print(f"Error processing BGM: {e}. Proceeding without BGM.")
                     import traceback
                     traceback.print_exc()
 
+            if renderer == "ffmpeg":
+                try:
+                    from src.ffmpeg_renderer import FFmpegRenderer
+                    if FFmpegRenderer(self, encoder_profile=encoder_profile).render(mixed_audio_path, output_path, bg_image_path=bg_image_path, vtt_path=vtt_path):
+                        return True
+                except Exception as e:
+                    print(f"Error in ffmpeg renderer: {e}")
+                print("ffmpeg renderer failed, falling back to MoviePy.")
+
+            # 2. Load Audio
+            voice_audio = AudioFileClip(mixed_audio_path)
+            duration = voice_audio.duration
+            final_audio = voice_audio
+
+            if renderer == "compositor":
+                from src.band_compositor import BandCompositor
+                return BandCompositor(self, encoder_profile=encoder_profile).render(final_audio, duration, output_path, bg_image_path=bg_image_path, vtt_path=vtt_path)
+            if renderer == "parallel":
+                from src.parallel_render import ParallelRenderer
+                return ParallelRenderer(self, workers=workers, encoder_profile=encoder_profile).render(final_audio, duration, output_path, bg_image_path=bg_image_path, vtt_path=vtt_path)
+
             # 3. Create Background
             if bg_image_path and os.path.exists(bg_image_path):
                 # Use provided background image
                 bg_clip = ImageClip(bg_image_path).with_duration(duration)
-                # Resize to fill screen (crop if necessary)
-                bg_clip = bg_clip.resized(height=self.height)
-                if bg_clip.w < self.width:
-                    bg_clip = bg_clip.resized(width=self.width)
-                bg_clip = bg_clip.cropped(x_center=bg_clip.w/2, y_center=bg_clip.h/2, width=self.width, height=self.height)
+                # Resize to fill screen (crop if necessary); ImageClient already stores frame-sized images
+                if tuple(bg_clip.size) != (self.width, self.height):
+                    bg_clip = bg_clip.resized(height=self.height)
+                    if bg_clip.w < self.width:
+                        bg_clip = bg_clip.resized(width=self.width)
+                    bg_clip = bg_clip.cropped(x_center=bg_clip.w/2, y_center=bg_clip.h/2, width=self.width, height=self.height)
             else:
                 # Default black background
                 bg_clip = ColorClip(size=(self.width, self.height), color=(0, 0, 0), duration=duration)
@@ -76,30 +93,22 @@ class VideoGenerator:
             clips = [bg_clip]
             
             if vtt_path and os.path.exists(vtt_path):
-                subs = parse_vtt(vtt_path)
+                subs = load_subtitles(vtt_path)
                 print(f"Parsed {len(subs)} subtitle lines.")
                 
-                # Create a clip for each subtitle
+                # One layer draws the active cue (found by binary search) for each frame,
+                # instead of compositing one karaoke clip per cue.
                 # We use PIL to generate text images because TextClip requires ImageMagick
-                for sub in subs:
-                    start = sub['start']
-                    end = sub['end']
-                    text = sub['text']
-                    
-                    if end > duration: end = duration
-                    
-                    if start < end:
-                        # Use Karaoke Clip
-                        # color_base='white', color_active='#FFD700' (Gold)
-                        txt_clip = self.create_karaoke_clip(text, duration=end-start, color_base='white', color_active='#FFD700')
-                        txt_clip = txt_clip.with_start(start).with_position(('center', 0.8), relative=True) # Bottom 20%
-                        clips.append(txt_clip)
+                # color_base='white', color_active='#FFD700' (Gold)
+                subtitle_layer = SubtitleLayer(self, subs, duration, color_base='white', color_active='#FFD700')
+                if len(subtitle_layer.index):
+                    clips.append(subtitle_layer.to_clip())
 
             # 5. Composite
             video = CompositeVideoClip(clips).with_audio(final_audio).with_duration(duration)
             
             # Write file
-            video.write_videofile(output_path, fps=24, codec="libx264", audio_codec="aac")
+            video.write_videofile(output_path, fps=24, audio_codec="aac", **moviepy_write_kwargs(get_encoder_profile(encoder_profile)))
             return True
 
         except Exception as e:
@@ -112,22 +121,35 @@ class VideoGenerator:
             try:
                 if video: video.close()
                 if voice_audio: voice_audio.close()
-                if bgm_source: bgm_source.close()
                 if bg_clip: bg_clip.close()
+                if premix_path and os.path.exists(premix_path): os.remove(premix_path)
             except Exception as e:
                 print(f"Error closing clips: {e}")
 
-    def create_karaoke_clip(self, text, duration, fontsize=70, color_base='white', color_active='#FFD700', stroke_width=4, stroke_fill='black'):
+    def _premix_audio(self, audio_path, bgm_path):
+        """
+        Mixes voice and looped BGM into a temporary WAV next to the voice file. Returns its path.
+        """
+        from src.audio_mix import AudioPremixer
+        premix_path = os.path.splitext(audio_path)[0] + "_premix.wav"
+        AudioPremixer().premix(audio_path, bgm_path, premix_path)
+        return premix_path
+
+    def create_karaoke_clip(self, text, duration, fontsize=70, color_base='white', color_active='#FFD700', stroke_width=4, stroke_fill='black', words=None):
         """
         Creates a karaoke-style clip where text changes color progressively.
         Simulates "follow-along" effect using a wipe mask.
+        :param words: Optional word timings of the cue (see load_subtitles); the wipe then follows the speech.
         """
+        # The text is rasterized once (cached per unique text) and tinted for both colors
+        atlas = self._get_atlas(fontsize, stroke_width)
+
         # 1. Create Base Image (Unspoken color, e.g., White)
-        img_base_np = self._create_text_image_np(text, fontsize, color_base, stroke_width, stroke_fill)
+        img_base_np = atlas.tint(text, color_base, stroke_fill)
         clip_base = ImageClip(img_base_np).with_duration(duration)
         
         # 2. Create Active Image (Spoken color, e.g., Yellow)
-        img_active_np = self._create_text_image_np(text, fontsize, color_active, stroke_width, stroke_fill)
+        img_active_np = atlas.tint(text, color_active, stroke_fill)
         clip_active = ImageClip(img_active_np).with_duration(duration)
         
         # 3. Create Dynamic Wipe Mask
@@ -142,31 +164,15 @@ class VideoGenerator:
         
         # Get the original alpha channel from the text image (0 where no text, 255 where text is)
         # img_active_np is RGBA, so index 3 is alpha.
-        original_alpha = img_active_np[:, :, 3].astype(float) / 255.0
-        
-        def make_mask(t):
-            # Create the wipe mask (H, W)
-            wipe = np.zeros((h, w), dtype=float)
-            
-            if duration <= 0: progress = 1.0
-            else: progress = t / duration
-            progress = max(0.0, min(1.0, progress))
-            
-            reveal_w = int(w * progress)
-            if reveal_w > 0:
-                wipe[:, :reveal_w] = 1.0
-            
-            # Combine wipe mask with original text alpha
-            # This ensures we only show "Yellow" where there is text AND where the wipe has reached.
-            # Otherwise, the wipe would show a yellow rectangle over transparent areas if we just used the wipe.
-            final_mask = wipe * original_alpha
-            return final_mask
+        # KaraokeMask converts it once and fills a reused buffer up to the reveal column,
+        # so we only show "Yellow" where there is text AND where the wipe has reached.
+        karaoke_mask = KaraokeMask(img_active_np[:, :, 3], duration, timing=self._word_timing(text, words, fontsize))
 
         # Apply mask to active clip
         from moviepy import VideoClip
         # MoviePy 2.x requires make_frame as the first positional argument
         # And 'is_mask' instead of 'ismask'
-        mask_clip = VideoClip(make_mask, duration=duration, is_mask=True)
+        mask_clip = VideoClip(karaoke_mask.make_mask, duration=duration, is_mask=True)
         clip_active = clip_active.with_mask(mask_clip)
         
         # 4. Composite: Base + Active (masked)
@@ -175,44 +181,15 @@ class VideoGenerator:
         final_clip = CompositeVideoClip([clip_base, clip_active], size=(w,h))
         return final_clip
 
-    def _create_text_image_np(self, text, fontsize, color, stroke_width, stroke_fill):
+    def _create_text_image_np(self, text, fontsize, color, stroke_width, stroke_fill, lines=None):
         """
         Helper to generate the numpy image for text. Refactored from create_text_clip_pil.
+        :param lines: Precomputed line layout (see _layout_lines); computed here if not given.
         """
         img_w = self.width - 80
-        
-        # Font loading logic (same as before)
-        font_paths = [
-            "C:/Windows/Fonts/msyhbd.ttc",
-            "C:/Windows/Fonts/msyh.ttc",
-            "C:/Windows/Fonts/simhei.ttf",
-            "arialbd.ttf",
-            "arial.ttf"
-        ]
-        font_path = "arial.ttf"
-        for p in font_paths:
-            if os.path.exists(p):
-                font_path = p
-                break
-        try:
-            font = ImageFont.truetype(font_path, fontsize)
-        except:
-            font = ImageFont.load_default()
-
-        # Wrap text
-        lines = []
-        current_line = ""
-        for char in text:
-            test_line = current_line + char
-            bbox = font.getbbox(test_line)
-            w = bbox[2] - bbox[0]
-            if w > img_w:
-                lines.append(current_line)
-                current_line = char
-            else:
-                current_line = test_line
-        if current_line:
-            lines.append(current_line)
+        font = self._load_font(fontsize)
+        if lines is None:
+            lines = self._wrap_text(text, font, img_w)
             
         line_height = fontsize * 1.5
         img_h = int(len(lines) * line_height) + 40 
@@ -233,6 +210,52 @@ class VideoGenerator:
             
         return np.array(img)
 
+    def _load_font(self, fontsize):
+        """
+        Returns the subtitle font from the process-wide registry (cached per size).
+        """
+        return get_font_registry().get_font(fontsize)
+
+    def _wrap_text(self, text, font, max_width):
+        """
+        Wraps text into lines that fit into max_width pixels (linear time, CJK line-break rules).
+        """
+        return wrap_text(text, font, max_width)
+
+    def _get_atlas(self, fontsize, stroke_width):
+        """
+        Returns the subtitle sprite atlas for this font size / stroke width.
+        """
+        key = (fontsize, stroke_width)
+        if key not in self._atlases:
+            self._atlases[key] = SubtitleAtlas(self, fontsize=fontsize, stroke_width=stroke_width)
+        return self._atlases[key]
+
+    def _layout_lines(self, text, fontsize):
+        """
+        Computes the subtitle line layout once per cue, shared by the base and active renders.
+        """
+        return self._wrap_text(text, self._load_font(fontsize), self.width - 80)
+
+    def _word_timing(self, text, words, fontsize):
+        """
+        Builds the WordTiming of a cue from its word timings (None if there are none).
+        Single-line cues use the glyph positions of the drawn text. The wipe mask is
+        column-based, so wrapped cues split the sprite width by character count.
+        """
+        if not words:
+            return None
+        img_w = self.width - 80
+        lines = self._layout_lines(text, fontsize)
+        if len(lines) == 1 and lines[0] == text:
+            font = self._load_font(fontsize)
+            columns = [0] + [10 + int(font.getlength(text[:i])) for i in range(1, len(text) + 1)]
+        else:
+            columns = [int(img_w * i / len(text)) for i in range(len(text) + 1)]
+        # The end of the cue reveals the whole sprite (stroke included)
+        columns[-1] = img_w
+        return WordTiming(words, columns)
+
 if __name__ == "__main__":
     # Test Stub
     pass
@@ -0,0 +1,49 @@
+"""
+Encoder profile benchmark: encode seconds vs output bytes for each profile.
+
+Usage: python tests/bench_encoder_profiles.py [--seconds 20]
+Frames come from the band compositor on data/background.jpg (same frames for every profile).
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import ENCODER_PROFILES
+from src.video_gen import VideoGenerator
+from src.band_compositor import BandCompositor
+from src.encoder_profiles import get_encoder_profile
+from bench_renderers import BG_PATH, make_subs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encoder profile benchmark")
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    subs = make_subs(args.seconds)
+    print(f"{args.seconds:.0f}s of 1080x1920 @ 24 fps (still background + karaoke subtitles)")
+    print(f"{'profile':<10} {'preset':<10} {'crf':>4} {'gop':>5} {'seconds':>9} {'x realtime':>11} {'bytes':>12}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # x264 defaults as used by write_videofile before encoder profiles, for reference
+        baseline = {"preset": "medium", "tune": None, "crf": 23, "threads": 0, "gop": 250, "pix_fmt": "yuv420p"}
+        profiles = [("(old)", baseline)] + [(name, get_encoder_profile(name)) for name in ENCODER_PROFILES]
+        for name, profile in profiles:
+            compositor = BandCompositor(VideoGenerator(), encoder_profile=profile)
+            background = compositor.load_background(BG_PATH)
+            output_path = os.path.join(tmp_dir, f"{name}.mp4")
+
+            start = time.perf_counter()
+            compositor.write_frames(output_path, compositor.iter_frames(background, subs, args.seconds))
+            elapsed = time.perf_counter() - start
+
+            size = os.path.getsize(output_path)
+            print(f"{name:<10} {profile['preset']:<10} {profile['crf']:>4} {profile['gop']:>5} {elapsed:>9.1f} {args.seconds / elapsed:>11.2f} {size:>12,}")
+
+
+if __name__ == "__main__":
+    main()
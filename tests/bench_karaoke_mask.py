@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: karaoke wipe mask, legacy per-frame allocation vs KaraokeMask.
+
+Usage: python tests/bench_karaoke_mask.py [--frames 2000]
+Reports frames/sec and bytes allocated per frame (tracemalloc) for a subtitle-sized mask.
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.karaoke_mask import KaraokeMask
+from test_karaoke_mask import legacy_make_mask, _random_alpha
+
+
+def _measure(make_mask, times):
+    # Throughput
+    start = time.perf_counter()
+    for t in times:
+        make_mask(t)
+    elapsed = time.perf_counter() - start
+
+    # Allocations: sum of per-frame peaks above the steady state
+    tracemalloc.start()
+    allocated = 0
+    for t in times:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        make_mask(t)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - before
+    tracemalloc.stop()
+    return len(times) / elapsed, allocated / len(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Karaoke mask micro-benchmark")
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    # 1000x105 is the size of a one-line cue at fontsize 70 on a 1080 wide video
+    alpha = _random_alpha(h=105, w=1000)
+    duration = args.frames / 24
+    times = [i / 24 for i in range(args.frames)]
+
+    results = [
+        ("legacy (np.zeros per frame)", _measure(legacy_make_mask(alpha, duration), times)),
+        ("KaraokeMask (reused buffer)", _measure(KaraokeMask(alpha, duration).make_mask, times)),
+    ]
+
+    print(f"{'engine':<30} {'frames/sec':>12} {'bytes alloc/frame':>18}")
+    for name, (fps, per_frame) in results:
+        print(f"{name:<30} {fps:>12.0f} {per_frame:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Render-throughput comparison on the bundled data/background.jpg.
+
+Usage: python tests/bench_renderers.py [--seconds 10] [--encode]
+
+Without --encode only frame production is timed (MoviePy with one clip per cue,
+MoviePy with a single SubtitleLayer, BandCompositor), together with the bytes
+allocated per frame. Use a long --seconds to see the per-cue cost grow. With --encode every
+renderer also writes a full MP4 (voice only) and the wall time is reported.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.video_gen import VideoGenerator
+from src.band_compositor import BandCompositor
+from src.subtitle_layer import SubtitleLayer
+from moviepy import ImageClip, CompositeVideoClip
+from moviepy.config import FFMPEG_BINARY
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BG_PATH = os.path.join(BASE_DIR, "data", "background.jpg")
+TEXTS = ["你有没有想过，", "为什么有些人总是存不下钱？", "真正重要的东西，", "用眼睛是看不见的。"]
+
+
+def make_subs(seconds):
+    subs = []
+    t = 0.0
+    while t < seconds:
+        subs.append({'start': t, 'end': min(t + 1.9, seconds), 'text': TEXTS[len(subs) % len(TEXTS)]})
+        t += 2.0
+    return subs
+
+
+def _bg_clip(video_gen, duration):
+    bg_clip = ImageClip(BG_PATH).with_duration(duration)
+    bg_clip = bg_clip.resized(height=video_gen.height)
+    if bg_clip.w < video_gen.width:
+        bg_clip = bg_clip.resized(width=video_gen.width)
+    return bg_clip.cropped(x_center=bg_clip.w/2, y_center=bg_clip.h/2, width=video_gen.width, height=video_gen.height)
+
+
+def moviepy_frames(video_gen, subs, duration, fps):
+    # Previous MoviePy path: one karaoke clip per cue
+    clips = [_bg_clip(video_gen, duration)]
+    for sub in subs:
+        txt_clip = video_gen.create_karaoke_clip(sub['text'], duration=sub['end'] - sub['start'])
+        clips.append(txt_clip.with_start(sub['start']).with_position(('center', 0.8), relative=True))
+    video = CompositeVideoClip(clips).with_duration(duration)
+    for i in range(int(duration * fps)):
+        yield video.get_frame(i / fps)
+
+
+def moviepy_layer_frames(video_gen, subs, duration, fps):
+    # Current MoviePy path: background + one SubtitleLayer
+    video = CompositeVideoClip([_bg_clip(video_gen, duration), SubtitleLayer(video_gen, subs, duration).to_clip()]).with_duration(duration)
+    for i in range(int(duration * fps)):
+        yield video.get_frame(i / fps)
+
+
+def compositor_frames(video_gen, subs, duration, fps):
+    compositor = BandCompositor(video_gen, fps=fps)
+    background = compositor.load_background(BG_PATH)
+    yield from compositor.iter_frames(background, subs, duration)
+
+
+def measure(frames):
+    tracemalloc.start()
+    allocated = 0
+    count = 0
+    start = time.perf_counter()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in frames:
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - before
+        count += 1
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    return count / elapsed, allocated / max(count, 1)
+
+
+def encode(renderer, seconds, tmp_dir):
+    audio_path = os.path.join(tmp_dir, "voice.mp3")
+    vtt_path = os.path.join(tmp_dir, "voice.vtt")
+    if not os.path.exists(audio_path):
+        subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=300:duration={seconds}", audio_path], check=True)
+        with open(vtt_path, "w", encoding="utf-8") as f:
+            f.write("WEBVTT\n\n")
+            for i, sub in enumerate(make_subs(seconds), 1):
+                f.write(f"{i}\n00:00:{sub['start']:06.3f} --> 00:00:{sub['end']:06.3f}\n{sub['text']}\n\n")
+    output_path = os.path.join(tmp_dir, f"out_{renderer}.mp4")
+    start = time.perf_counter()
+    VideoGenerator().generate_simple_video(audio_path, "", output_path, bg_image_path=BG_PATH, vtt_path=vtt_path, renderer=renderer)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renderer throughput benchmark")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--encode", action="store_true", help="Also time full renders (MP4 encode)")
+    args = parser.parse_args()
+
+    video_gen = VideoGenerator()
+    subs = make_subs(args.seconds)
+
+    print(f"Frame production, {args.seconds:.0f}s @ {args.fps} fps, 1080x1920")
+    print(f"{'engine':<16} {'frames/sec':>12} {'MB alloc/frame':>16}")
+    for name, frames in [("moviepy per-cue", moviepy_frames), ("moviepy layer", moviepy_layer_frames), ("compositor", compositor_frames)]:
+        fps, per_frame = measure(frames(video_gen, subs, args.seconds, args.fps))
+        print(f"{name:<16} {fps:>12.1f} {per_frame / 1e6:>16.2f}")
+
+    if args.encode:
+        print(f"\nFull render (encode included), {args.seconds:.0f}s of video")
+        print(f"{'renderer':<16} {'seconds':>10} {'x realtime':>12}")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for renderer in ["moviepy", "compositor", "ffmpeg"]:
+                elapsed = encode(renderer, args.seconds, tmp_dir)
+                print(f"{renderer:<16} {elapsed:>10.1f} {args.seconds / elapsed:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
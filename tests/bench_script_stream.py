@@ -0,0 +1,92 @@
+"""
+Streaming script + TTS benchmark: time to first audio and end-to-end latency.
+
+Usage: python tests/bench_script_stream.py [--chars-per-sec 40] [--tts-latency 0.5] [--tts-chars-per-sec 80] [--repeat 3]
+
+A fake LLM streams a ~400 character script at --chars-per-sec and a fake TTS service
+answers each segment after --tts-latency seconds plus its length / --tts-chars-per-sec. "sequential" waits for the whole script
+before segmented TTS starts (the --parallel-tts path); "streaming" feeds completed
+sentences to TTS while the script is still being written (--stream-script).
+Both must produce byte-identical audio and VTT.
+"""
+import os
+import sys
+import time
+import argparse
+import asyncio
+import tempfile
+
+# Any key will do: every request goes to the fake API
+os.environ.setdefault("LLM_API_KEY", "bench")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.llm_client import LLMClient
+from src.tts_client import TTSClient
+from src.script_stream import stream_script_to_speech
+from src.utils import clean_script
+from fake_llm import FakeOpenAI
+from fake_tts import FakeCommunicate
+from test_script_stream import RAW_SCRIPT
+
+
+def make_clients(script, chars_per_sec, tts_latency, tts_chars_per_sec):
+    llm = LLMClient(cache=False)
+    llm.client = FakeOpenAI(lambda messages: script)
+    llm.client.chat.completions.stream_delay = llm.client.chat.completions.piece_chars / chars_per_sec
+    FakeCommunicate.latency = tts_latency
+    FakeCommunicate.char_latency = 1 / tts_chars_per_sec
+    tts = TTSClient(engine=FakeCommunicate, cache_dir=None)
+    return llm, tts
+
+
+async def sequential(llm, tts, audio_path, vtt_path):
+    start = time.perf_counter()
+    first_audio = []
+    script = "".join(await asyncio.to_thread(lambda: list(llm.stream_script("书"))))
+    script_done = time.perf_counter() - start
+
+    async def lines():
+        for line in clean_script(script).split("\n"):
+            yield line
+
+    await tts.generate_audio_with_subtitles_from_stream(
+        lines(), audio_path, vtt_path,
+        on_audio=lambda i: first_audio.append(time.perf_counter() - start)
+    )
+    return {'first_audio': first_audio[0], 'script_done': script_done, 'total': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming script + TTS benchmark")
+    parser.add_argument("--chars-per-sec", type=float, default=40)
+    parser.add_argument("--tts-latency", type=float, default=0.5)
+    parser.add_argument("--tts-chars-per-sec", type=float, default=80)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    script = RAW_SCRIPT * 3
+    print(f"{len(script)} character script at {args.chars_per_sec:.0f} chars/s, "
+          f"TTS {args.tts_latency}s + {args.tts_chars_per_sec:.0f} chars/s per segment")
+    print(f"{'mode':<12} {'first audio':>12} {'script done':>12} {'end-to-end':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        outputs = {}
+        for mode in ["sequential", "streaming"]:
+            reports = []
+            audio_path = os.path.join(tmp_dir, f"{mode}.mp3")
+            vtt_path = os.path.join(tmp_dir, f"{mode}.vtt")
+            for _ in range(args.repeat):
+                llm, tts = make_clients(script, args.chars_per_sec, args.tts_latency, args.tts_chars_per_sec)
+                if mode == "sequential":
+                    reports.append(asyncio.run(sequential(llm, tts, audio_path, vtt_path)))
+                else:
+                    reports.append(asyncio.run(stream_script_to_speech(llm, tts, "书", audio_path, vtt_path))[1])
+            best = {key: min(r[key] for r in reports) for key in reports[0]}
+            print(f"{mode:<12} {best['first_audio']:>11.2f}s {best['script_done']:>11.2f}s {best['total']:>10.2f}s")
+            with open(audio_path, "rb") as f_audio, open(vtt_path, "rb") as f_vtt:
+                outputs[mode] = (f_audio.read(), f_vtt.read())
+    print("identical audio and VTT:", outputs["sequential"] == outputs["streaming"])
+
+
+if __name__ == "__main__":
+    main()
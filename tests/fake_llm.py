@@ -0,0 +1,72 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API:
+client.chat.completions.create(**kwargs) answers with a canned or derived reply
+(awaitable on FakeAsyncOpenAI, with optional latency and in-flight tracking).
+With stream=True the reply is returned as delta chunks of piece_chars characters,
+one every stream_delay seconds.
+"""
+import time
+import asyncio
+from types import SimpleNamespace
+
+
+class FakeCompletions:
+    stream_delay = 0.0
+    piece_chars = 3
+
+    def __init__(self, reply=None):
+        # The prompts share long template prefixes; their ends tell them apart
+        self.reply = reply or (lambda messages: f"reply to: {messages[-1]['content'][-40:]}")
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.reply(kwargs['messages'])
+        if kwargs.get('stream'):
+            return self._stream(content)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(kwargs['messages'][-1]['content']), completion_tokens=len(content)),
+        )
+
+
+    def _stream(self, content):
+        for i in range(0, len(content), self.piece_chars):
+            if self.stream_delay:
+                time.sleep(self.stream_delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + self.piece_chars]))], usage=None)
+
+
+class FakeOpenAI:
+    def __init__(self, reply=None):
+        self.chat = SimpleNamespace(completions=FakeCompletions(reply))
+
+    @property
+    def calls(self):
+        return self.chat.completions.calls
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    def __init__(self, reply=None, latency=0.0):
+        super().__init__(reply)
+        self.latency = latency
+        self.active = 0
+        self.max_active = 0
+
+    async def create(self, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return FakeCompletions.create(self, **kwargs)
+        finally:
+            self.active -= 1
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    def __init__(self, reply=None, latency=0.0):
+        self.chat = SimpleNamespace(completions=FakeAsyncCompletions(reply, latency))
+
+    async def close(self):
+        pass
@@ -0,0 +1,60 @@
+"""
+Local stand-in for the edge-tts service, used as TTSClient(engine=FakeCommunicate).
+
+Speaks every character for FRAMES_PER_CHAR silent MP3 frames in the edge-tts output
+format (audio-24khz-48kbitrate-mono-mp3) and emits one SentenceBoundary per line
+(or, with boundary="WordBoundary", one WordBoundary per non-punctuation character),
+with offsets in 100 ns ticks like the real service.
+"""
+import asyncio
+
+# MPEG-2 Layer III, 48 kbps, 24 kHz, mono: 144 bytes and 576 samples (24 ms) per frame
+MP3_FRAME = b'\xff\xf3\x64\xc0' + bytes(140)
+FRAME_TICKS = 240000
+FRAMES_PER_CHAR = 10
+PUNCTUATION = "，。！？；,.!?;：:、"
+
+
+class FakeCommunicate:
+    latency = 0.0  # Seconds of simulated network round trip per request
+    char_latency = 0.0  # Additional seconds of simulated synthesis per character
+    calls = 0
+    active = 0
+    max_active = 0
+
+    def __init__(self, text, voice="zh-CN-YunxiNeural", rate="+0%", volume="+0%", boundary="SentenceBoundary", **kwargs):
+        self.text = text
+        self.voice = voice
+        self.boundary = boundary
+
+    async def stream(self):
+        FakeCommunicate.calls += 1
+        FakeCommunicate.active += 1
+        FakeCommunicate.max_active = max(FakeCommunicate.max_active, FakeCommunicate.active)
+        try:
+            if self.latency or self.char_latency:
+                await asyncio.sleep(self.latency + self.char_latency * len(self.text))
+        finally:
+            FakeCommunicate.active -= 1
+        offset = 0
+        for line in self.text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            n_frames = FRAMES_PER_CHAR * len(line)
+            char_ticks = FRAMES_PER_CHAR * FRAME_TICKS
+            if self.boundary == "WordBoundary":
+                for i, char in enumerate(line):
+                    if char not in PUNCTUATION:
+                        yield {"type": "WordBoundary", "offset": offset + i * char_ticks, "duration": char_ticks, "text": char}
+            else:
+                yield {"type": "SentenceBoundary", "offset": offset, "duration": n_frames * FRAME_TICKS, "text": line}
+            for _ in range(n_frames):
+                yield {"type": "audio", "data": MP3_FRAME}
+            offset += n_frames * FRAME_TICKS
+
+    async def save(self, audio_fname):
+        with open(audio_fname, "wb") as f:
+            async for chunk in self.stream():
+                if chunk["type"] == "audio":
+                    f.write(chunk["data"])
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import asyncio
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.llm_cache import LLMCache
+from src.llm_client import AsyncLLMClient
+from fake_llm import FakeAsyncOpenAI
+
+
+def _client(latency=0.0, **kwargs):
+    return AsyncLLMClient(cache=LLMCache(":memory:"), client=FakeAsyncOpenAI(latency=latency), **kwargs)
+
+
+def test_batch_runs_concurrently_within_the_limit():
+    client = _client(latency=0.05, concurrency=4)
+
+    async def batch():
+        return await asyncio.gather(*[client.generate_image_prompt(f"脚本 {i}") for i in range(16)])
+
+    start = time.perf_counter()
+    results = asyncio.run(batch())
+    elapsed = time.perf_counter() - start
+
+    assert len(set(results)) == 16 and all(results)
+    assert client.client.chat.completions.max_active == 4
+    assert elapsed < 16 * 0.05 / 2
+
+
+def test_deadline_returns_none():
+    client = _client(latency=1.0, timeout=0.05)
+    start = time.perf_counter()
+    assert asyncio.run(client.generate_script("book")) is None
+    assert time.perf_counter() - start < 0.5
+
+
+def test_shares_the_response_cache():
+    client = _client()
+
+    async def twice():
+        first = await client.extract_book_name("《活着》 第一章")
+        second = await client.extract_book_name("《活着》 第一章")
+        return first, second
+
+    first, second = asyncio.run(twice())
+    assert first == second
+    assert len(client.client.calls) == 1
+    assert client.cache_stats()["extract_book_name"]['hits'] == 1
+
+
+if __name__ == "__main__":
+    test_batch_runs_concurrently_within_the_limit()
+    test_deadline_returns_none()
+    test_shares_the_response_cache()
+    print("All async LLM client tests passed.")
@@ -0,0 +1,71 @@
+import os
+import sys
+import wave
+import tempfile
+import subprocess
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio_mix import AudioPremixer
+from moviepy.config import FFMPEG_BINARY
+
+
+def test_tile_loops_with_crossfade():
+    mixer = AudioPremixer(sample_rate=100, crossfade=0.1)
+    bgm = np.ones((50, 2), dtype=np.float32)
+    track = mixer.tile(bgm, 200)
+    assert track.shape == (200, 2)
+    # Constant input: the linear crossfade keeps the level constant across loop seams
+    assert np.allclose(track, 1.0, atol=1e-6)
+
+
+def test_tile_without_crossfade_repeats_and_cuts():
+    mixer = AudioPremixer(sample_rate=100, crossfade=0)
+    bgm = np.arange(10, dtype=np.float32)[:, None].repeat(2, axis=1)
+    track = mixer.tile(bgm, 25)
+    assert np.array_equal(track[:, 0], np.concatenate([np.arange(10), np.arange(10), np.arange(5)]))
+
+
+def test_duck_envelope_lowers_bgm_under_speech():
+    mixer = AudioPremixer(sample_rate=1000, duck_gain=0.5)
+    voice = np.zeros((4000, 2), dtype=np.float32)
+    voice[1000:3000] = 0.5
+    gain = mixer.duck_envelope(voice)
+    assert gain.shape == (4000,)
+    assert np.isclose(gain[2000], 0.5)
+    assert np.isclose(gain[100], 1.0)
+    assert np.isclose(gain[3900], 1.0)
+
+
+def test_premix_caches_decoded_bgm():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        voice_path = os.path.join(tmp_dir, "voice.mp3")
+        bgm_path = os.path.join(tmp_dir, "bgm.mp3")
+        out_path = os.path.join(tmp_dir, "mix.wav")
+        cache_dir = os.path.join(tmp_dir, "cache")
+        subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=300:duration=3", voice_path], check=True)
+        subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=500:duration=1", bgm_path], check=True)
+
+        mixer = AudioPremixer(cache_dir=cache_dir)
+        duration = mixer.premix(voice_path, bgm_path, out_path)
+        assert abs(duration - 3.0) < 0.1
+        assert len(os.listdir(cache_dir)) == 1
+
+        # Second load comes from the memory-mapped cache
+        cached = mixer.load_bgm(bgm_path)
+        assert isinstance(cached, np.memmap)
+
+        with wave.open(out_path, 'rb') as f:
+            assert f.getnchannels() == 2
+            assert f.getframerate() == 44100
+            assert abs(f.getnframes() / 44100 - duration) < 1e-6
+
+
+if __name__ == "__main__":
+    test_tile_loops_with_crossfade()
+    test_tile_without_crossfade_repeats_and_cuts()
+    test_duck_envelope_lowers_bgm_under_speech()
+    test_premix_caches_decoded_bgm()
+    print("All audio mix tests passed.")
@@ -0,0 +1,62 @@
+import os
+import sys
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.video_gen import VideoGenerator
+from src.band_compositor import BandCompositor
+
+BG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "background.jpg")
+
+
+def _frames(subs, duration, width=270, height=480):
+    compositor = BandCompositor(VideoGenerator(output_width=width, output_height=height))
+    background = compositor.load_background(BG_PATH)
+    return background, [frame.copy() for frame in compositor.iter_frames(background, subs, duration)]
+
+
+def test_background_is_cover_cropped():
+    compositor = BandCompositor(VideoGenerator(output_width=270, output_height=480))
+    background = compositor.load_background(BG_PATH)
+    assert background.shape == (480, 270, 3) and background.dtype == np.uint8
+    black = compositor.load_background(None)
+    assert black.shape == (480, 270, 3) and not black.any()
+
+
+def test_only_subtitle_band_is_redrawn():
+    subs = [{'start': 0.5, 'end': 1.0, 'text': 'Hi'}]
+    background, frames = _frames(subs, duration=1.5)
+    assert len(frames) == 36
+
+    band_top = int(480 * 0.8)
+    for i, frame in enumerate(frames):
+        # Everything above the band always stays the cached background
+        assert np.array_equal(frame[:band_top], background[:band_top])
+        t = i / 24
+        if 0.5 <= t < 1.0:
+            assert not np.array_equal(frame, background), f"subtitle missing at t={t}"
+        else:
+            # Dirty rectangle restored once the cue has ended
+            assert np.array_equal(frame, background), f"stale subtitle at t={t}"
+
+
+def test_karaoke_wipe_progresses():
+    subs = [{'start': 0.0, 'end': 2.0, 'text': 'Hello karaoke'}]
+    _, frames = _frames(subs, duration=2.0)
+    gold = np.array([255, 215, 0])
+
+    def gold_pixels(frame):
+        return int(np.sum(np.all(np.abs(frame.astype(int) - gold) < 40, axis=-1)))
+
+    counts = [gold_pixels(frames[i]) for i in (0, 12, 24, 36, 47)]
+    assert counts[0] == 0
+    assert counts == sorted(counts) and counts[-1] > 0
+
+
+if __name__ == "__main__":
+    test_background_is_cover_cropped()
+    test_only_subtitle_band_is_redrawn()
+    test_karaoke_wipe_progresses()
+    print("All band compositor tests passed.")
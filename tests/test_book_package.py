@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.llm_cache import LLMCache
+from src.llm_client import LLMClient, BOOK_PACKAGE_SCHEMA, parse_json_object, validate_fields
+from fake_llm import FakeOpenAI
+
+BOOK = "第一章 福贵年轻时是个纨绔子弟，嗜赌成性。" * 20
+SCRIPT = "你有没有想过，一个人失去一切之后还能不能活下去？" * 10
+PACKAGE = {
+    "book_name": "活着",
+    "script": SCRIPT,
+    "description": "【文案】\n苦难之后，是什么让人活下去？\n【标签】\n#读书 #知识分享 #余华",
+    "image_prompt": "An old farmer and his ox in a golden field at dusk, storybook illustration, soft lighting",
+}
+
+
+def _client(combined_reply):
+    def reply(messages):
+        prompt = messages[-1]['content']
+        if "JSON 对象" in prompt:
+            return combined_reply
+        return f"fallback for: {prompt[-40:]}"
+
+    return LLMClient(cache=LLMCache(":memory:"), client=FakeOpenAI(reply))
+
+
+def test_parse_and_validate():
+    fenced = "```json\n" + json.dumps(PACKAGE, ensure_ascii=False) + "\n```"
+    assert parse_json_object(fenced) == PACKAGE
+    assert parse_json_object("好的，结果如下：" + json.dumps(PACKAGE) + " 希望有帮助") == PACKAGE
+    assert parse_json_object("not json") is None
+    assert parse_json_object("[1, 2]") is None
+
+    valid, errors = validate_fields(PACKAGE, BOOK_PACKAGE_SCHEMA)
+    assert valid == PACKAGE and errors == {}
+
+    broken = dict(PACKAGE, script="太短了", image_prompt="一位老人和一头牛", book_name=None)
+    valid, errors = validate_fields(broken, BOOK_PACKAGE_SCHEMA)
+    assert set(errors) == {"book_name", "script", "image_prompt"}
+    assert set(valid) == {"description"}
+
+
+def test_single_request_when_response_is_valid():
+    client = _client(json.dumps(PACKAGE, ensure_ascii=False))
+    package, report = client.generate_book_package(BOOK)
+
+    assert package == PACKAGE
+    assert report['requests'] == 1 and report['fallbacks'] == []
+    assert report['saved_requests'] == 3
+    assert report['saved_prompt_tokens'] > 0
+    call = client.client.calls[0]
+    assert call['response_format'] == {"type": "json_object"}
+
+
+def test_only_invalid_fields_fall_back():
+    broken = dict(PACKAGE, image_prompt="一位老人和一头牛")
+    del broken["description"]
+    client = _client(json.dumps(broken, ensure_ascii=False))
+    package, report = client.generate_book_package(BOOK)
+
+    assert sorted(report['fallbacks']) == ["description", "image_prompt"]
+    assert report['requests'] == 3
+    assert package['script'] == SCRIPT and package['book_name'] == "活着"
+    assert package['description'].startswith("fallback for:")
+    assert package['image_prompt'].startswith("fallback for:")
+    # The fallbacks are generated from the combined script
+    assert SCRIPT[-20:] in client.client.calls[1]['messages'][-1]['content']
+
+
+def test_unparseable_response_falls_back_entirely():
+    client = _client("抱歉，我无法完成这个请求。")
+    package, report = client.generate_book_package(BOOK)
+    assert sorted(report['fallbacks']) == sorted(PACKAGE)
+    assert report['requests'] == 5
+    assert all(package[field] for field in PACKAGE)
+
+
+def test_latency_saving_is_estimated_from_the_request_overhead():
+    client = _client(json.dumps(PACKAGE, ensure_ascii=False))
+    _, report = client.generate_book_package(BOOK)
+    # A single timed request is not enough to separate overhead from generation time
+    assert report['saved_seconds'] is None and report['saved_seconds_basis']
+
+    client = _client(json.dumps(PACKAGE, ensure_ascii=False))
+    for tokens in (50, 100, 200, 400):
+        response = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=tokens))
+        client._record_usage("generate_image_prompt", 0.8 + 0.01 * tokens, response)
+    assert abs(client.request_overhead() - 0.8) < 1e-9
+    _, report = client.generate_book_package(BOOK)
+    assert report['saved_seconds'] is not None and report['saved_seconds'] >= 0
+    assert "overhead" in report['saved_seconds_basis']
+
+
+if __name__ == "__main__":
+    test_parse_and_validate()
+    test_single_request_when_response_is_valid()
+    test_only_invalid_fields_fall_back()
+    test_unparseable_response_falls_back_entirely()
+    test_latency_saving_is_estimated_from_the_request_overhead()
+    print("All book package tests passed.")
@@ -0,0 +1,128 @@
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.llm_cache import LLMCache
+from src.llm_client import LLMClient, AsyncLLMClient
+from src.book_summarizer import BookSummarizer, chunk_text, split_chapters
+from fake_llm import FakeOpenAI, FakeAsyncOpenAI
+
+
+def _book(chapters=8, paragraphs=12, edit=None):
+    parts = []
+    for c in range(1, chapters + 1):
+        parts.append(f"第{c}章 标题{c}")
+        for p in range(paragraphs):
+            marker = "（修订）" if edit == (c, p) else ""
+            parts.append(f"第{c}章第{p}段，福贵又一次站在田埂上回望过去。{marker}" * 4)
+    return "\n".join(parts)
+
+
+class FakeFactory:
+    """Builds AsyncLLMClients that talk to one shared fake API."""
+    def __init__(self, latency=0.01):
+        self.api = FakeAsyncOpenAI(self.reply, latency=latency)
+        self.clients = []
+
+    @staticmethod
+    def reply(messages):
+        prompt = messages[-1]['content']
+        if "合并后的摘要" in prompt:
+            return f"合并摘要{prompt.count('[')}" * 30
+        return "片段摘要" * 100
+
+    def __call__(self, cache, concurrency, stats_from=None):
+        client = AsyncLLMClient(cache=cache, concurrency=concurrency, client=self.api, stats_from=stats_from)
+        self.clients.append(client)
+        return client
+
+    def chunk_calls(self):
+        return [c for c in self.api.calls if "书籍片段" in c['messages'][-1]['content']]
+
+
+def test_chunks_follow_chapters_and_paragraphs():
+    book = _book()
+    assert len(split_chapters(book)) == 8
+    chunks = chunk_text(book, chunk_chars=1000)
+    assert all(len(c) <= 1000 for c in chunks)
+    assert all(c.startswith("第") for c in chunks)
+    # Every paragraph survives intact
+    assert "".join(chunks).replace("\n", "") == book.replace("\n", "")
+    # No chunk spans two chapters
+    assert all(len(split_chapters(c)) == 1 for c in chunks)
+
+
+def test_long_paragraph_is_cut_at_sentences():
+    paragraph = "这是一个句子。" * 300
+    chunks = chunk_text(paragraph, chunk_chars=500)
+    assert all(len(c) <= 500 and c.endswith("。") for c in chunks)
+    assert "".join(chunks) == paragraph
+
+
+def test_sentence_longer_than_a_chunk_keeps_the_text_order():
+    paragraph = "甲" * 5 + "。" + "乙" * 25 + "。" + "丙" * 3 + "。"
+    chunks = chunk_text(paragraph, chunk_chars=10)
+    assert all(len(c) <= 10 for c in chunks)
+    assert "".join(chunks) == paragraph
+    assert chunks[0] == "甲" * 5 + "。"
+
+
+def test_editing_a_chapter_only_changes_its_chunks():
+    before = chunk_text(_book(), chunk_chars=1000)
+    after = chunk_text(_book(edit=(3, 5)), chunk_chars=1000)
+    assert len(set(after) - set(before)) <= 2
+
+
+def test_short_book_is_not_summarized():
+    factory = FakeFactory()
+    summarizer = BookSummarizer(cache=LLMCache(":memory:"), client_factory=factory, direct_chars=10000)
+    assert summarizer.summarize("很短的书") == "很短的书"
+    assert factory.clients == []
+
+
+def test_map_reduce_with_bounded_concurrency_and_chunk_cache():
+    cache = LLMCache(":memory:")
+    factory = FakeFactory()
+    summarizer = BookSummarizer(cache=cache, concurrency=3, chunk_chars=1000, fan_in=3,
+                                direct_chars=500, client_factory=factory)
+    book = _book()
+    summary = summarizer.summarize(book)
+
+    n_chunks = len(chunk_text(book, 1000))
+    assert summary and len(summary) <= 500
+    assert len(factory.chunk_calls()) == n_chunks
+    assert factory.api.chat.completions.max_active == 3
+    assert summarizer.last_report['reduce_levels'] >= 2
+
+    # Re-running on an edited book only re-summarizes the changed chunks
+    first_calls = len(factory.chunk_calls())
+    summarizer.summarize(_book(edit=(3, 5)))
+    changed = len(factory.chunk_calls()) - first_calls
+    assert 1 <= changed <= 2
+    assert summarizer.last_report['cached_chunks'] == n_chunks - changed
+
+
+def test_latency_histograms_outlive_each_run():
+    llm = LLMClient(cache=False, hedge=False, client=FakeOpenAI())
+    factory = FakeFactory()
+    summarizer = BookSummarizer(cache=False, chunk_chars=1000, direct_chars=500, client_factory=factory, stats_from=llm)
+    book = _book(chapters=2)
+    summarizer.summarize(book)
+    summarizer.summarize(book)
+    # Each run builds its own client, but the samples land in the LLMClient's histograms
+    assert len(factory.clients) == 2
+    assert llm.latency_stats()["summarize_chunk"]['count'] == 2 * len(chunk_text(book, 1000))
+
+
+if __name__ == "__main__":
+    test_chunks_follow_chapters_and_paragraphs()
+    test_long_paragraph_is_cut_at_sentences()
+    test_sentence_longer_than_a_chunk_keeps_the_text_order()
+    test_editing_a_chapter_only_changes_its_chunks()
+    test_short_book_is_not_summarized()
+    test_map_reduce_with_bounded_concurrency_and_chunk_cache()
+    test_latency_histograms_outlive_each_run()
+    print("All book summarizer tests passed.")
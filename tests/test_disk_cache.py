@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.disk_cache import DiskLRUCache
+
+
+def test_put_get_and_counters():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = DiskLRUCache(tmp_dir, max_bytes=1024)
+        key = DiskLRUCache.make_key("text", "voice", "+0%", "+0%")
+        assert cache.get(key) is None
+        cache.put(key, b"audio", meta={'cues': [{'start': 0.0, 'end': 1.0, 'text': 'hi'}]})
+        assert cache.get(key) == b"audio"
+        assert cache.read_meta(key)['cues'][0]['text'] == 'hi'
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # A new instance (next run) sees the same entries
+        stats = DiskLRUCache(tmp_dir, max_bytes=1024).stats()
+        assert stats['entries'] == 1 and stats['bytes'] > 0
+
+
+def test_keys_depend_on_every_part():
+    assert DiskLRUCache.make_key("a", "b") == DiskLRUCache.make_key("a", "b")
+    assert DiskLRUCache.make_key("a", "b") != DiskLRUCache.make_key("a", "c")
+    assert DiskLRUCache.make_key("ab", "") != DiskLRUCache.make_key("a", "b")
+
+
+def test_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = DiskLRUCache(tmp_dir, max_bytes=250)
+        for i, key in enumerate(["a", "b"]):
+            cache.put(key, bytes(100))
+            os.utime(cache._data_path(key), (time.time() - 100 + i, time.time() - 100 + i))
+        # Reading "a" makes "b" the least recently used entry
+        assert cache.get("a") is not None
+        cache.put("c", bytes(100))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.evictions == 1
+        assert cache.stats()['bytes'] <= 250
+
+
+if __name__ == "__main__":
+    test_put_get_and_counters()
+    test_keys_depend_on_every_part()
+    test_evicts_least_recently_used()
+    print("All disk cache tests passed.")
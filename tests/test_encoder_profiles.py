@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.encoder_profiles import get_encoder_profile, x264_args, moviepy_write_kwargs, RawVideoEncoder
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+
+def test_profiles_are_tuned_for_still_images():
+    for name in ["draft", "balanced", "archive"]:
+        profile = get_encoder_profile(name)
+        args = x264_args(profile)
+        assert profile['name'] == name
+        assert args[args.index("-tune") + 1] == "stillimage"
+        assert args[args.index("-g") + 1] == str(profile['gop'])
+        assert "-tune" in moviepy_write_kwargs(profile)["ffmpeg_params"]
+
+
+def test_unknown_profile_raises():
+    try:
+        get_encoder_profile("lossless-8k")
+    except ValueError as e:
+        assert "draft" in str(e)
+    else:
+        raise AssertionError("ValueError expected")
+
+
+def test_raw_video_encoder_writes_frames():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "out.mp4")
+        encoder = RawVideoEncoder(output_path, (64, 96), 24, get_encoder_profile("draft"))
+        frame = np.zeros((96, 64, 3), dtype=np.uint8)
+        for i in range(24):
+            frame[:, :, 0] = i * 10
+            encoder.write_frame(frame)
+        encoder.close()
+
+        infos = ffmpeg_parse_infos(output_path)
+        assert infos['video_size'] == [64, 96]
+        assert abs(infos['duration'] - 1.0) < 0.1
+
+
+def test_raw_video_encoder_reports_the_ffmpeg_error():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "missing", "out.mp4")
+        frame = np.zeros((96, 64, 3), dtype=np.uint8)
+        error = None
+        encoder = RawVideoEncoder(output_path, (64, 96), 24, get_encoder_profile("draft"))
+        try:
+            # Same pattern as BandCompositor.write_frames
+            try:
+                for _ in range(2000):
+                    encoder.write_frame(frame)
+            finally:
+                encoder.close()
+        except IOError as e:
+            error = str(e)
+        assert error is not None and "ffmpeg encoder failed" in error
+        assert "missing" in error or "No such file" in error
+        # Closing again is a no-op
+        encoder.close()
+
+
+if __name__ == "__main__":
+    test_profiles_are_tuned_for_still_images()
+    test_unknown_profile_raises()
+    test_raw_video_encoder_writes_frames()
+    test_raw_video_encoder_reports_the_ffmpeg_error()
+    print("All encoder profile tests passed.")
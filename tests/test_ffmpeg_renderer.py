@@ -0,0 +1,104 @@
+import os
+import sys
+import subprocess
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.video_gen import VideoGenerator
+from src.ffmpeg_renderer import FFmpegRenderer
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+
+def _write_vtt(path, cues):
+    lines = ["WEBVTT", ""]
+    for i, (start, end, text) in enumerate(cues, 1):
+        lines += [str(i), f"00:00:{start:06.3f} --> 00:00:{end:06.3f}", text, ""]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def test_ass_colors_and_times():
+    assert FFmpegRenderer._ass_color('#FFD700') == "&H0000D7FF"
+    assert FFmpegRenderer._ass_color('white') == "&H00FFFFFF"
+    assert FFmpegRenderer._ass_time(0) == "0:00:00.00"
+    assert FFmpegRenderer._ass_time(3725.456) == "1:02:05.46"
+
+
+def test_build_ass_karaoke_events():
+    renderer = FFmpegRenderer(VideoGenerator())
+    subs = [
+        {'start': 0.0, 'end': 1.5, 'text': '你有没有想过，'},
+        {'start': 1.5, 'end': 3.0, 'text': '{braces}'},
+        {'start': 9.0, 'end': 12.0, 'text': '超出音频时长'},
+    ]
+    ass = renderer.build_ass(subs, duration=10.0)
+    events = [line for line in ass.splitlines() if line.startswith("Dialogue:")]
+
+    assert len(events) == 3
+    assert events[0].startswith("Dialogue: 0,0:00:00.00,0:00:01.50,Karaoke,")
+    assert events[0].endswith("{\\kf150}你有没有想过，")
+    assert "\\{braces\\}" in events[1]
+    # Clamped to the audio duration, like the MoviePy path
+    assert "0:00:09.00,0:00:10.00" in events[2] and "{\\kf100}" in events[2]
+    # Active (gold) is the primary colour, base (white) the secondary colour
+    assert ",&H0000D7FF,&H00FFFFFF,&H00000000," in ass
+
+
+def test_word_timed_cues_get_one_syllable_per_word():
+    renderer = FFmpegRenderer(VideoGenerator())
+    words = [[0.0, 0.3, 0, 1], [0.3, 0.2, 1, 3], [0.8, 0.4, 4, 6]]
+    subs = [{'start': 2.0, 'end': 3.2, 'text': '你好吗，世界！', 'words': words}]
+    event = [line for line in renderer.build_ass(subs, duration=10.0).splitlines() if line.startswith("Dialogue:")][0]
+    # The 0.3s pause before the last word is an empty \k syllable
+    assert event.endswith("{\\kf30}你{\\kf20}好吗{\\k30}{\\kf40}，世界！")
+
+
+def test_karaoke_text_follows_line_wrapping():
+    renderer = FFmpegRenderer(VideoGenerator())
+    words = [[0.0, 0.5, 0, 5], [0.5, 0.5, 6, 11]]
+    text = renderer._karaoke_text("hello world", ["hello", "world"], words)
+    assert text == "{\\kf50}hello{\\kf50}\\Nworld"
+
+
+def test_frame_sized_background_is_not_rescaled():
+    from PIL import Image
+    renderer = FFmpegRenderer(VideoGenerator())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fitted = os.path.join(tmp_dir, "fitted.jpg")
+        square = os.path.join(tmp_dir, "square.jpg")
+        Image.new("RGB", (1080, 1920)).save(fitted)
+        Image.new("RGB", (1024, 1024)).save(square)
+        fitted_cmd = " ".join(renderer.build_command("a.mp3", "out.mp4", 1.0, fitted))
+        square_cmd = " ".join(renderer.build_command("a.mp3", "out.mp4", 1.0, square))
+    assert "scale=" not in fitted_cmd and "[0:v]ass=" in fitted_cmd
+    assert "scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920" in square_cmd
+
+
+def test_render_short_video():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio_path = os.path.join(tmp_dir, "voice.mp3")
+        vtt_path = os.path.join(tmp_dir, "voice.vtt")
+        output_path = os.path.join(tmp_dir, "out.mp4")
+        subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=300:duration=2", audio_path], check=True)
+        _write_vtt(vtt_path, [(0.0, 1.0, "第一句，"), (1.0, 2.0, "第二句。")])
+
+        video_gen = VideoGenerator(output_width=270, output_height=480)
+        bg_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "background.jpg")
+        assert FFmpegRenderer(video_gen).render(audio_path, output_path, bg_image_path=bg_path, vtt_path=vtt_path)
+
+        infos = ffmpeg_parse_infos(output_path)
+        assert infos['video_size'] == [270, 480]
+        assert abs(infos['duration'] - 2.0) < 0.2
+
+
+if __name__ == "__main__":
+    test_ass_colors_and_times()
+    test_build_ass_karaoke_events()
+    test_word_timed_cues_get_one_syllable_per_word()
+    test_karaoke_text_follows_line_wrapping()
+    test_frame_sized_background_is_not_rescaled()
+    test_render_short_video()
+    print("All ffmpeg renderer tests passed.")
@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.font_registry import FontRegistry
+
+
+def test_discover_ranks_preferred_fonts_first():
+    with tempfile.TemporaryDirectory() as font_dir:
+        for name in ["random.ttf", "wqy-microhei.ttc", "msyh.ttc", "msyhbd.ttc", "readme.txt"]:
+            open(os.path.join(font_dir, name), "wb").close()
+
+        registry = FontRegistry(font_dirs=[font_dir])
+        names = [os.path.basename(p) for p in registry.discover() if p.startswith(font_dir)]
+
+        assert names[:3] == ["msyhbd.ttc", "msyh.ttc", "wqy-microhei.ttc"]
+        assert "random.ttf" in names and "readme.txt" not in names
+
+
+def test_fontconfig_fonts_are_ranked_with_the_scanned_ones():
+    with tempfile.TemporaryDirectory() as font_dir:
+        for name in ["msyhbd.ttc", "unifont.otf", "simhei.ttf"]:
+            open(os.path.join(font_dir, name), "wb").close()
+        reported = [os.path.join(font_dir, "unifont.otf"), os.path.join(font_dir, "simhei.ttf")]
+
+        registry = FontRegistry(font_dirs=[font_dir])
+        registry._fontconfig_cjk_fonts = lambda: reported
+        names = [os.path.basename(p) for p in registry.discover() if p.startswith(font_dir)]
+
+        assert names == ["msyhbd.ttc", "simhei.ttf", "unifont.otf"]
+
+
+def test_probing_fonts_does_not_fill_the_font_cache():
+    registry = FontRegistry()
+    registry.default_font_path()
+    assert registry._load.cache_info().currsize == 0
+
+
+def test_fonts_are_cached_by_path_and_size():
+    registry = FontRegistry()
+    path = registry.default_font_path()
+    assert registry.get_font(70) is registry.get_font(70, path=path)
+    assert registry.get_font(70) is not registry.get_font(48)
+
+
+def test_explicit_font_path_wins():
+    fonts = FontRegistry().discover()
+    if not fonts:
+        pytest.skip("No system fonts installed")
+    registry = FontRegistry(font_path=fonts[-1])
+    assert registry.default_font_path() == fonts[-1]
+    assert registry.get_font(40).path == fonts[-1]
+
+
+def test_missing_font_path_falls_back_to_discovery():
+    registry = FontRegistry(font_path="/nonexistent/font.ttf")
+    assert registry.default_font_path() != "/nonexistent/font.ttf"
+    assert registry.get_font(40) is not None
+
+
+if __name__ == "__main__":
+    test_discover_ranks_preferred_fonts_first()
+    test_fontconfig_fonts_are_ranked_with_the_scanned_ones()
+    test_probing_fonts_does_not_fill_the_font_cache()
+    test_fonts_are_cached_by_path_and_size()
+    test_explicit_font_path_wins()
+    test_missing_font_path_falls_back_to_discovery()
+    print("All font registry tests passed.")
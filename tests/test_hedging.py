@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import asyncio
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import MODEL_NAME
+from src.hedging import LatencyHistogram
+from src.llm_cache import LLMCache
+from src.llm_client import LLMClient, AsyncLLMClient
+
+
+class SlowFirstCompletions:
+    """The first request takes `slow` seconds, later ones `fast` seconds."""
+    def __init__(self, slow, fast=0.01):
+        self.delays = [slow]
+        self.fast = fast
+        self.calls = []
+        self.cancelled = 0
+
+    def _reply(self, kwargs):
+        content = f"answer {len(self.calls)} from {kwargs['model']}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        time.sleep(self.delays.pop(0) if self.delays else self.fast)
+        return self._reply(kwargs)
+
+
+class AsyncSlowFirstCompletions(SlowFirstCompletions):
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        try:
+            await asyncio.sleep(self.delays.pop(0) if self.delays else self.fast)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self._reply(kwargs)
+
+
+def _warm(client, method, seconds=0.05, n=20):
+    # Enough samples for the percentile to replace LLM_HEDGE_DELAY
+    for _ in range(n):
+        client._record_latency(method, seconds)
+
+
+def _client(cls, completions, **kwargs):
+    return cls(cache=False, client=SimpleNamespace(chat=SimpleNamespace(completions=completions)), **kwargs)
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    for i in range(1, 101):
+        histogram.record(i / 10)
+    assert 5.0 <= histogram.percentile(50) <= 5.5
+    assert 9.5 <= histogram.percentile(95) <= 10.0
+    assert histogram.percentile(99) <= histogram.max == 10.0
+    assert histogram.summary()['count'] == 100
+
+
+def test_slow_call_is_hedged():
+    completions = SlowFirstCompletions(slow=2.0)
+    client = _client(LLMClient, completions, hedge=True)
+    client.secondary_model = "backup-model"
+    _warm(client, "generate_image_prompt")
+
+    start = time.perf_counter()
+    answer = client.generate_image_prompt("脚本")
+    assert time.perf_counter() - start < 1.0
+    assert answer == "answer 2 from backup-model"
+    assert [c['model'] for c in completions.calls] == [MODEL_NAME, "backup-model"]
+
+    stats = client.latency_stats()["generate_image_prompt"]
+    assert stats['hedged'] == 1 and stats['secondary_wins'] == 1
+    assert stats['count'] == 21 and stats['p99'] < 1.0
+
+
+def test_fast_call_is_not_hedged():
+    completions = SlowFirstCompletions(slow=0.01)
+    client = _client(LLMClient, completions, hedge=True)
+    _warm(client, "generate_script", seconds=0.5)
+    assert client.generate_script("书") == f"answer 1 from {MODEL_NAME}"
+    assert len(completions.calls) == 1
+    assert client.latency_stats()["generate_script"]['hedged'] == 0
+
+
+def test_latency_is_tracked_without_hedging():
+    client = _client(LLMClient, SlowFirstCompletions(slow=0.01), hedge=False)
+    client.extract_book_name("《活着》")
+    client.extract_book_name("《活着》")
+    stats = client.latency_stats()["extract_book_name"]
+    assert stats['count'] == 2 and stats['p50'] is not None and stats['hedged'] == 0
+
+
+def test_async_hedge_cancels_the_loser():
+    completions = AsyncSlowFirstCompletions(slow=2.0)
+    client = _client(AsyncLLMClient, completions, hedge=True)
+    _warm(client, "summarize_chunk")
+
+    start = time.perf_counter()
+    answer = asyncio.run(client.summarize_chunk("第一章"))
+    assert time.perf_counter() - start < 1.0
+    assert answer == f"answer 2 from {MODEL_NAME}"
+    assert completions.cancelled == 1
+    assert client.latency_stats()["summarize_chunk"]['hedged'] == 1
+
+
+def test_secondary_answers_are_not_cached_as_the_primary_model():
+    cache = LLMCache(":memory:")
+    completions = SlowFirstCompletions(slow=2.0)
+    client = LLMClient(cache=cache, hedge=True, client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    client.secondary_model = "backup-model"
+    _warm(client, "generate_image_prompt")
+    assert client.generate_image_prompt("脚本") == "answer 2 from backup-model"
+
+    # A later run on the same cache asks the primary model instead of replaying the backup's answer
+    plain = LLMClient(cache=cache, hedge=False, client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    assert plain.generate_image_prompt("脚本") == f"answer 3 from {MODEL_NAME}"
+    assert plain.generate_image_prompt("脚本") == f"answer 3 from {MODEL_NAME}"
+    assert len(completions.calls) == 3
+    client.close()
+
+
+def test_async_client_hedges_with_shared_histograms():
+    llm = _client(LLMClient, SlowFirstCompletions(slow=0.01), hedge=True)
+    _warm(llm, "summarize_chunk")
+    completions = AsyncSlowFirstCompletions(slow=2.0)
+    client = _client(AsyncLLMClient, completions, hedge=True, stats_from=llm)
+
+    start = time.perf_counter()
+    asyncio.run(client.summarize_chunk("第一章"))
+    assert time.perf_counter() - start < 1.0
+    assert llm.latency_stats()["summarize_chunk"]['hedged'] == 1
+    llm.close()
+
+
+def test_close_shuts_down_the_hedge_pool():
+    client = _client(LLMClient, SlowFirstCompletions(slow=0.01), hedge=True)
+    client.close()
+    assert client._hedge_pool._shutdown
+    _client(LLMClient, SlowFirstCompletions(slow=0.01), hedge=False).close()
+
+
+if __name__ == "__main__":
+    test_histogram_percentiles()
+    test_slow_call_is_hedged()
+    test_fast_call_is_not_hedged()
+    test_latency_is_tracked_without_hedging()
+    test_async_hedge_cancels_the_loser()
+    test_secondary_answers_are_not_cached_as_the_primary_model()
+    test_async_client_hedges_with_shared_histograms()
+    test_close_shuts_down_the_hedge_pool()
+    print("All hedging tests passed.")
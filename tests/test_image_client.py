@@ -0,0 +1,480 @@
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import tempfile
+import threading
+from io import BytesIO
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from src.image_client import ImageClient
+from src.http_transport import HttpTransport, AsyncHttpTransport
+from src.image_router import ProviderRouter
+
+
+def _png(color=(200, 100, 50), size=(64, 64), format="PNG"):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format)
+    return buffer.getvalue()
+
+
+def _candidate_png(index):
+    """Candidate 1 is sharp (a fine checkerboard) and dark; the others are flat grey."""
+    if index != 1:
+        return _png(color=(128, 128, 128), size=(96, 96))
+    image = Image.new("L", (96, 96), 20)
+    for y in range(0, 96, 2):
+        for x in range(y % 4 // 2, 96, 2):
+            image.putpixel((x, y), 90)
+    buffer = BytesIO()
+    image.convert("RGB").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class FakeImageServer:
+    """Local stand-in for the image APIs, counting connections and concurrent requests."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.ports = set()
+        self.requests = []
+        self.fail_next = 0
+        self.truncate_next = 0
+        self.fail_paths = ()
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._handle()
+
+            def do_POST(self):
+                self._handle()
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with server._lock:
+                    server.ports.add(self.client_address[1])
+                    server.requests.append((self.command, self.path, body))
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                    fail = server.fail_next > 0
+                    server.fail_next -= int(fail)
+                    fail = fail or self.path.startswith(server.fail_paths)
+                    truncate = server.truncate_next > 0
+                    server.truncate_next -= int(truncate)
+                try:
+                    if server.delay:
+                        time.sleep(server.delay)
+                    if fail:
+                        return self._send(500, b'{"error": "overloaded"}', "application/json")
+                    batch = json.loads(body).get("batch_size", 1) if body else 1
+                    if self.path.startswith("/sdapi") and batch > 1:
+                        payload = {"images": [base64.b64encode(_candidate_png(i)).decode() for i in range(batch)]}
+                        return self._send(200, json.dumps(payload).encode(), "application/json")
+                    if self.path.startswith("/sdapi"):
+                        payload = {"images": [base64.b64encode(_png()).decode()]}
+                        return self._send(200, json.dumps(payload).encode(), "application/json")
+                    if self.path.startswith("/v1/images"):
+                        payload = {"data": [{"url": f"http://127.0.0.1:{server.port}/files/out{i}.png"} for i in range(batch)]}
+                        return self._send(200, json.dumps(payload).encode(), "application/json")
+                    if self.path.startswith("/files/out") and self.path != "/files/out0.png":
+                        return self._send(200, _candidate_png(int(self.path[10:-4])), "image/png")
+                    if truncate:
+                        image_bytes = _png(size=(256, 256))
+                        return self._send(200, image_bytes[:len(image_bytes) // 2], "image/png")
+                    return self._send(200, _png(), "image/png")
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _client(server, providers, pool_size=4, timeouts=None, cache_dir=None, deterministic_seed=False, output_size=None, router=None):
+    timeouts = timeouts or {p: (2, 5) for p in ["local", "pollinations", "hf", "siliconflow", "download"]}
+    providers = [providers] if isinstance(providers, str) else providers
+    router = router or ProviderRouter(providers, base_delay=0)
+    client = ImageClient(transport=HttpTransport(pool_size, timeouts), async_transport=AsyncHttpTransport(pool_size, timeouts),
+                         cache_dir=cache_dir, deterministic_seed=deterministic_seed, output_size=output_size,
+                         providers=providers, router=router)
+    client.local_url = f"{server.url}/sdapi/v1/txt2img"
+    client.endpoints = {
+        "siliconflow": {"base_url": f"{server.url}/v1", "api_key": "test-key"},
+        "hf": {"base_url": f"{server.url}/models", "api_key": "test-key"},
+    }
+    return client
+
+
+def test_local_provider_saves_the_image():
+    server = FakeImageServer()
+    try:
+        client = _client(server, "local")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "image.png")
+            assert client.generate_image("a fox", path, width=512, height=768, seed=7)
+            assert Image.open(path).size == (64, 64)
+        payload = json.loads(server.requests[0][2])
+        assert (payload["width"], payload["height"], payload["seed"]) == (512, 768, 7)
+    finally:
+        server.close()
+
+
+def test_api_call_and_download_share_a_connection():
+    server = FakeImageServer()
+    try:
+        client = _client(server, "siliconflow")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(3):
+                assert client.generate_image("a fox", os.path.join(tmp_dir, f"{i}.png"))
+        assert [r[1] for r in server.requests[:2]] == ["/v1/images/generations", "/files/out0.png"]
+        assert len(server.requests) == 6
+        assert len(server.ports) == 1
+    finally:
+        server.close()
+
+
+def test_server_errors_are_retried():
+    server = FakeImageServer()
+    server.fail_next = 2
+    try:
+        client = _client(server, "hf")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "image.png"))
+        assert len(server.requests) == 3
+    finally:
+        server.close()
+
+
+def test_provider_timeout_applies():
+    server = FakeImageServer(delay=1.0)
+    try:
+        client = _client(server, "local", timeouts={"local": (1, 0.2)})
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert not client.generate_image("a fox", os.path.join(tmp_dir, "image.png"))
+        assert time.perf_counter() - start < 0.9
+    finally:
+        server.close()
+
+
+def test_async_batch_is_bounded_by_the_pool():
+    server = FakeImageServer(delay=0.1)
+    try:
+        client = _client(server, "siliconflow", pool_size=2)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            async def batch():
+                try:
+                    return await asyncio.gather(*[
+                        client.generate_image_async("a fox", os.path.join(tmp_dir, f"{i}.png")) for i in range(6)
+                    ])
+                finally:
+                    await client.aclose()
+
+            start = time.perf_counter()
+            assert all(asyncio.run(batch()))
+            elapsed = time.perf_counter() - start
+            assert len(os.listdir(tmp_dir)) == 6
+        assert len(server.requests) == 12
+        assert server.max_active <= 2 and len(server.ports) <= 2
+        # 12 requests of 0.1 s over 2 connections
+        assert elapsed < 12 * 0.1
+    finally:
+        server.close()
+
+
+def test_cache_hit_skips_the_provider():
+    server = FakeImageServer()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            client = _client(server, "local", cache_dir=os.path.join(tmp_dir, "cache"))
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "a.png"), seed=1)
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "b.jpg"), seed=1)
+            assert len(server.requests) == 1
+            assert Image.open(os.path.join(tmp_dir, "b.jpg")).format == "JPEG"
+
+            # Any parameter that changes the image is a miss
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "c.png"), seed=2)
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "d.png"), seed=1, num_inference_steps=30)
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "e.png"), seed=1, negative_prompt="blurry")
+            client = _client(server, "hf", cache_dir=os.path.join(tmp_dir, "cache"))
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "f.png"), seed=1)
+            assert len(server.requests) == 5
+            assert client.cache.stats()['entries'] == 5
+    finally:
+        server.close()
+
+
+def test_deterministic_seed_makes_retries_hits():
+    server = FakeImageServer()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_dir = os.path.join(tmp_dir, "cache")
+            client = _client(server, "local", cache_dir=cache_dir, deterministic_seed=True)
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "a.png"))
+            # A new run (new client, same cache directory) reuses the image
+            client = _client(server, "local", cache_dir=cache_dir, deterministic_seed=True)
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "b.png"))
+            assert len(server.requests) == 1
+            seed = json.loads(server.requests[0][2])["seed"]
+            assert seed == client.prompt_seed("a fox") and 0 <= seed < 2**32
+            assert client.prompt_seed("a fox") != client.prompt_seed("a fox", "blurry")
+
+            # Random seeds ask for a new image every time and are not cached
+            client.deterministic_seed = False
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "c.png"))
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "d.png"))
+            assert client.generate_images("a fox", os.path.join(tmp_dir, "e.png"), n=2)
+            assert len(server.requests) == 4
+            assert client.cache.stats()['entries'] == 1
+    finally:
+        server.close()
+
+
+def test_matching_image_is_written_as_is():
+    client = ImageClient(cache_dir=None, output_size="1080x1920")
+    fitted = _png(size=(1080, 1920), format="JPEG")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "image.jpg")
+        client._save_image(fitted, path)
+        with open(path, "rb") as f:
+            assert f.read() == fitted
+
+        # Without a target size any image in the output format is kept
+        client.output_size = None
+        path = os.path.join(tmp_dir, "image.png")
+        client._save_image(_png(), path)
+        with open(path, "rb") as f:
+            assert f.read() == _png()
+
+
+def test_truncated_image_is_not_written():
+    client = ImageClient(cache_dir=None, output_size=None)
+    image_bytes = _png(size=(256, 256))
+    truncated = image_bytes[:len(image_bytes) // 2]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "image.png")
+        try:
+            client._save_image(truncated, path)
+            assert False, "a truncated image must not be saved"
+        except OSError:
+            pass
+        assert not os.path.exists(path)
+
+
+def test_truncated_response_is_retried():
+    server = FakeImageServer()
+    server.truncate_next = 1
+    try:
+        client = _client(server, "hf")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "image.png")
+            assert client.generate_image("a fox", path, seed=1)
+            with open(path, "rb") as f:
+                assert f.read() == _png()
+        assert len(server.requests) == 2
+        assert client.router.metrics()["hf"]['failures'] == 1
+    finally:
+        server.close()
+
+
+def test_interrupted_trial_request_releases_the_breaker():
+    class InterruptedTransport:
+        def request(self, **kwargs):
+            raise KeyboardInterrupt
+
+    router = ProviderRouter(["hf"], failure_threshold=1, reset_timeout=0)
+    router.record("hf", 1.0, False)
+    client = ImageClient(transport=InterruptedTransport(), cache_dir=None, providers=["hf"], router=router)
+    try:
+        client.generate_image("a fox", "unused.png", seed=1)
+        assert False, "the interrupt must propagate"
+    except KeyboardInterrupt:
+        pass
+    # The half-open trial was abandoned, so the next request may try again
+    assert router.breakers["hf"].state == "half_open" and router.choose() == "hf"
+
+
+def test_interrupt_before_the_request_releases_the_breaker():
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    router = ProviderRouter(["hf"], failure_threshold=1, reset_timeout=0)
+    router.record("hf", 1.0, False)
+    client = ImageClient(cache_dir=None, providers=["hf"], router=router)
+    # Interrupted between the router's choice and the request (backoff, request building)
+    client._build_request = interrupted
+    try:
+        client.generate_image("a fox", "unused.png", seed=1)
+        assert False, "the interrupt must propagate"
+    except KeyboardInterrupt:
+        pass
+    assert router.choose() == "hf"
+
+def test_other_images_are_converted_once_to_the_frame():
+    client = ImageClient(cache_dir=None, output_size="1080x1920")
+    square = BytesIO()
+    image = Image.new("RGBA", (1024, 1024), (0, 0, 255, 255))
+    # A red stripe on the left edge is cropped away by the center crop
+    image.paste((255, 0, 0, 255), (0, 0, 100, 1024))
+    image.save(square, "PNG")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "image.jpg")
+        client._save_image(square.getvalue(), path)
+        with Image.open(path) as saved:
+            assert saved.format == "JPEG" and saved.size == (1080, 1920)
+            r, g, b = saved.convert("RGB").getpixel((0, 960))
+            assert b > 200 and r < 50
+
+
+def test_failing_provider_is_routed_around():
+    server = FakeImageServer()
+    server.fail_paths = ("/sdapi",)
+    try:
+        router = ProviderRouter(["local", "hf"], base_delay=0)
+        client = _client(server, ["local", "hf"], router=router)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(4):
+                assert client.generate_image("a fox", os.path.join(tmp_dir, f"{i}.png"))
+        # The first request falls over to hf; after that the healthy hf is ranked first
+        assert [r[1].split("/")[1] for r in server.requests] == ["sdapi", "models", "models", "models", "models"]
+        metrics = router.metrics()
+        assert metrics["local"]["failures"] == 1 and metrics["local"]["routed"] == 1
+        assert metrics["hf"]["requests"] == 4 and metrics["hf"]["failures"] == 0
+    finally:
+        server.close()
+
+
+def test_open_breaker_fails_fast():
+    server = FakeImageServer()
+    server.fail_paths = ("/models",)
+    try:
+        router = ProviderRouter(["hf"], failure_threshold=2, reset_timeout=60, base_delay=0)
+        client = _client(server, "hf", router=router)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert not client.generate_image("a fox", os.path.join(tmp_dir, "a.png"))
+            assert not client.generate_image("a fox", os.path.join(tmp_dir, "b.png"))
+        # The breaker opened after 2 of the 3 attempts; the second request sent nothing
+        assert len(server.requests) == 2
+        assert router.metrics()["hf"]["state"] == "open"
+    finally:
+        server.close()
+
+
+def test_all_providers_failing_gives_up():
+    server = FakeImageServer()
+    server.fail_paths = ("/sdapi", "/models")
+    try:
+        client = _client(server, ["local", "hf"])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert not client.generate_image("a fox", os.path.join(tmp_dir, "image.png"))
+        # local has 1 attempt, hf 3
+        assert len(server.requests) == 4
+    finally:
+        server.close()
+
+
+def test_candidates_in_one_batch_request():
+    server = FakeImageServer()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            client = _client(server, "local", cache_dir=os.path.join(tmp_dir, "cache"), output_size="1080x1920")
+            path = os.path.join(tmp_dir, "image.jpg")
+            assert client.generate_images("a fox", path, n=4, seed=10)
+            assert len(server.requests) == 1
+            payload = json.loads(server.requests[0][2])
+            assert payload["batch_size"] == 4 and payload["seed"] == 10
+            report = client.last_report
+            assert report["candidates"] == 4 and report["requests"] == 1 and report["best"] == 1
+            with Image.open(path) as saved:
+                assert saved.size == (1080, 1920)
+                assert saved.convert("L").getpixel((540, 960)) < 100
+
+            # The pick is cached apart from single images of the same seed
+            assert client.generate_images("a fox", os.path.join(tmp_dir, "again.jpg"), n=4, seed=10)
+            assert len(server.requests) == 1
+            assert client.generate_image("a fox", os.path.join(tmp_dir, "single.jpg"), seed=10)
+            assert len(server.requests) == 2
+    finally:
+        server.close()
+
+
+def test_batches_above_the_limit_are_split_and_urls_downloaded():
+    server = FakeImageServer()
+    try:
+        client = _client(server, "siliconflow")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert client.generate_images("a fox", os.path.join(tmp_dir, "image.png"), n=6, seed=10)
+        calls = [json.loads(body) for method, path, body in server.requests if path.startswith("/v1")]
+        assert sorted((c["batch_size"], c["seed"]) for c in calls) == [(2, 14), (4, 10)]
+        assert len(server.requests) == 2 + 6
+        assert client.last_report["candidates"] == 6 and client.last_report["requests"] == 2
+    finally:
+        server.close()
+
+
+def test_providers_without_batching_get_parallel_requests():
+    server = FakeImageServer(delay=0.2)
+    try:
+        client = _client(server, "hf")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            start = time.perf_counter()
+            assert client.generate_images("a fox", os.path.join(tmp_dir, "image.png"), n=3, seed=7)
+            elapsed = time.perf_counter() - start
+        seeds = sorted(json.loads(body)["parameters"]["seed"] for _, _, body in server.requests)
+        assert seeds == [7, 8, 9]
+        assert server.max_active == 3 and elapsed < 3 * 0.2
+        assert client.last_report["providers"] == ["hf", "hf", "hf"]
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    test_local_provider_saves_the_image()
+    test_api_call_and_download_share_a_connection()
+    test_server_errors_are_retried()
+    test_provider_timeout_applies()
+    test_async_batch_is_bounded_by_the_pool()
+    test_cache_hit_skips_the_provider()
+    test_deterministic_seed_makes_retries_hits()
+    test_matching_image_is_written_as_is()
+    test_truncated_image_is_not_written()
+    test_truncated_response_is_retried()
+    test_interrupted_trial_request_releases_the_breaker()
+    test_interrupt_before_the_request_releases_the_breaker()
+    test_candidates_in_one_batch_request()
+    test_batches_above_the_limit_are_split_and_urls_downloaded()
+    test_providers_without_batching_get_parallel_requests()
+    test_failing_provider_is_routed_around()
+    test_open_breaker_fails_fast()
+    test_all_providers_failing_gives_up()
+    test_other_images_are_converted_once_to_the_frame()
+    print("All image client tests passed.")
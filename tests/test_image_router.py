@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.image_router import CircuitBreaker, ProviderRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    assert not breaker.record_failure() and not breaker.record_failure()
+    assert breaker.acquire()
+    assert breaker.record_failure()
+    assert breaker.state == "open" and not breaker.acquire()
+
+    clock.now += 30
+    # One trial request at a time while half-open
+    assert breaker.acquire() and breaker.state == "half_open"
+    assert not breaker.acquire()
+    # A failed trial opens it again right away
+    assert breaker.record_failure() and breaker.opens == 2
+    clock.now += 30
+    assert breaker.acquire()
+    assert breaker.record_success() and breaker.state == "closed"
+    assert breaker.acquire() and breaker.acquire()
+
+
+def test_cancelled_trial_releases_the_breaker():
+    clock = FakeClock()
+    router = ProviderRouter(["hf"], failure_threshold=1, reset_timeout=10, clock=clock)
+    router.record("hf", 1.0, False)
+    assert router.choose() is None
+    clock.now += 10
+    assert router.choose() == "hf"
+    assert router.choose() is None
+    router.abandon("hf")
+    assert router.choose() == "hf"
+
+
+def test_ranking_prefers_fast_healthy_providers():
+    router = ProviderRouter(["siliconflow", "hf", "pollinations"])
+    # Untried providers keep the configured priority
+    assert router.choose() == "siliconflow"
+    for _ in range(3):
+        router.record("siliconflow", 20.0, True)
+        router.record("pollinations", 4.0, True)
+    assert router.choose() == "pollinations"
+    assert router.choose(exclude={"pollinations"}) == "siliconflow"
+
+    # Mostly failing: ranked after the untried hf
+    for _ in range(4):
+        router.record("pollinations", 1.0, False)
+    assert router._ranked() == ["siliconflow", "hf", "pollinations"]
+
+    # A slower but reliable provider beats a faster one that fails half the time
+    router = ProviderRouter(["a", "b"])
+    for ok in (True, False, True, False):
+        router.record("a", 10.0, ok)
+    router.record("b", 15.0, True)
+    assert router.choose() == "b"
+
+
+def test_backoff_is_exponential_with_jitter():
+    router = ProviderRouter(["hf"], base_delay=1, max_delay=5)
+    for retry, bound in [(0, 1), (1, 2), (2, 4), (3, 5), (10, 5)]:
+        delays = [router.backoff(retry) for _ in range(200)]
+        assert all(0 <= d <= bound for d in delays)
+        assert max(delays) > bound / 2
+
+
+def test_metrics_dump():
+    router = ProviderRouter(["local", "hf"], failure_threshold=1)
+    router.choose()
+    router.record("local", 2.0, True)
+    router.record("hf", 1.0, False)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "metrics", "router.json")
+        router.dump_metrics(path)
+        with open(path, encoding="utf-8") as f:
+            dump = json.load(f)
+    assert dump["providers"] == ["local", "hf"]
+    local, hf = dump["metrics"]["local"], dump["metrics"]["hf"]
+    assert local["routed"] == 1 and local["requests"] == 1 and local["latency"]["count"] == 1
+    assert local["recent_median_latency"] == 2.0 and local["state"] == "closed"
+    assert hf["state"] == "open" and hf["recent_error_rate"] == 1.0 and hf["breaker_opens"] == 1
+
+
+if __name__ == "__main__":
+    test_breaker_opens_half_opens_and_closes()
+    test_cancelled_trial_releases_the_breaker()
+    test_ranking_prefers_fast_healthy_providers()
+    test_backoff_is_exponential_with_jitter()
+    test_metrics_dump()
+    print("All image router tests passed.")
@@ -0,0 +1,55 @@
+import os
+import sys
+from io import BytesIO
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image, ImageFilter
+from src.image_scoring import score_image
+
+
+def _encode(image, format="PNG"):
+    buffer = BytesIO()
+    image.save(buffer, format)
+    return buffer.getvalue()
+
+
+def _noise(seed=0, size=(540, 960)):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 120, (size[1], size[0]), dtype=np.uint8)).convert("RGB")
+
+
+def test_sharper_images_score_higher():
+    sharp = _noise()
+    blurred = sharp.filter(ImageFilter.GaussianBlur(4))
+    sharp_score, blurred_score = score_image(_encode(sharp)), score_image(_encode(blurred))
+    assert sharp_score['sharpness'] > blurred_score['sharpness'] * 5
+    assert sharp_score['score'] > blurred_score['score']
+
+
+def test_bright_subtitle_band_is_penalized():
+    dark = _noise()
+    bright = dark.copy()
+    # White rectangle where the subtitles go (from 0.8 of the height)
+    bright.paste((255, 255, 255), (0, int(960 * 0.8), 540, int(960 * 0.93)))
+    dark_score, bright_score = score_image(_encode(dark)), score_image(_encode(bright))
+    assert dark_score['band_luma'] < 0.3 < 0.7 < bright_score['band_luma']
+    assert dark_score['score'] > bright_score['score']
+
+
+def test_band_follows_the_frame_crop():
+    # A very tall image loses its top and bottom when cropped to 9:16, so a bright
+    # stripe near its bottom is below the subtitle band of the frame
+    tall = Image.new("RGB", (540, 1440), (0, 0, 0))
+    tall.paste((255, 255, 255), (0, 1300, 540, 1340))
+    assert score_image(_encode(tall, "JPEG"))['band_luma'] < 0.05
+    assert score_image(_encode(tall, "JPEG"), frame_size=(540, 1440))['band_luma'] > 0.1
+
+
+if __name__ == "__main__":
+    test_sharper_images_score_higher()
+    test_bright_subtitle_band_is_penalized()
+    test_band_follows_the_frame_crop()
+    print("All image scoring tests passed.")
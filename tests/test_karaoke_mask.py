@@ -0,0 +1,87 @@
+import os
+import sys
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.karaoke_mask import KaraokeMask, WordTiming
+
+
+def legacy_make_mask(alpha, duration):
+    """The per-frame wipe used by create_karaoke_clip before KaraokeMask."""
+    h, w = alpha.shape
+    original_alpha = alpha.astype(float) / 255.0
+
+    def make_mask(t):
+        wipe = np.zeros((h, w), dtype=float)
+        if duration <= 0: progress = 1.0
+        else: progress = t / duration
+        progress = max(0.0, min(1.0, progress))
+        reveal_w = int(w * progress)
+        if reveal_w > 0:
+            wipe[:, :reveal_w] = 1.0
+        return wipe * original_alpha
+
+    return make_mask
+
+
+def _random_alpha(h=105, w=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    alpha = rng.integers(0, 256, size=(h, w), dtype=np.uint8)
+    alpha[:, :50] = 0
+    return alpha
+
+
+def test_mask_matches_legacy_wipe():
+    alpha = _random_alpha()
+    duration = 1.7
+    legacy = legacy_make_mask(alpha, duration)
+    mask = KaraokeMask(alpha, duration)
+
+    # Forward playback, then random seeks (including out-of-range times)
+    times = list(np.arange(0, duration + 0.2, 1 / 24))
+    times += [1.2, 0.3, 0.3, 1.69, -0.5, 5.0, 0.0, 0.85]
+    for t in times:
+        expected = legacy(t)
+        actual = mask.make_mask(t)
+        assert actual.dtype == expected.dtype
+        assert np.array_equal(actual, expected), f"mask differs at t={t}"
+        # MoviePy converts masks with (mask * 255).astype("uint8")
+        assert np.array_equal((actual * 255).astype("uint8"), (expected * 255).astype("uint8"))
+
+
+def test_mask_reuses_buffer():
+    mask = KaraokeMask(_random_alpha(), 2.0)
+    first = mask.make_mask(0.1)
+    second = mask.make_mask(0.5)
+    assert first is second
+
+
+def test_zero_duration_reveals_everything():
+    alpha = _random_alpha()
+    mask = KaraokeMask(alpha, 0)
+    assert np.array_equal(mask.make_mask(0), alpha.astype(float) / 255.0)
+
+
+def test_word_timing_reveal_follows_words():
+    # Three 10px characters; the second word starts after a pause
+    timing = WordTiming([[0.0, 1.0, 0, 1], [2.0, 1.0, 1, 3]], [0, 10, 20, 30])
+    assert timing.reveal_column(-0.5) == 0
+    assert timing.reveal_column(0.5) == 5
+    assert timing.reveal_column(1.5) == 10  # held during the pause
+    assert timing.reveal_column(2.5) == 20
+    assert timing.reveal_column(9.0) == 30
+
+    mask = KaraokeMask(_random_alpha(h=4, w=30), duration=3.0, timing=timing)
+    frame = mask.make_mask(1.5)
+    assert frame[:, 10:].sum() == 0
+    assert np.array_equal(frame[:, :10], mask.alpha[:, :10])
+
+
+if __name__ == "__main__":
+    test_mask_matches_legacy_wipe()
+    test_mask_reuses_buffer()
+    test_zero_duration_reveals_everything()
+    test_word_timing_reveal_follows_words()
+    print("All karaoke mask tests passed.")
@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.llm_cache import LLMCache, LLMCacheMiss
+from src.llm_client import LLMClient, TEMPERATURE, MAX_TOKENS
+from src.config import MODEL_NAME, IMAGE_PROMPT_GENERATION_PROMPT
+from fake_llm import FakeOpenAI
+
+
+def _client(cache):
+    return LLMClient(cache=cache, client=FakeOpenAI())
+
+
+def test_key_fingerprints_every_request_field():
+    messages = [{"role": "user", "content": "hi"}]
+    key = LLMCache.make_key("m", 0.7, 2000, messages)
+    assert key == LLMCache.make_key("m", 0.7, 2000, [{"content": "hi", "role": "user"}])
+    assert key != LLMCache.make_key("m2", 0.7, 2000, messages)
+    assert key != LLMCache.make_key("m", 0.2, 2000, messages)
+    assert key != LLMCache.make_key("m", 0.7, 100, messages)
+    assert key != LLMCache.make_key("m", 0.7, 2000, [{"role": "user", "content": "hi!"}])
+
+
+def test_identical_prompts_hit_the_cache():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = LLMCache(os.path.join(tmp_dir, "llm.sqlite3"))
+        client = _client(cache)
+        first = client.generate_image_prompt("一段脚本")
+        assert client.generate_image_prompt("一段脚本") == first
+        client.generate_douyin_description("另一段脚本")
+        assert len(client.client.calls) == 2
+
+        stats = client.cache_stats()
+        assert stats["generate_image_prompt"] == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+        assert stats["generate_douyin_description"]['misses'] == 1
+
+        # Persisted for the next run
+        cache.close()
+        assert len(LLMCache(os.path.join(tmp_dir, "llm.sqlite3"))) == 2
+
+
+def test_ttl_expires_responses():
+    cache = LLMCache(":memory:", ttl=60)
+    cache.put("k", "old")
+    cache._conn.execute("UPDATE responses SET created = created - 120")
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_size_cap_keeps_recent_entries():
+    cache = LLMCache(":memory:", max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache._conn.execute("UPDATE responses SET accessed = accessed - 10 WHERE key = 'a'")
+    cache._conn.execute("UPDATE responses SET accessed = accessed - 5 WHERE key = 'b'")
+    cache.get("a")
+    cache.put("c", "3")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_replay_mode_never_calls_the_api():
+    cache = LLMCache(":memory:", ttl=1, replay=True)
+    client = _client(cache)
+    messages = client._messages(IMAGE_PROMPT_GENERATION_PROMPT.format(script_segment="recorded"))
+    cache.put(LLMCache.make_key(MODEL_NAME, TEMPERATURE, MAX_TOKENS, messages, None), "recorded answer")
+    try:
+        cache.get("missing")
+        assert False, "replay miss must raise"
+    except LLMCacheMiss:
+        pass
+    # Recorded prompts are answered from the cache, unrecorded ones fail instead of reaching the API
+    assert client.generate_image_prompt("recorded") == "recorded answer"
+    assert client.generate_image_prompt("not recorded") is None
+    assert client.client.calls == []
+
+
+if __name__ == "__main__":
+    test_key_fingerprints_every_request_field()
+    test_identical_prompts_hit_the_cache()
+    test_ttl_expires_responses()
+    test_size_cap_keeps_recent_entries()
+    test_replay_mode_never_calls_the_api()
+    print("All LLM cache tests passed.")
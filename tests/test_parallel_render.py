@@ -0,0 +1,63 @@
+import os
+import sys
+import subprocess
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.video_gen import VideoGenerator
+from src.parallel_render import split_timeline, ParallelRenderer
+from moviepy import AudioFileClip
+from moviepy.config import FFMPEG_BINARY
+
+
+def _subs(starts, length=0.9):
+    return [{'start': s, 'end': s + length, 'text': f"cue {i}"} for i, s in enumerate(starts)]
+
+
+def test_split_covers_timeline_on_cue_boundaries():
+    subs = _subs([0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0])
+    chunks = split_timeline(subs, 8.0, 4, fps=24)
+
+    assert chunks[0][0] == 0 and chunks[-1][1] == 192
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+        # Every cut is the first frame of a cue
+        assert (start / 24) in [sub['start'] for sub in subs]
+    assert chunks == [(0, 48), (48, 96), (96, 144), (144, 192)]
+
+
+def test_split_without_cues_and_with_more_chunks_than_cues():
+    assert split_timeline([], 2.0, 4, fps=24) == [(0, 12), (12, 24), (24, 36), (36, 48)]
+    assert split_timeline(_subs([0.0, 1.0]), 2.0, 8, fps=24) == [(0, 24), (24, 48)]
+    assert split_timeline([], 0, 4) == []
+
+
+def test_parallel_render_keeps_every_frame():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio_path = os.path.join(tmp_dir, "voice.mp3")
+        vtt_path = os.path.join(tmp_dir, "voice.vtt")
+        output_path = os.path.join(tmp_dir, "out.mp4")
+        subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=300:duration=3", audio_path], check=True)
+        with open(vtt_path, "w", encoding="utf-8") as f:
+            f.write("WEBVTT\n\n1\n00:00:00.000 --> 00:00:01.400\n第一句，\n\n2\n00:00:01.500 --> 00:00:03.000\n第二句。\n")
+
+        audio = AudioFileClip(audio_path)
+        try:
+            renderer = ParallelRenderer(VideoGenerator(output_width=270, output_height=480), workers=2)
+            assert renderer.render(audio, audio.duration, output_path, vtt_path=vtt_path)
+            expected_frames = int(audio.duration * 24)
+        finally:
+            audio.close()
+
+        result = subprocess.run([FFMPEG_BINARY, "-i", output_path, "-map", "0:v", "-f", "null", "-"], capture_output=True, text=True)
+        frames = int(result.stderr.split("frame=")[-1].split()[0])
+        assert frames == expected_frames
+
+
+if __name__ == "__main__":
+    test_split_covers_timeline_on_cue_boundaries()
+    test_split_without_cues_and_with_more_chunks_than_cues()
+    test_parallel_render_keeps_every_frame()
+    print("All parallel render tests passed.")
@@ -0,0 +1,139 @@
+import os
+import sys
+import random
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.llm_cache import LLMCache
+from src.llm_client import LLMClient
+from src.tts_client import TTSClient
+from src.script_stream import ScriptLineCleaner, generate_script_with_speech
+from src.utils import clean_script
+from fake_llm import FakeOpenAI
+from fake_tts import FakeCommunicate
+
+RAW_SCRIPT = """**开头**：你有没有想过，为什么有些人总是存不下钱？
+## 第一部分
+其实问题不在收入，而在习惯。**重点：先存后花，再消费。**
+**引入**：
+今天这本书告诉你，真正重要的东西，用眼睛是看不见的。
+数据显示，3.5% 的人做到了！你呢？
+#
+最后，点赞收藏；我们下期见。"""
+
+
+def _client(script):
+    return LLMClient(cache=LLMCache(":memory:"), client=FakeOpenAI(lambda messages: script))
+
+
+def test_incremental_cleaning_matches_clean_script():
+    expected = clean_script(RAW_SCRIPT)
+    rng = random.Random(7)
+    for _ in range(200):
+        cleaner = ScriptLineCleaner()
+        lines = []
+        pos = 0
+        while pos < len(RAW_SCRIPT):
+            step = rng.randint(1, 8)
+            lines += cleaner.feed(RAW_SCRIPT[pos:pos + step])
+            pos += step
+        lines += cleaner.flush()
+        assert "\n".join(lines) == expected
+
+
+def test_lines_are_released_per_sentence():
+    cleaner = ScriptLineCleaner()
+    assert cleaner.feed("你有没有想过") == []
+    assert cleaner.feed("，为什么") == ["你有没有想过，"]
+    # Nothing is cut inside **bold** text, which clean_script drops as a whole
+    assert cleaner.feed("**重点，") == []
+    assert cleaner.feed("先存后花。**") == []
+    assert cleaner.feed("好的。") == [clean_script("为什么**重点，先存后花。**好的。")]
+
+
+def test_streamed_audio_and_vtt_match_segmented_tts():
+    script = RAW_SCRIPT * 3
+    tts = TTSClient(engine=FakeCommunicate, cache_dir=None, segment_chars=30)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {name: os.path.join(tmp_dir, name) for name in ["a.mp3", "a.vtt", "b.mp3", "b.vtt"]}
+
+        llm = _client(script)
+        streamed, report = generate_script_with_speech(llm, tts, "书", paths["a.mp3"], paths["a.vtt"])
+        assert streamed == script
+        assert llm.client.calls[0]['stream'] is True
+        assert report['first_audio'] is not None and report['total'] >= report['script_done']
+
+        assert tts.generate_audio_with_subtitles(clean_script(script), paths["b.mp3"], paths["b.vtt"], segmented=True)
+        for a, b in [("a.mp3", "b.mp3"), ("a.vtt", "b.vtt"), ("a.words.json", "b.words.json")]:
+            with open(os.path.join(tmp_dir, a), "rb") as fa, open(os.path.join(tmp_dir, b), "rb") as fb:
+                assert fa.read() == fb.read(), f"{a} differs from {b}"
+
+        # The streamed script is cached like a generate_script response
+        assert llm.generate_script("书") == script
+        assert len(llm.client.calls) == 1
+
+
+def test_second_run_is_served_from_both_caches():
+    script = RAW_SCRIPT * 3
+    llm = _client(script)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tts = TTSClient(engine=FakeCommunicate, cache_dir=os.path.join(tmp_dir, "cache"), segment_chars=30)
+        outputs = []
+        for i in range(2):
+            audio_path, vtt_path = os.path.join(tmp_dir, f"{i}.mp3"), os.path.join(tmp_dir, f"{i}.vtt")
+            calls_before = FakeCommunicate.calls
+            streamed, report = generate_script_with_speech(llm, tts, "书", audio_path, vtt_path)
+            assert streamed == script and report['total'] is not None
+            with open(audio_path, "rb") as a, open(vtt_path, "rb") as v:
+                outputs.append((a.read(), v.read()))
+        # The cached script is known up front, so the TTS cache answers it without a synthesis
+        assert FakeCommunicate.calls == calls_before
+        assert len(llm.client.calls) == 1
+        assert (tts.cache.hits, tts.cache.misses) == (1, 0)
+        assert outputs[0] == outputs[1]
+
+
+def test_speech_starts_before_the_script_ends():
+    llm = _client(RAW_SCRIPT * 4)
+    llm.client.chat.completions.stream_delay = 0.005
+    tts = TTSClient(engine=FakeCommunicate, cache_dir=None, segment_chars=30)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        script, report = generate_script_with_speech(llm, tts, "书", os.path.join(tmp_dir, "a.mp3"), os.path.join(tmp_dir, "a.vtt"))
+    assert script
+    assert report['first_audio'] < report['script_done'] / 2
+
+
+def test_llm_failure_mid_stream():
+    llm = _client(RAW_SCRIPT)
+
+    def broken(**kwargs):
+        yield from FakeOpenAI(lambda messages: RAW_SCRIPT).chat.completions.create(**kwargs)
+        raise ConnectionError("stream reset")
+
+    llm.client.chat.completions.create = lambda **kwargs: broken(**kwargs)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tts = TTSClient(engine=FakeCommunicate, cache_dir=os.path.join(tmp_dir, "cache"), segment_chars=30)
+        audio_path, vtt_path = os.path.join(tmp_dir, "a.mp3"), os.path.join(tmp_dir, "a.vtt")
+        with open(audio_path, "wb") as f:
+            f.write(b"previous audio")
+        script, _ = generate_script_with_speech(llm, tts, "书", audio_path, vtt_path)
+        # The synthesis is cancelled: the old audio stays, no subtitles, nothing cached
+        with open(audio_path, "rb") as f:
+            assert f.read() == b"previous audio"
+        assert not os.path.exists(vtt_path)
+        assert tts.cache.stats()['entries'] == 0
+    assert script is None
+    assert len(llm.cache) == 0
+
+
+if __name__ == "__main__":
+    test_incremental_cleaning_matches_clean_script()
+    test_lines_are_released_per_sentence()
+    test_streamed_audio_and_vtt_match_segmented_tts()
+    test_second_run_is_served_from_both_caches()
+    test_speech_starts_before_the_script_ends()
+    test_llm_failure_mid_stream()
+    print("All script streaming tests passed.")
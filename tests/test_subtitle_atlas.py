@@ -0,0 +1,54 @@
+import os
+import sys
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.video_gen import VideoGenerator
+from src.subtitle_atlas import SubtitleAtlas
+
+
+def test_tint_matches_pil_render():
+    video_gen = VideoGenerator()
+    atlas = SubtitleAtlas(video_gen)
+    for text in ["Hello karaoke", "The quick brown fox jumps over the lazy dog again and again"]:
+        for color in ["white", "#FFD700"]:
+            expected = video_gen._create_text_image_np(text, 70, color, 4, "black")
+            actual = atlas.tint(text, color, "black")
+            assert actual.shape == expected.shape
+            assert np.array_equal(actual[..., 3], expected[..., 3])
+            visible = expected[..., 3] > 0
+            assert np.array_equal(actual[..., :3][visible], expected[..., :3][visible])
+
+
+def test_repeated_lines_hit_the_cache():
+    atlas = SubtitleAtlas(VideoGenerator())
+    atlas.tint("catchphrase", "white")
+    atlas.tint("catchphrase", "#FFD700")
+    atlas.tint("another line", "white")
+    atlas.tint("catchphrase", "white")
+    assert atlas.misses == 2
+    assert atlas.hits == 2
+
+
+def test_atlas_packs_and_resets():
+    video_gen = VideoGenerator(output_width=280, output_height=500)
+    atlas = SubtitleAtlas(video_gen, fontsize=20, stroke_width=1, max_bytes=200 * 70 * 2 * 3)
+    first = atlas.tint("a", "white").copy()
+    atlas.tint("b", "white")
+    # Packed one after the other in the same page
+    assert atlas._entries["b"][0] == atlas._entries["a"][1]
+
+    for text in ["c", "d", "e", "f"]:
+        atlas.tint(text, "white")
+    assert atlas._used_rows * atlas.width * 2 <= atlas.max_bytes
+    # Entries rasterized again after a reset are still correct
+    assert np.array_equal(atlas.tint("a", "white"), first)
+
+
+if __name__ == "__main__":
+    test_tint_matches_pil_render()
+    test_repeated_lines_hit_the_cache()
+    test_atlas_packs_and_resets()
+    print("All subtitle atlas tests passed.")
@@ -0,0 +1,82 @@
+import os
+import sys
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moviepy import ColorClip, CompositeVideoClip
+from src.video_gen import VideoGenerator
+from src.subtitle_layer import CueIndex, SubtitleLayer
+
+
+def test_cue_index_lookup():
+    subs = [
+        {'start': 2.0, 'end': 3.0, 'text': 'b'},
+        {'start': 0.5, 'end': 1.5, 'text': 'a'},
+        {'start': 3.0, 'end': 9.0, 'text': 'c'},
+        {'start': 6.0, 'end': 7.0, 'text': 'past the end'},
+    ]
+    index = CueIndex(subs, duration=5.0)
+    assert index.texts == ['a', 'b', 'c']
+    assert index.ends[-1] == 5.0
+    assert index.active(0.0) == -1
+    assert index.active(0.5) == 0
+    assert index.active(1.5) == -1
+    assert index.active(2.99) == 1
+    assert index.active(3.0) == 2
+    assert index.active(5.0) == -1
+
+
+def test_layer_matches_per_cue_clips():
+    video_gen = VideoGenerator(output_width=270, output_height=480)
+    subs = [
+        {'start': 0.2, 'end': 1.0, 'text': 'Hello'},
+        {'start': 1.0, 'end': 2.0, 'text': 'karaoke world again'},
+    ]
+    bg = ColorClip(size=(270, 480), color=(30, 60, 90), duration=2.5)
+
+    old_clips = [bg]
+    for sub in subs:
+        clip = video_gen.create_karaoke_clip(sub['text'], duration=sub['end'] - sub['start'], fontsize=20, stroke_width=1)
+        old_clips.append(clip.with_start(sub['start']).with_position(('center', 0.8), relative=True))
+    old = CompositeVideoClip(old_clips)
+
+    layer = SubtitleLayer(video_gen, subs, 2.5, fontsize=20, stroke_width=1)
+    new = CompositeVideoClip([bg, layer.to_clip()])
+
+    for t in [0.0, 0.3, 0.6, 0.99, 1.0, 1.5, 1.99, 2.2]:
+        assert np.array_equal(old.get_frame(t), new.get_frame(t)), f"frame differs at t={t}"
+
+
+def test_layer_seeks_backwards():
+    video_gen = VideoGenerator(output_width=270, output_height=480)
+    layer = SubtitleLayer(video_gen, [{'start': 0.0, 'end': 1.0, 'text': 'Hello'}], 1.0, fontsize=20, stroke_width=1)
+    early = layer.make_frame(0.1).copy()
+    layer.make_frame(0.9)
+    assert np.array_equal(layer.make_frame(0.1), early)
+
+
+def test_word_timings_drive_the_reveal():
+    video_gen = VideoGenerator(output_width=270, output_height=480)
+    # "Hi there": silence first, then both words in the second half of the cue
+    words = [[0.5, 0.2, 0, 2], [0.7, 0.3, 3, 8]]
+    timed = SubtitleLayer(video_gen, [{'start': 0.0, 'end': 1.0, 'text': 'Hi there', 'words': words}], 1.0, fontsize=20, stroke_width=1)
+    linear = SubtitleLayer(video_gen, [{'start': 0.0, 'end': 1.0, 'text': 'Hi there'}], 1.0, fontsize=20, stroke_width=1)
+
+    timed.make_frame(0.4)
+    assert timed._reveal == 0
+    assert linear.make_frame(0.4) is not None and linear._reveal > 0
+    timed.make_frame(0.7)
+    font = video_gen._load_font(20)
+    assert timed._reveal == 10 + int(font.getlength("Hi"))
+    # The last word sweeps to the end of the sprite
+    assert timed._timing.reveal_column(1.0) == timed.w
+
+
+if __name__ == "__main__":
+    test_cue_index_lookup()
+    test_layer_matches_per_cue_clips()
+    test_layer_seeks_backwards()
+    test_word_timings_drive_the_reveal()
+    print("All subtitle layer tests passed.")
@@ -0,0 +1,73 @@
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.text_layout import wrap_text, GlyphAdvanceCache, NO_LINE_START
+
+
+class FixedWidthFont:
+    """Stand-in font: every glyph is 10px wide, counts measurements."""
+    def __init__(self):
+        self.calls = 0
+
+    def getlength(self, text):
+        self.calls += 1
+        return 10.0 * len(text)
+
+
+def test_wraps_at_max_width():
+    lines = wrap_text("一二三四五六七八九十", FixedWidthFont(), 40)
+    assert lines == ["一二三四", "五六七八", "九十"]
+
+
+def test_punctuation_never_starts_a_line():
+    # "，" would start line 2, so "四" is carried down with it
+    lines = wrap_text("一二三四，五六七", FixedWidthFont(), 40)
+    assert lines == ["一二三", "四，五六", "七"]
+    for line in lines[1:]:
+        assert line[0] not in NO_LINE_START
+
+
+def test_opening_bracket_never_ends_a_line():
+    lines = wrap_text("一二三《四五》", FixedWidthFont(), 40)
+    assert lines == ["一二三", "《四五》"]
+
+
+def test_space_at_break_is_dropped():
+    assert wrap_text("abcd efgh", FixedWidthFont(), 40) == ["abcd", "efgh"]
+
+
+def test_glyph_advances_are_measured_once():
+    font = FixedWidthFont()
+    cache = GlyphAdvanceCache()
+    text = "重要的东西用眼睛是看不见的" * 20
+    wrap_text(text, font, 300, advance_cache=cache)
+    wrap_text(text, font, 300, advance_cache=cache)
+    assert font.calls == len(set(text))
+
+
+def test_matches_previous_wrap_for_plain_text():
+    # The old loop measured current_line + char with getbbox on every character
+    font = FixedWidthFont()
+    text = "真正重要的东西用眼睛是看不见的只有用心才能看清"
+    old_lines, current = [], ""
+    for char in text:
+        if font.getlength(current + char) > 100:
+            old_lines.append(current)
+            current = char
+        else:
+            current += char
+    old_lines.append(current)
+    assert wrap_text(text, FixedWidthFont(), 100) == old_lines
+
+
+if __name__ == "__main__":
+    test_wraps_at_max_width()
+    test_punctuation_never_starts_a_line()
+    test_opening_bracket_never_ends_a_line()
+    test_space_at_break_is_dropped()
+    test_glyph_advances_are_measured_once()
+    test_matches_previous_wrap_for_plain_text()
+    print("All text layout tests passed.")
@@ -0,0 +1,190 @@
+import os
+import sys
+import asyncio
+import tempfile
+import subprocess
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.tts_client import TTSClient, split_segments, mp3_samples, cues_from_words
+from src.disk_cache import DiskLRUCache
+from src.utils import parse_vtt, load_subtitles, clean_script
+from fake_tts import FakeCommunicate, MP3_FRAME, FRAMES_PER_CHAR
+from moviepy.config import FFMPEG_BINARY
+
+SCRIPT = clean_script("""你有没有想过，为什么有些人总是存不下钱？
+其实问题不在收入，而在习惯。
+今天这本书告诉你，真正重要的东西，用眼睛是看不见的。
+第一，先存后花。第二，记录每一笔开销！第三，给自己留一点余地。""")
+
+
+def test_audio_and_vtt_without_temp_files():
+    client = TTSClient(engine=FakeCommunicate, cache_dir=None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio_path = os.path.join(tmp_dir, "audio.mp3")
+        vtt_path = os.path.join(tmp_dir, "audio.vtt")
+        cwd_before = set(os.listdir("."))
+
+        assert client.generate_audio_with_subtitles("你好，\n世界。", audio_path, vtt_path)
+
+        assert set(os.listdir(".")) == cwd_before
+        assert sorted(os.listdir(tmp_dir)) == ["audio.mp3", "audio.vtt", "audio.words.json"]
+        with open(audio_path, "rb") as f:
+            assert f.read() == MP3_FRAME * (FRAMES_PER_CHAR * 6)
+        subs = parse_vtt(vtt_path)
+        assert [sub['text'] for sub in subs] == ["你好，", "世界。"]
+        assert subs[0]['start'] == 0.0
+        # Cues span the spoken words of each line
+        assert abs(subs[0]['end'] - 0.48) < 1e-6
+        assert abs(subs[1]['start'] - 0.72) < 1e-6
+        assert abs(subs[1]['end'] - 1.2) < 1e-6
+
+
+def test_concurrent_syntheses_do_not_interfere():
+    client = TTSClient(engine=FakeCommunicate, cache_dir=None)
+    texts = ["第一本书", "第二本书的内容", "三"]
+
+    async def run_all(tmp_dir):
+        return await asyncio.gather(*[
+            client.generate_audio_with_subtitles_async(text, os.path.join(tmp_dir, f"{i}.mp3"), os.path.join(tmp_dir, f"{i}.vtt"))
+            for i, text in enumerate(texts)
+        ])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        assert all(asyncio.run(run_all(tmp_dir)))
+        for i, text in enumerate(texts):
+            assert parse_vtt(os.path.join(tmp_dir, f"{i}.vtt"))[0]['text'] == text
+            assert os.path.getsize(os.path.join(tmp_dir, f"{i}.mp3")) == len(MP3_FRAME) * FRAMES_PER_CHAR * len(text)
+
+
+def test_failed_synthesis_leaves_no_partial_audio():
+    class BrokenCommunicate(FakeCommunicate):
+        async def stream(self):
+            yield {"type": "audio", "data": MP3_FRAME}
+            raise ConnectionError("service unavailable")
+
+    client = TTSClient(engine=BrokenCommunicate, cache_dir=None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio_path = os.path.join(tmp_dir, "audio.mp3")
+        assert not client.generate_audio_with_subtitles("你好", audio_path, os.path.join(tmp_dir, "audio.vtt"))
+        assert os.listdir(tmp_dir) == []
+
+
+def test_word_timings_sidecar():
+    client = TTSClient(engine=FakeCommunicate, cache_dir=None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vtt_path = os.path.join(tmp_dir, "audio.vtt")
+        assert client.generate_audio_with_subtitles("你好，\n世界。", os.path.join(tmp_dir, "audio.mp3"), vtt_path)
+        subs = load_subtitles(vtt_path)
+        assert subs[1]['words'] == [[0.0, 0.24, 0, 1], [0.24, 0.24, 1, 2]]
+
+
+def test_sentence_boundary_engines_still_work():
+    class SentenceOnlyCommunicate(FakeCommunicate):
+        def __init__(self, text, voice="zh-CN-YunxiNeural", rate="+0%", volume="+0%"):
+            super().__init__(text, voice, rate=rate, volume=volume)
+
+    client = TTSClient(engine=SentenceOnlyCommunicate, cache_dir=None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vtt_path = os.path.join(tmp_dir, "audio.vtt")
+        assert client.generate_audio_with_subtitles("你好，\n世界。", os.path.join(tmp_dir, "audio.mp3"), vtt_path)
+        subs = load_subtitles(vtt_path)
+        assert [sub['text'] for sub in subs] == ["你好，", "世界。"]
+        assert 'words' not in subs[0]
+        assert sorted(os.listdir(tmp_dir)) == ["audio.mp3", "audio.vtt"]
+
+
+def test_words_are_grouped_by_line():
+    words = [(0.0, 0.2, "Hello"), (0.3, 0.2, "world"), (0.9, 0.1, "again"), (1.2, 0.1, "missing")]
+    cues = cues_from_words("Hello, world.\nagain!", words)
+    assert [cue['text'] for cue in cues] == ["Hello, world.", "again!"]
+    assert cues[0]['words'] == [[0.0, 0.2, 0, 5], [0.3, 0.2, 7, 12]]
+    assert (cues[1]['start'], cues[1]['end']) == (0.9, 1.0)
+
+
+def test_split_segments_on_sentence_ends():
+    segments = split_segments(SCRIPT, segment_chars=20)
+    assert '\n'.join(segments) == SCRIPT
+    assert len(segments) > 1
+    for segment in segments[:-1]:
+        assert segment[-1] in "。！？"
+    assert split_segments(SCRIPT, segment_chars=10000) == [SCRIPT]
+
+
+def test_mp3_samples_counts_frames():
+    assert mp3_samples(MP3_FRAME * 100) == (57600, 24000)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tone.mp3")
+        subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=duration=2",
+                        "-ar", "24000", "-ac", "1", "-b:a", "48k", path], check=True)
+        with open(path, "rb") as f:
+            n_samples, sample_rate = mp3_samples(f.read())
+        assert sample_rate == 24000
+        assert abs(n_samples / sample_rate - 2.0) < 0.1
+
+
+def test_segmented_matches_single_request():
+    client = TTSClient(engine=FakeCommunicate, concurrency=3, segment_chars=20, cache_dir=None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {}
+        for mode in ("single", "segmented"):
+            audio_path = os.path.join(tmp_dir, f"{mode}.mp3")
+            vtt_path = os.path.join(tmp_dir, f"{mode}.vtt")
+            assert client.generate_audio_with_subtitles(SCRIPT, audio_path, vtt_path, segmented=(mode == "segmented"))
+            paths[mode] = (audio_path, vtt_path)
+
+        for i in range(2):
+            with open(paths["single"][i], "rb") as a, open(paths["segmented"][i], "rb") as b:
+                assert a.read() == b.read()
+
+
+def test_segments_respect_concurrency_limit():
+    class SlowCommunicate(FakeCommunicate):
+        latency = 0.05
+
+    FakeCommunicate.max_active = 0
+    client = TTSClient(engine=SlowCommunicate, concurrency=2, segment_chars=10, cache_dir=None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cues = asyncio.run(client.synthesize_segmented(SCRIPT, os.path.join(tmp_dir, "a.mp3")))
+    assert len(split_segments(SCRIPT, 10)) > 2
+    assert FakeCommunicate.max_active == 2
+    assert [cue['text'] for cue in cues] == SCRIPT.split('\n')
+
+
+def test_cache_skips_the_service_for_identical_scripts():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client = TTSClient(engine=FakeCommunicate, cache_dir=os.path.join(tmp_dir, "cache"))
+        calls_before = FakeCommunicate.calls
+        outputs = []
+        for i in range(2):
+            audio_path = os.path.join(tmp_dir, f"{i}.mp3")
+            vtt_path = os.path.join(tmp_dir, f"{i}.vtt")
+            assert client.generate_audio_with_subtitles(SCRIPT, audio_path, vtt_path)
+            with open(audio_path, "rb") as a, open(vtt_path, "rb") as v:
+                outputs.append((a.read(), v.read()))
+        assert FakeCommunicate.calls == calls_before + 1
+        assert outputs[0] == outputs[1]
+        assert (client.cache.hits, client.cache.misses) == (1, 1)
+
+        # A different voice is a different entry
+        other = TTSClient(voice="zh-CN-XiaoxiaoNeural", engine=FakeCommunicate, cache_dir=os.path.join(tmp_dir, "cache"))
+        assert other.cache_key(SCRIPT) != client.cache_key(SCRIPT)
+        # Entries cached before word boundaries were requested (no word timings) are not served
+        assert client.cache_key(SCRIPT) != DiskLRUCache.make_key(SCRIPT, client.voice, client.rate, client.volume)
+
+
+if __name__ == "__main__":
+    test_audio_and_vtt_without_temp_files()
+    test_concurrent_syntheses_do_not_interfere()
+    test_failed_synthesis_leaves_no_partial_audio()
+    test_word_timings_sidecar()
+    test_sentence_boundary_engines_still_work()
+    test_words_are_grouped_by_line()
+    test_split_segments_on_sentence_ends()
+    test_mp3_samples_counts_frames()
+    test_segmented_matches_single_request()
+    test_segments_respect_concurrency_limit()
+    test_cache_skips_the_service_for_identical_scripts()
+    print("All TTS client tests passed.")